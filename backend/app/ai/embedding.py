@@ -3,13 +3,13 @@ from typing import List
 import hashlib
 import random
 
-def get_embedding(text: str) -> List[float]:
+def get_embedding(text: str, dim: int = 1536) -> List[float]:
     """
     Returns a deterministic pseudo-embedding for a given text.
     Replace this with your real embedding model later.
     """
-    # Simple deterministic random vector based on hash
+    # Simple deterministic random vector based on hash; a private Random
+    # instance so concurrent callers don't share (and reseed) global state
     seed = int(hashlib.sha256(text.encode()).hexdigest(), 16) % (2**32)
-    random.seed(seed)
-    return [random.random() for _ in range(1536)]  # match your EMBEDDING_DIM
-
+    rng = random.Random(seed)
+    return [rng.random() for _ in range(dim)]  # match your EMBEDDING_DIM
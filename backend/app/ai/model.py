@@ -1,8 +1,16 @@
 # backend/app/ai/model.py
-def generate_response(prompt: str) -> str:
+import random
+import time
+
+
+def generate_response(prompt: str, latency_ms: float = 0.0, jitter_ms: float = 0.0) -> str:
     """
     Returns a placeholder response.
     Replace this with your real LLM or API call (Gemini, OpenAI, etc.).
+    latency_ms ± jitter_ms simulates a remote model's response time
+    (used as the LLM stand-in by app.tools.bench_chat_load).
     """
+    if latency_ms or jitter_ms:
+        time.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
     # Simple echo response for testing
     return f"[AI Reply] I received your message:\n{prompt}"
@@ -5,7 +5,8 @@ import jwt
 import logging
 
 from app.config import settings
-from app.db.utils import create_user, get_user_by_email, verify_password
+from app.db.utils import create_user, get_user_by_email, update_password_hash
+from app.utils import passwords
 from app.utils.email_utils import send_welcome_email
 from fastapi.concurrency import run_in_threadpool
 
@@ -45,22 +46,21 @@ def _create_jwt_token(user_id: int, email: str, name: str | None = None) -> str:
     return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 
+# Hashing runs in the dedicated process pool (app/utils/passwords.py), DB
+# calls on the threadpool, so a login burst doesn't starve chat requests
 @router.post("/signup", response_model=AuthResponse)
-def signup(req: SignupRequest):
+async def signup(req: SignupRequest):
     try:
-        existing = get_user_by_email(req.email)
+        existing = await run_in_threadpool(get_user_by_email, req.email)
         if existing:
             return AuthResponse(success=False, message="Email already registered")
 
         # Trim possible trailing spaces that may come from UI copy/paste
-        password = req.password.strip()
-        user = create_user(req.name, req.email, password)
+        password_hash = await passwords.hash_password_async(req.password.strip())
+        user = await run_in_threadpool(create_user, req.name, req.email, password_hash=password_hash)
         token = _create_jwt_token(user_id=user["id"], email=user["email"], name=user.get("name"))  # RealDictCursor
-        # Fire-and-forget welcome email
-        try:
-            run_in_threadpool(send_welcome_email, user["email"], user.get("name"))
-        except Exception:
-            pass
+        # Queued for the mail worker; SMTP never runs on the request path
+        await run_in_threadpool(send_welcome_email, user["email"], user.get("name"))
         return AuthResponse(success=True, message="Signup successful", token=token, user={"id": user["id"], "name": user["name"], "email": user["email"]})
     except Exception as e:
         logger.exception("Signup failed: %s", e)
@@ -69,11 +69,17 @@ def signup(req: SignupRequest):
 
 
 @router.post("/login", response_model=AuthResponse)
-def login(req: LoginRequest):
+async def login(req: LoginRequest):
     try:
-        user = get_user_by_email(req.email)
-        if not user or not verify_password(req.password, user["password_hash"]):
+        user = await run_in_threadpool(get_user_by_email, req.email)
+        if not user:
             return AuthResponse(success=False, message="Invalid credentials")
+        valid, new_hash = await passwords.verify_and_update_async(req.password, user["password_hash"])
+        if not valid:
+            return AuthResponse(success=False, message="Invalid credentials")
+        if new_hash:
+            # Stored hash predates the current argon2 parameters
+            await run_in_threadpool(update_password_hash, user["id"], new_hash)
 
         token = _create_jwt_token(user_id=user["id"], email=user["email"], name=user.get("name"))  # RealDictCursor
         return AuthResponse(success=True, message="Login successful", token=token, user={"id": user["id"], "name": user["name"], "email": user["email"]})
@@ -21,6 +21,20 @@ class Settings(BaseSettings):
     PORT: int = Field(8000, env="PORT")
     HOST: str = Field("0.0.0.0", env="HOST")
 
+    # Preforking server (app/prefork.py): the master loads the embedding model
+    # once, then forks the API workers
+    WEB_CONCURRENCY: int = Field(0, env="WEB_CONCURRENCY")  # worker processes; 0 = one per usable CPU
+    WORKER_TORCH_THREADS: int = Field(0, env="WORKER_TORCH_THREADS")  # torch threads per worker; 0 = CPUs / workers
+    WORKER_GRACEFUL_TIMEOUT: float = Field(30, env="WORKER_GRACEFUL_TIMEOUT")  # seconds workers get to drain on stop
+
+    # Logging (app/utils/logging_setup.py): records go through a queue to a
+    # listener thread that writes JSON (or "text") lines to stdout
+    LOG_LEVEL: str = Field("INFO", env="LOG_LEVEL")
+    LOG_LEVELS: str = Field("", env="LOG_LEVELS")  # per-logger overrides, e.g. "app.db=DEBUG,neo4j=WARNING"
+    LOG_FORMAT: str = Field("json", env="LOG_FORMAT")  # "json" or "text"
+    LOG_DEBUG_SAMPLE_EVERY: int = Field(10, env="LOG_DEBUG_SAMPLE_EVERY")  # keep 1 in N DEBUG records per call site
+    LOG_QUEUE_SIZE: int = Field(10000, env="LOG_QUEUE_SIZE")  # records beyond this are dropped, not waited on
+
     # ======================================================
     # 🔹 PostgreSQL Database
     # ======================================================
@@ -48,6 +62,14 @@ class Settings(BaseSettings):
     REDIS_URL_CELERY: str = Field("redis://localhost:6379/0", env="REDIS_URL_CELERY")
     REDIS_URL_CHAT: str = Field("redis://localhost:6379/1", env="REDIS_URL_CHAT")
     REDIS_CHAT_HISTORY_KEY: str = Field("chat_history", env="REDIS_CHAT_HISTORY_KEY")
+    # Async client pool for request handlers (db/redis_utils.get_async_client)
+    REDIS_MAX_CONNECTIONS: int = Field(50, env="REDIS_MAX_CONNECTIONS")
+    REDIS_POOL_TIMEOUT: float = Field(5.0, env="REDIS_POOL_TIMEOUT")  # seconds to wait for a free connection
+    FACTS_CACHE_TTL: int = Field(3600, env="FACTS_CACHE_TTL")  # seconds; per-user facts cache
+    # Per-chat recent turns used to build the prompt history (services/memory.py)
+    CHAT_HOT_TURNS: int = Field(50, env="CHAT_HOT_TURNS")
+    CHAT_HOT_MAX_BYTES: int = Field(64 * 1024, env="CHAT_HOT_MAX_BYTES")  # encoded size; oldest turns dropped first
+    CHAT_HOT_TTL: int = Field(24 * 3600, env="CHAT_HOT_TTL")  # seconds since the chat's last turn
 
     # ======================================================
     # 🔹 Celery Task Queue
@@ -61,6 +83,40 @@ class Settings(BaseSettings):
     NEO4J_URI: str = Field("bolt://localhost:7687", env="NEO4J_URI")
     NEO4J_USER: str = Field("neo4j", env="NEO4J_USER")
     NEO4J_PASSWORD: str = Field("password", env="NEO4J_PASSWORD")
+    # One driver per process; these tune its connection pool
+    NEO4J_MAX_POOL_SIZE: int = Field(50, env="NEO4J_MAX_POOL_SIZE")
+    NEO4J_MAX_CONNECTION_LIFETIME: int = Field(3600, env="NEO4J_MAX_CONNECTION_LIFETIME")  # seconds
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = Field(30.0, env="NEO4J_CONNECTION_ACQUISITION_TIMEOUT")  # seconds
+
+    # ======================================================
+    # 🔹 Vector Store (semantic memory)
+    # ======================================================
+    VECTOR_STORE_BACKEND: str = Field("pinecone", env="VECTOR_STORE_BACKEND")  # pinecone | local
+    LOCAL_VECTOR_STORE_PATH: Optional[str] = Field("data/vector_store", env="LOCAL_VECTOR_STORE_PATH")
+    LOCAL_VECTOR_STORE_INDEX: str = Field("auto", env="LOCAL_VECTOR_STORE_INDEX")  # auto | hnsw | brute
+    # Switch to "namespaced" once app/tools/migrate_namespaces.py has finished
+    SEMANTIC_NAMESPACE_MODE: str = Field("dual", env="SEMANTIC_NAMESPACE_MODE")  # shared | dual | namespaced
+    # Near-duplicate suppression on write (threshold 0 disables)
+    SEMANTIC_DEDUP_THRESHOLD: float = Field(0.95, env="SEMANTIC_DEDUP_THRESHOLD")
+    SEMANTIC_DEDUP_WINDOW: int = Field(32, env="SEMANTIC_DEDUP_WINDOW")  # recent vectors kept per user
+    SEMANTIC_RETENTION_DAYS: int = Field(90, env="SEMANTIC_RETENTION_DAYS")  # enforced by app/tools/semantic_cleanup.py
+
+    # Retrieved-context pruning (app/services/retrieval.py)
+    RETRIEVAL_OVERFETCH: int = Field(3, env="RETRIEVAL_OVERFETCH")  # fetch top_k × this many candidates
+    RETRIEVAL_MIN_SCORE: float = Field(0.35, env="RETRIEVAL_MIN_SCORE")
+    RETRIEVAL_MMR_LAMBDA: float = Field(0.7, env="RETRIEVAL_MMR_LAMBDA")  # 1.0 = relevance only
+    RETRIEVAL_RELATIVE_CUTOFF: float = Field(0.75, env="RETRIEVAL_RELATIVE_CUTOFF")  # vs. best score
+    RETRIEVAL_MAX_TOKENS: int = Field(300, env="RETRIEVAL_MAX_TOKENS")
+
+    # Document uploads on /chat-with-upload/ (app/services/document_ingest.py)
+    UPLOAD_MAX_BYTES: int = Field(50 * 1024 * 1024, env="UPLOAD_MAX_BYTES")
+    UPLOAD_TMP_DIR: Optional[str] = Field(None, env="UPLOAD_TMP_DIR")  # default: the system temp dir
+    INGEST_CHUNK_CHARS: int = Field(1200, env="INGEST_CHUNK_CHARS")
+    INGEST_CHUNK_OVERLAP: int = Field(200, env="INGEST_CHUNK_OVERLAP")  # chars repeated from the previous chunk
+    INGEST_EMBED_BATCH: int = Field(32, env="INGEST_EMBED_BATCH")  # chunks per get_batch_embeddings/store_many call
+    INGEST_WORKERS: int = Field(2, env="INGEST_WORKERS")  # documents ingested concurrently
+    INGEST_WAIT_SECONDS: float = Field(20.0, env="INGEST_WAIT_SECONDS")  # reply waits this long, then uses the chunks ranked so far
+    INGEST_TOP_CHUNKS: int = Field(4, env="INGEST_TOP_CHUNKS")  # chunks put into the reply's context
 
     # ======================================================
     # 🔹 AI Keys and Models
@@ -84,11 +140,53 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = Field("HS256", env="JWT_ALGORITHM")
     JWT_EXPIRES_MINUTES: int = Field(60 * 24 * 7, env="JWT_EXPIRES_MINUTES")  # 7 days
 
+    # Password hashing (app/utils/passwords.py). Changing the argon2 costs
+    # re-hashes each user's password on their next login.
+    ARGON2_TIME_COST: int = Field(3, env="ARGON2_TIME_COST")
+    ARGON2_MEMORY_COST: int = Field(65536, env="ARGON2_MEMORY_COST")  # KiB
+    ARGON2_PARALLELISM: int = Field(4, env="ARGON2_PARALLELISM")
+    PASSWORD_HASH_WORKERS: int = Field(2, env="PASSWORD_HASH_WORKERS")  # dedicated hashing processes
+
     # ======================================================
     # 🔹 AI Config
     # ======================================================
     AI_PROVIDER_FAILURE_TIMEOUT: int = Field(30, env="AI_PROVIDER_FAILURE_TIMEOUT")
 
+    # Local intent classifier (app/services/intent_classifier.py), used when the regex NLU falls through.
+    # Off until app/tools/eval_intent_classifier.py has been run on the deployed model: its matches
+    # (create_task included) act without confirmation, so check per-intent precision first
+    INTENT_CLASSIFIER_ENABLED: bool = Field(False, env="INTENT_CLASSIFIER_ENABLED")
+    INTENT_CLASSIFIER_THRESHOLD: float = Field(0.55, env="INTENT_CLASSIFIER_THRESHOLD")  # cosine similarity
+    INTENT_CLASSIFIER_MARGIN: float = Field(0.05, env="INTENT_CLASSIFIER_MARGIN")  # over the runner-up intent
+    INTENT_LLM_FALLBACK: bool = Field(False, env="INTENT_LLM_FALLBACK")  # ask Gemini when still unsure
+
+    # Background fact extraction (worker.extract_facts, scheduled every FACT_EXTRACTION_INTERVAL seconds)
+    FACT_EXTRACTION_INTERVAL: int = Field(300, env="FACT_EXTRACTION_INTERVAL")
+    FACT_EXTRACTION_TURNS_PER_CALL: int = Field(8, env="FACT_EXTRACTION_TURNS_PER_CALL")
+    FACT_EXTRACTION_MAX_TURNS: int = Field(400, env="FACT_EXTRACTION_MAX_TURNS")  # per cycle
+    FACT_EXTRACTION_MAX_ATTEMPTS: int = Field(3, env="FACT_EXTRACTION_MAX_ATTEMPTS")  # then the chunk is dead-lettered
+
+    # Task reminders (services/reminders.py): Celery ETA jobs for reminders due
+    # within REMINDER_ETA_HORIZON seconds (keep it under the broker's 1h
+    # visibility timeout); worker.check_and_trigger_tasks sweeps for the rest
+    # every REMINDER_SWEEP_INTERVAL seconds
+    REMINDER_ETA_HORIZON: int = Field(1800, env="REMINDER_ETA_HORIZON")
+    REMINDER_SWEEP_INTERVAL: int = Field(300, env="REMINDER_SWEEP_INTERVAL")
+    REMINDER_GRACE_SECONDS: int = Field(120, env="REMINDER_GRACE_SECONDS")  # batch-dispatch if still unsent this long after due
+    REMINDER_DISPATCH_BATCH: int = Field(200, env="REMINDER_DISPATCH_BATCH")  # tasks claimed per transaction
+    REMINDER_DISPATCH_FANOUT: int = Field(4, env="REMINDER_DISPATCH_FANOUT")  # max concurrent worker.dispatch_reminders jobs
+    REMINDER_DIGEST_WINDOW: int = Field(900, env="REMINDER_DIGEST_WINDOW")  # digest users: pull in tasks due this soon
+
+    # Outbound mail queue (services/mail_queue.py, worker.send_emails on the "mail" queue)
+    MAIL_MAX_ATTEMPTS: int = Field(5, env="MAIL_MAX_ATTEMPTS")
+    MAIL_RETRY_BACKOFF: int = Field(30, env="MAIL_RETRY_BACKOFF")  # seconds before the first retry, doubled each time
+    MAIL_IDEMPOTENCY_TTL: int = Field(7 * 24 * 3600, env="MAIL_IDEMPOTENCY_TTL")  # how long a sent key blocks resends
+
+    # On-demand sampling profiler (POST /admin/profile, app/utils/profiler.py);
+    # the endpoint is disabled unless ADMIN_TOKEN is set
+    ADMIN_TOKEN: Optional[str] = Field(None, env="ADMIN_TOKEN")
+    PROFILER_MAX_SECONDS: float = Field(120, env="PROFILER_MAX_SECONDS")  # longest window one call may hold
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,196 @@
+# backend/app/db/fact_checkpoints.py
+"""
+Per-user checkpoints for background fact extraction.
+
+Each row records the last chat_history.id whose turn has been sent through
+fact extraction for that user; anything newer is pending. `failures` counts
+consecutive failed attempts at the user's next chunk; after
+FACT_EXTRACTION_MAX_ATTEMPTS the chunk is recorded in
+fact_extraction_dead_letters and the checkpoint moves past it.
+"""
+
+import logging
+from contextlib import contextmanager
+from typing import List, Dict, Any
+
+from app.db.utils import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant key for pg_try_advisory_lock, so only one extraction
+# cycle runs at a time across workers
+EXTRACTION_LOCK_ID = 720331
+
+
+def create_checkpoint_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS fact_extraction_checkpoints (
+            user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+            last_chat_id INTEGER NOT NULL DEFAULT 0,
+            turns_processed BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("ALTER TABLE fact_extraction_checkpoints ADD COLUMN IF NOT EXISTS failures INTEGER NOT NULL DEFAULT 0;")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS fact_extraction_dead_letters (
+            id BIGSERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            first_chat_id INTEGER NOT NULL,
+            last_chat_id INTEGER NOT NULL,
+            turns INTEGER NOT NULL,
+            attempts INTEGER NOT NULL,
+            error TEXT,
+            failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def get_pending_turns(limit: int) -> List[Dict[str, Any]]:
+    """
+    Up to `limit` chat_history rows past each user's checkpoint, shared out
+    round-robin: every user's oldest pending turn comes before anyone's
+    second, so one user's backlog cannot take the whole batch. Each user's
+    rows are their oldest pending ones, in id order.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT id, user_id, user_query, ai_response
+            FROM (
+                SELECT h.id, h.user_id, h.user_query, h.ai_response,
+                       row_number() OVER (PARTITION BY h.user_id ORDER BY h.id) AS rn
+                FROM chat_history h
+                LEFT JOIN fact_extraction_checkpoints c ON c.user_id = h.user_id
+                WHERE h.user_id IS NOT NULL
+                  AND h.id > COALESCE(c.last_chat_id, 0)
+            ) pending
+            WHERE rn <= %s
+            ORDER BY rn, id
+            LIMIT %s;
+            """,
+            (limit, limit),
+        )
+        return cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def advance_checkpoint(user_id: int, last_chat_id: int, turns: int) -> bool:
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            INSERT INTO fact_extraction_checkpoints (user_id, last_chat_id, turns_processed, updated_at)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id) DO UPDATE
+            SET last_chat_id = GREATEST(fact_extraction_checkpoints.last_chat_id, EXCLUDED.last_chat_id),
+                turns_processed = fact_extraction_checkpoints.turns_processed + EXCLUDED.turns_processed,
+                failures = 0,
+                updated_at = CURRENT_TIMESTAMP;
+            """,
+            (user_id, last_chat_id, turns),
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        logger.error("Failed to advance fact extraction checkpoint for user %s: %s", user_id, e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+def record_failure(user_id: int) -> int:
+    """
+    Count one more failed attempt at the user's next chunk. Returns the
+    consecutive failure count, or 0 if it could not be recorded.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            INSERT INTO fact_extraction_checkpoints (user_id, failures, updated_at)
+            VALUES (%s, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id) DO UPDATE
+            SET failures = fact_extraction_checkpoints.failures + 1,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING failures;
+            """,
+            (user_id,),
+        )
+        failures = cur.fetchone()["failures"]
+        conn.commit()
+        return failures
+    except Exception as e:
+        conn.rollback()
+        logger.error("Failed to record fact extraction failure for user %s: %s", user_id, e)
+        return 0
+    finally:
+        cur.close()
+        conn.close()
+
+
+def dead_letter(user_id: int, first_chat_id: int, last_chat_id: int, turns: int, attempts: int, error: str) -> bool:
+    """
+    Record a chunk that kept failing and move the user's checkpoint past it,
+    in one transaction.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            INSERT INTO fact_extraction_dead_letters (user_id, first_chat_id, last_chat_id, turns, attempts, error)
+            VALUES (%s, %s, %s, %s, %s, %s);
+            """,
+            (user_id, first_chat_id, last_chat_id, turns, attempts, error[:2000]),
+        )
+        cur.execute(
+            """
+            INSERT INTO fact_extraction_checkpoints (user_id, last_chat_id, updated_at)
+            VALUES (%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id) DO UPDATE
+            SET last_chat_id = GREATEST(fact_extraction_checkpoints.last_chat_id, EXCLUDED.last_chat_id),
+                failures = 0,
+                updated_at = CURRENT_TIMESTAMP;
+            """,
+            (user_id, last_chat_id),
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        logger.error("Failed to dead-letter fact extraction turns for user %s: %s", user_id, e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+@contextmanager
+def extraction_lock():
+    """
+    Hold a session-level advisory lock for the duration of a cycle.
+    Yields False if another worker already holds it.
+    """
+    conn = get_connection()
+    conn.autocommit = True  # don't sit idle in a transaction while the cycle runs
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_try_advisory_lock(%s) AS locked;", (EXTRACTION_LOCK_ID,))
+        locked = bool(cur.fetchone()["locked"])
+        try:
+            yield locked
+        finally:
+            if locked:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (EXTRACTION_LOCK_ID,))
+    finally:
+        cur.close()
+        conn.close()
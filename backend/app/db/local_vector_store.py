@@ -0,0 +1,384 @@
+# backend/app/db/local_vector_store.py
+"""
+In-process vector store for offline runs and benchmarks.
+
+Each namespace is its own partition, so per-user namespaces (see
+app.db.vector_store.user_namespace) are searched without any filtering.
+A partition keeps L2-normalized vectors in a NumPy matrix and, when `hnswlib`
+is installed, an HNSW graph over the same rows for approximate search. Small partitions, or filtered queries that the
+graph cannot satisfy, are answered by an exact NumPy scan.
+
+Data persists under `path` as one `<namespace>.npy` (vectors) plus one
+`<namespace>.json` (ids + metadata) per partition. The HNSW graph is rebuilt
+from the vectors on load.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import Optional, List, Dict, Any
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from app.db.vector_store import VectorStore
+
+try:
+    import hnswlib
+except Exception:
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+# Below this many live rows an exact scan is faster than walking the graph
+BRUTE_FORCE_MAX_ROWS = 2000
+DEFAULT_NAMESPACE = ""
+
+
+# ======================================================
+# 🔹 Metadata filtering (Pinecone filter subset)
+# ======================================================
+def match_filter(metadata: Optional[Dict[str, Any]], flt: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Pinecone-style metadata filter.
+    Supports plain equality, $eq/$ne/$in/$nin/$gt/$gte/$lt/$lte, $and and $or.
+    """
+    if not flt:
+        return True
+    md = metadata or {}
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(match_filter(md, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(match_filter(md, c) for c in cond):
+                return False
+            continue
+
+        value = md.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+
+        for op, arg in cond.items():
+            if op == "$eq" and value != arg:
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$in" and value not in arg:
+                return False
+            if op == "$nin" and value in arg:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > arg:
+                    return False
+                if op == "$gte" and not value >= arg:
+                    return False
+                if op == "$lt" and not value < arg:
+                    return False
+                if op == "$lte" and not value <= arg:
+                    return False
+    return True
+
+
+def _normalize(vec) -> np.ndarray:
+    arr = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(arr))
+    return arr / norm if norm > 0 else arr
+
+
+# ======================================================
+# 🔹 Partition (one per namespace)
+# ======================================================
+class _Partition:
+    def __init__(self, dim: int, use_hnsw: bool, capacity: int = 1024, M: int = 16, ef_construction: int = 200, ef: int = 64):
+        self.dim = dim
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.ids: List[Optional[str]] = []
+        self.meta: List[Optional[Dict[str, Any]]] = []
+        self.rows: Dict[str, int] = {}
+        self.ef = ef
+        self.index = None
+        if use_hnsw:
+            self.index = hnswlib.Index(space="cosine", dim=dim)
+            self.index.init_index(max_elements=capacity, ef_construction=ef_construction, M=M)
+            self.index.set_ef(ef)
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def live(self) -> int:
+        return len(self.rows)
+
+    def _grow(self, needed: int):
+        capacity = self.vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[: self.size] = self.vectors[: self.size]
+        self.vectors = grown
+        if self.index is not None:
+            self.index.resize_index(capacity)
+
+    def upsert(self, ids: List[str], vecs: np.ndarray, metas: List[Dict[str, Any]]):
+        new_rows = []
+        for item_id, vec, md in zip(ids, vecs, metas):
+            row = self.rows.get(item_id)
+            if row is None:
+                row = self.size
+                self._grow(row + 1)
+                self.ids.append(item_id)
+                self.meta.append(md)
+                self.rows[item_id] = row
+            else:
+                self.meta[row] = md
+            self.vectors[row] = vec
+            new_rows.append(row)
+        if self.index is not None and new_rows:
+            # hnswlib updates in place when a label already exists
+            self.index.add_items(self.vectors[new_rows], new_rows)
+
+    def delete(self, ids: List[str]) -> int:
+        removed = 0
+        for item_id in ids:
+            row = self.rows.pop(item_id, None)
+            if row is None:
+                continue
+            self.ids[row] = None
+            self.meta[row] = None
+            if self.index is not None:
+                self.index.mark_deleted(row)
+            removed += 1
+        return removed
+
+    def _exact(self, q: np.ndarray, top_k: int, flt: Optional[Dict]) -> List[tuple]:
+        n = self.size
+        sims = self.vectors[:n] @ q
+        valid = np.fromiter(
+            (self.ids[r] is not None and match_filter(self.meta[r], flt) for r in range(n)),
+            dtype=bool,
+            count=n,
+        )
+        candidates = np.flatnonzero(valid)
+        if candidates.size == 0:
+            return []
+        k = min(top_k, candidates.size)
+        cand_sims = sims[candidates]
+        top = np.argpartition(-cand_sims, k - 1)[:k]
+        top = top[np.argsort(-cand_sims[top])]
+        return [(int(candidates[i]), float(cand_sims[i])) for i in top]
+
+    def _approx(self, q: np.ndarray, top_k: int, flt: Optional[Dict]) -> List[tuple]:
+        k = min(top_k, self.live)
+        predicate = None
+        if flt:
+            meta = self.meta
+            predicate = lambda label: meta[label] is not None and match_filter(meta[label], flt)
+        self.index.set_ef(max(self.ef, k))
+        labels, dists = self.index.knn_query(q, k=k, filter=predicate)
+        return [(int(l), 1.0 - float(d)) for l, d in zip(labels[0], dists[0])]
+
+    def search(self, vec, top_k: int, flt: Optional[Dict]) -> List[tuple]:
+        if self.live == 0 or top_k <= 0:
+            return []
+        q = _normalize(vec)
+        if self.index is not None and self.live > BRUTE_FORCE_MAX_ROWS:
+            try:
+                return self._approx(q, top_k, flt)
+            except RuntimeError:
+                # Highly selective filters can leave the graph walk short of k hits
+                pass
+        return self._exact(q, top_k, flt)
+
+    # ---------------- persistence ----------------
+    def save(self, base: str):
+        live_rows = [r for r in range(self.size) if self.ids[r] is not None]
+        np.save(base + ".npy", self.vectors[live_rows] if live_rows else np.zeros((0, self.dim), dtype=np.float32))
+        with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "ids": [self.ids[r] for r in live_rows], "meta": [self.meta[r] for r in live_rows]}, f)
+        os.replace(base + ".json.tmp", base + ".json")
+
+    @classmethod
+    def load(cls, base: str, use_hnsw: bool) -> "_Partition":
+        with open(base + ".json", encoding="utf-8") as f:
+            doc = json.load(f)
+        vecs = np.load(base + ".npy")
+        part = cls(int(doc["dim"]), use_hnsw, capacity=max(1024, len(doc["ids"])))
+        if doc["ids"]:
+            part.upsert(doc["ids"], vecs, doc["meta"])
+        return part
+
+
+# ======================================================
+# 🔹 Local Vector Store
+# ======================================================
+class LocalVectorStore(VectorStore):
+    """
+    Disk-backed in-process vector store with per-namespace partitions.
+
+    index_type: "auto" (HNSW when hnswlib is installed), "hnsw" or "brute".
+    path: directory for persistence; None keeps everything in memory.
+    """
+
+    name = "local"
+
+    def __init__(self, path: Optional[str] = None, index_type: str = "auto", autosave_every: int = 500):
+        index_type = (index_type or "auto").lower()
+        if index_type == "hnsw" and hnswlib is None:
+            raise RuntimeError("hnswlib is not installed; use index_type='brute' or 'auto'.")
+        self.use_hnsw = index_type in ("auto", "hnsw") and hnswlib is not None
+        self.path = path
+        self.autosave_every = autosave_every
+        self._parts: Dict[str, _Partition] = {}
+        self._dirty: set = set()
+        self._writes_since_save = 0
+        self._lock = threading.RLock()
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load_all()
+            atexit.register(self.flush)
+
+        self.name = "local-hnsw" if self.use_hnsw else "local-brute"
+
+    # ---------------- helpers ----------------
+    def _base(self, namespace: str) -> str:
+        return os.path.join(self.path, quote(namespace or "__default__", safe=""))
+
+    def _load_all(self):
+        for fname in os.listdir(self.path):
+            if not fname.endswith(".json"):
+                continue
+            stem = fname[: -len(".json")]
+            ns = unquote(stem)
+            ns = DEFAULT_NAMESPACE if ns == "__default__" else ns
+            try:
+                self._parts[ns] = _Partition.load(os.path.join(self.path, stem), self.use_hnsw)
+            except Exception as e:
+                logger.error("Failed to load vector partition '%s': %s", ns, e)
+        if self._parts:
+            logger.info("Loaded %d vector partition(s) from %s", len(self._parts), self.path)
+
+    def _partition(self, namespace: Optional[str], dim: Optional[int] = None) -> Optional[_Partition]:
+        ns = namespace or DEFAULT_NAMESPACE
+        part = self._parts.get(ns)
+        if part is None and dim is not None:
+            part = _Partition(dim, self.use_hnsw)
+            self._parts[ns] = part
+        return part
+
+    def _mark_dirty(self, namespace: Optional[str], writes: int):
+        if not self.path:
+            return
+        self._dirty.add(namespace or DEFAULT_NAMESPACE)
+        self._writes_since_save += writes
+        if self._writes_since_save >= self.autosave_every:
+            self.flush()
+
+    # ---------------- VectorStore API ----------------
+    def upsert(self, items, namespace=None):
+        if not items:
+            return True
+        try:
+            vecs = np.stack([_normalize(i["values"]) for i in items])
+            with self._lock:
+                part = self._partition(namespace, dim=vecs.shape[1])
+                if vecs.shape[1] != part.dim:
+                    raise ValueError(f"Vector dim {vecs.shape[1]} != partition dim {part.dim}")
+                part.upsert(
+                    [i["id"] for i in items],
+                    vecs,
+                    [dict(i.get("metadata") or {}) for i in items],
+                )
+                self._mark_dirty(namespace, len(items))
+            return True
+        except Exception as e:
+            logger.error("Local upsert failed: %s", e)
+            return False
+
+    def query(self, vector, top_k=5, filter=None, namespace=None, include_metadata=True, include_values=False):
+        with self._lock:
+            part = self._partition(namespace)
+            if part is None:
+                return {"matches": []}
+            hits = part.search(vector, top_k, filter)
+            matches = [
+                {
+                    "id": part.ids[row],
+                    "score": score,
+                    "metadata": dict(part.meta[row] or {}) if include_metadata else {},
+                }
+                for row, score in hits
+            ]
+            if include_values:
+                for m, (row, _) in zip(matches, hits):
+                    m["values"] = part.vectors[row].tolist()
+        return {"matches": matches}
+
+    def delete(self, ids, namespace=None):
+        with self._lock:
+            part = self._partition(namespace)
+            if part is None:
+                return True
+            removed = part.delete(list(ids))
+            if removed:
+                self._mark_dirty(namespace, removed)
+        return True
+
+    def count(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                return sum(p.live for p in self._parts.values())
+            part = self._partition(namespace)
+            return part.live if part else 0
+
+    def list_ids(self, namespace=None, limit=100, cursor=None):
+        # The cursor is a row offset; rows are stable until the partition is reloaded
+        with self._lock:
+            part = self._partition(namespace)
+            if part is None:
+                return [], None
+            start = int(cursor or 0)
+            end = min(start + limit, part.size)
+            ids = [i for i in part.ids[start:end] if i is not None]
+            return ids, (str(end) if end < part.size else None)
+
+    def fetch(self, ids, namespace=None):
+        with self._lock:
+            part = self._partition(namespace)
+            if part is None:
+                return {}
+            out = {}
+            for item_id in ids:
+                row = part.rows.get(item_id)
+                if row is not None:
+                    out[item_id] = {"values": part.vectors[row].tolist(), "metadata": dict(part.meta[row] or {})}
+            return out
+
+    def namespaces(self) -> List[str]:
+        with self._lock:
+            return [ns for ns, p in self._parts.items() if p.live]
+
+    def flush(self):
+        """
+        Write dirty partitions to disk.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            for ns in list(self._dirty):
+                part = self._parts.get(ns)
+                if part is not None:
+                    part.save(self._base(ns))
+            self._dirty.clear()
+            self._writes_since_save = 0
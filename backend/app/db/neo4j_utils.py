@@ -1,62 +1,169 @@
 # backend/app/db/neo4j_utils.py
 import logging
-from neo4j import GraphDatabase
+import threading
+from neo4j import GraphDatabase, AsyncGraphDatabase
 from app.config import settings
+from app.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
 # ======================================================
 # 🔹 Neo4j Connection
 # ======================================================
+# Drivers are thread-safe and own a connection pool, so each process keeps a
+# single long-lived instance instead of opening one per query.
+_driver = None
+_async_driver = None
+_driver_lock = threading.Lock()
+
+
+def _driver_config() -> dict:
+    return {
+        "auth": (settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+        "max_connection_pool_size": settings.NEO4J_MAX_POOL_SIZE,
+        "max_connection_lifetime": settings.NEO4J_MAX_CONNECTION_LIFETIME,
+        "connection_acquisition_timeout": settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+    }
+
+
 def get_driver():
-    try:
-        driver = GraphDatabase.driver(
-            settings.NEO4J_URI,
-            auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
-        )
-        return driver
-    except Exception as e:
-        logger.error(f"Failed to connect to Neo4j: {e}")
-        raise
+    """
+    Return the process-wide sync driver, creating it on first use.
+    """
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                try:
+                    _driver = GraphDatabase.driver(settings.NEO4J_URI, **_driver_config())
+                except Exception as e:
+                    logger.error(f"Failed to connect to Neo4j: {e}")
+                    raise
+    return _driver
+
+
+def get_async_driver():
+    """
+    Return the process-wide async driver (for use on the FastAPI event loop).
+    """
+    global _async_driver
+    if _async_driver is None:
+        with _driver_lock:
+            if _async_driver is None:
+                try:
+                    _async_driver = AsyncGraphDatabase.driver(settings.NEO4J_URI, **_driver_config())
+                except Exception as e:
+                    logger.error(f"Failed to connect to Neo4j (async): {e}")
+                    raise
+    return _async_driver
+
+
+def close_driver():
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+
+
+async def close_async_driver():
+    global _async_driver
+    driver = _async_driver
+    _async_driver = None
+    if driver is not None:
+        await driver.close()
+
+
+def reset_after_fork():
+    """
+    Drop the drivers inherited from a preforking master (app/prefork.py)
+    without closing them, since their sockets belong to the master.
+    """
+    global _driver, _async_driver
+    _driver = None
+    _async_driver = None
+
+
+# ======================================================
+# 🔹 Transaction functions
+# ======================================================
+# Passed to execute_read / execute_write, which retry them on transient
+# errors (leader switch, dropped connection) and route reads to followers.
+def _read_single_value(tx, query, **params):
+    record = tx.run(query, **params).single()
+    return record["value"] if record else None
+
+
+def _read_key_values(tx, query, **params):
+    return {r["key"]: r["value"] for r in tx.run(query, **params)}
+
+
+def _write(tx, query, **params):
+    tx.run(query, **params).consume()
+
+
+async def _read_single_value_async(tx, query, **params):
+    result = await tx.run(query, **params)
+    record = await result.single()
+    return record["value"] if record else None
+
+
+async def _read_key_values_async(tx, query, **params):
+    result = await tx.run(query, **params)
+    return {r["key"]: r["value"] async for r in result}
 
 
 # ======================================================
 # 🔹 FACT STORAGE
 # ======================================================
+# Global facts carry no user_id; user facts are keyed by (user_id, key).
+FACT_BY_KEY_QUERY = "MATCH (f:Fact {key: $key}) WHERE f.user_id IS NULL RETURN f.value AS value"
+
+
+def _save_global_fact(tx, key, value):
+    record = tx.run(
+        """
+        MATCH (f:Fact {key: $key}) WHERE f.user_id IS NULL
+        SET f.value = $value, f.updated_at = timestamp()
+        RETURN count(f) AS n
+        """,
+        key=key, value=value,
+    ).single()
+    if not record["n"]:
+        tx.run("CREATE (:Fact {key: $key, value: $value, updated_at: timestamp()})", key=key, value=value).consume()
+
+
+@timed("neo4j")
 def save_fact_neo4j(key: str, value: str):
     """
     Save or update a general fact (not tied to user).
     """
-    query = """
-    MERGE (f:Fact {key: $key})
-    SET f.value = $value,
-        f.updated_at = timestamp()
-    RETURN f
-    """
     try:
-        driver = get_driver()
-        with driver.session() as session:
-            session.run(query, key=key, value=value)
-        driver.close()
+        with get_driver().session() as session:
+            session.execute_write(_save_global_fact, key, value)
         logger.info(f"✅ Saved fact: {key} → {value}")
     except Exception as e:
         logger.error(f"❌ Failed to save fact in Neo4j: {e}")
 
 
+@timed("neo4j")
 def get_fact_neo4j(key: str):
     """
     Retrieve a fact by key.
     """
-    query = "MATCH (f:Fact {key: $key}) RETURN f.value AS value"
     try:
-        driver = get_driver()
-        with driver.session() as session:
-            result = session.run(query, key=key)
-            record = result.single()
-            driver.close()
-            if record:
-                return record["value"]
-            return None
+        with get_driver().session() as session:
+            return session.execute_read(_read_single_value, FACT_BY_KEY_QUERY, key=key)
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch fact from Neo4j: {e}")
+        return None
+
+
+@timed("neo4j")
+async def get_fact_neo4j_async(key: str):
+    try:
+        async with get_async_driver().session() as session:
+            return await session.execute_read(_read_single_value_async, FACT_BY_KEY_QUERY, key=key)
     except Exception as e:
         logger.error(f"❌ Failed to fetch fact from Neo4j: {e}")
         return None
@@ -65,89 +172,170 @@ def get_fact_neo4j(key: str):
 # ======================================================
 # 🔹 USER FACTS (Personalization)
 # ======================================================
-def save_user_fact_neo4j(user_id: str, key: str, value: str):
+USER_FACT_QUERY = """
+MATCH (f:Fact {user_id: $user_id, key: $key})
+RETURN f.value AS value
+"""
+
+USER_FACTS_QUERY = """
+MATCH (u:User {id: $user_id})-[:OWNS]->(f:Fact {user_id: $user_id})
+RETURN f.key AS key, f.value AS value
+"""
+
+
+@timed("neo4j")
+def save_user_fact_neo4j(user_id: str, key: str, value: str) -> bool:
     """
     Save a personalized user fact (e.g., name, preferences).
-    Creates (User)-[:OWNS]->(Fact) relationship.
+    Creates (User)-[:OWNS]->(Fact) relationship; the fact is unique per (user_id, key).
     """
     query = """
     MERGE (u:User {id: $user_id})
-    MERGE (f:Fact {key: $key})
+    MERGE (f:Fact {user_id: $user_id, key: $key})
     SET f.value = $value,
         f.updated_at = timestamp()
     MERGE (u)-[:OWNS]->(f)
-    RETURN f
     """
     try:
-        driver = get_driver()
-        with driver.session() as session:
-            session.run(query, user_id=user_id, key=key, value=value)
-        driver.close()
+        with get_driver().session() as session:
+            session.execute_write(_write, query, user_id=str(user_id), key=key, value=value)
         logger.info(f"✅ Saved user fact: {user_id} → {key}: {value}")
+        return True
     except Exception as e:
         logger.error(f"❌ Failed to save user fact in Neo4j: {e}")
+        return False
 
 
+@timed("neo4j")
 def get_user_fact_neo4j(user_id: str, key: str):
     """
     Retrieve a specific fact for a user.
     """
-    query = """
-    MATCH (u:User {id: $user_id})-[:OWNS]->(f:Fact {key: $key})
-    RETURN f.value AS value
-    """
     try:
-        driver = get_driver()
-        with driver.session() as session:
-            result = session.run(query, user_id=user_id, key=key)
-            record = result.single()
-            driver.close()
-            if record:
-                return record["value"]
-            return None
+        with get_driver().session() as session:
+            return session.execute_read(_read_single_value, USER_FACT_QUERY, user_id=str(user_id), key=key)
+    except Exception as e:
+        logger.error(f"❌ Failed to get user fact: {e}")
+        return None
+
+
+@timed("neo4j")
+async def get_user_fact_neo4j_async(user_id: str, key: str):
+    try:
+        async with get_async_driver().session() as session:
+            return await session.execute_read(_read_single_value_async, USER_FACT_QUERY, user_id=str(user_id), key=key)
     except Exception as e:
         logger.error(f"❌ Failed to get user fact: {e}")
         return None
 
 
+@timed("neo4j")
+def fetch_user_facts(user_id: str) -> dict:
+    """
+    All facts for a user as {key: value}. Raises on Neo4j errors, so callers
+    can tell "no facts" apart from "lookup failed" (e.g. before caching).
+    """
+    with get_driver().session() as session:
+        return session.execute_read(_read_key_values, USER_FACTS_QUERY, user_id=str(user_id))
+
+
+@timed("neo4j")
+async def fetch_user_facts_async(user_id: str) -> dict:
+    async with get_async_driver().session() as session:
+        return await session.execute_read(_read_key_values_async, USER_FACTS_QUERY, user_id=str(user_id))
+
+
 def get_all_facts_for_user(user_id: str):
     """
     Retrieve all facts linked to a user.
     """
-    query = """
-    MATCH (u:User {id: $user_id})-[:OWNS]->(f:Fact)
-    RETURN f.key AS key, f.value AS value
+    try:
+        return fetch_user_facts(user_id)
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch all facts for user: {e}")
+        return {}
+
+
+async def get_all_facts_for_user_async(user_id: str):
+    """
+    Async variant of get_all_facts_for_user() for request handlers.
     """
     try:
-        driver = get_driver()
-        with driver.session() as session:
-            results = session.run(query, user_id=user_id)
-            facts = {r["key"]: r["value"] for r in results}
-        driver.close()
-        return facts
+        return await fetch_user_facts_async(user_id)
     except Exception as e:
         logger.error(f"❌ Failed to fetch all facts for user: {e}")
         return {}
 
 
+# ======================================================
+# 🔹 EXTRACTED KNOWLEDGE (background fact extraction)
+# ======================================================
+# One row per extracted edge; rows with a null target only record an entity.
+# Entities are scoped per user and merged on a case-folded name.
+MERGE_EXTRACTED_QUERY = """
+UNWIND $rows AS row
+MERGE (u:User {id: row.user_id})
+MERGE (s:Entity {user_id: row.user_id, key: row.source_key})
+  ON CREATE SET s.name = row.source, s.type = row.source_type, s.created_at = timestamp()
+SET s.updated_at = timestamp()
+MERGE (u)-[:MENTIONED]->(s)
+FOREACH (_ IN CASE WHEN row.target_key IS NULL THEN [] ELSE [1] END |
+  MERGE (t:Entity {user_id: row.user_id, key: row.target_key})
+    ON CREATE SET t.name = row.target, t.type = row.target_type, t.created_at = timestamp()
+  SET t.updated_at = timestamp()
+  MERGE (u)-[:MENTIONED]->(t)
+  MERGE (s)-[r:RELATED {type: row.relation}]->(t)
+  SET r.updated_at = timestamp()
+)
+"""
+
+
+@timed("neo4j")
+def merge_extracted_facts(rows: list) -> int:
+    """
+    Write a batch of extracted entities/relationships in one UNWIND query.
+    Raises on failure so the caller does not advance its checkpoint.
+    """
+    if not rows:
+        return 0
+    with get_driver().session() as session:
+        session.execute_write(_write, MERGE_EXTRACTED_QUERY, rows=rows)
+    return len(rows)
+
+
 # ======================================================
 # 🔹 INITIALIZATION UTILITIES
 # ======================================================
 def ensure_constraints():
     """
     Ensures Neo4j constraints for clean schema setup.
+
+    Facts used to be unique on key alone, so every user shared one node per
+    key. The old constraint is dropped, each owner gets its own copy of any
+    legacy shared fact, and uniqueness moves to (user_id, key). Safe to run
+    on every startup.
     """
     queries = [
         "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
-        "CREATE CONSTRAINT fact_key_unique IF NOT EXISTS FOR (f:Fact) REQUIRE f.key IS UNIQUE"
+        "DROP CONSTRAINT fact_key_unique IF EXISTS",
+        # User ids are stored as strings; older writes used the raw int from the JWT
+        "MATCH (u:User) WHERE toString(u.id) <> u.id SET u.id = toString(u.id)",
+        """
+        MATCH (u:User)-[r:OWNS]->(old:Fact)
+        WHERE old.user_id IS NULL
+        MERGE (f:Fact {user_id: u.id, key: old.key})
+        ON CREATE SET f.value = old.value, f.updated_at = old.updated_at
+        MERGE (u)-[:OWNS]->(f)
+        DELETE r
+        """,
+        "CREATE CONSTRAINT fact_user_key_unique IF NOT EXISTS FOR (f:Fact) REQUIRE (f.user_id, f.key) IS UNIQUE",
+        "CREATE CONSTRAINT entity_user_key_unique IF NOT EXISTS FOR (e:Entity) REQUIRE (e.user_id, e.key) IS UNIQUE",
     ]
     try:
-        driver = get_driver()
-        with driver.session() as session:
+        with get_driver().session() as session:
             for q in queries:
-                session.run(q)
-        driver.close()
-        logger.info("✅ Neo4j constraints ensured (User.id, Fact.key)")
+                session.run(q).consume()
+        logger.info("✅ Neo4j constraints ensured (User.id, Fact.user_id+key, Entity.user_id+key)")
     except Exception as e:
         logger.error(f"❌ Failed to ensure Neo4j constraints: {e}")
 
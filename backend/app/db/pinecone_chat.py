@@ -1,61 +1,60 @@
 # backend/app/db/pinecone_chat.py
 import logging
+import time
 import uuid
 from typing import List, Dict
-from app.db.pinecone_utils import upsert_vectors, query_vectors, init_pinecone
+from app.db import vector_ledger
+from app.db.vector_store import get_vector_store, query_user_vectors, write_namespace
 import traceback
 
 logger = logging.getLogger(__name__)
 
-# Ensure Pinecone client is initialized
-init_pinecone()
+# Ensure the vector store is initialized
+get_vector_store()
 
 
 def store_message_in_pinecone(user_id: str, message_text: str, embedding: List[float]) -> bool:
     """
-    Stores a single user message in Pinecone for context retrieval.
+    Stores a single user message in the vector store for context retrieval.
     """
     try:
         message_id = f"{user_id}_{uuid.uuid4()}"
+        namespace = write_namespace(user_id)
+        now = int(time.time())
         item = {
             "id": message_id,
             "values": embedding,
-            "metadata": {"user_id": user_id, "text": message_text},
+            "metadata": {"user_id": user_id, "stored_at": now},
         }
 
-        success = upsert_vectors([item])
+        # Text lives in the Postgres ledger, not in vector metadata
+        if not vector_ledger.record_vectors(
+            [{"id": message_id, "user_id": user_id, "text": message_text, "stored_at": now}],
+            namespace=namespace,
+        ):
+            logger.error("Ledger write failed; message not stored in vector store")
+            return False
+        success = get_vector_store().upsert([item], namespace=namespace)
         if not success:
-            logger.error("Failed to upsert message into Pinecone")
+            logger.error("Failed to upsert message into vector store")
             return False
 
-        logger.info("Stored message in Pinecone: %s", message_id)
+        logger.info("Stored message in vector store: %s", message_id)
         return True
 
     except Exception as e:
-        logger.error("Error storing message in Pinecone: %s\n%s", e, traceback.format_exc())
+        logger.error("Error storing message in vector store: %s\n%s", e, traceback.format_exc())
         return False
 
 
 def retrieve_context(user_id: str, embedding: List[float], top_k: int = 5) -> List[Dict]:
     """
-    Retrieves relevant context messages from Pinecone for a user.
+    Retrieves relevant context messages from the vector store for a user.
     """
     try:
-        init_pinecone()  # Ensure Pinecone is initialized
-
-        filter_metadata = {"user_id": user_id}
-        result = query_vectors(
-            vector=embedding,
-            top_k=top_k,
-            filter=filter_metadata,
-            include_metadata=True,
-        )
-
-        if not result or "matches" not in result:
-            return []
-
-        return [match["metadata"] for match in result["matches"]]
+        matches = vector_ledger.hydrate_matches(query_user_vectors(user_id, embedding, top_k=top_k))
+        return [match["metadata"] for match in matches]
 
     except Exception as e:
-        logger.error("Error retrieving context from Pinecone: %s\n%s", e, traceback.format_exc())
+        logger.error("Error retrieving context from vector store: %s\n%s", e, traceback.format_exc())
         return []
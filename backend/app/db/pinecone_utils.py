@@ -4,6 +4,7 @@ import traceback
 from typing import Optional, List, Dict, Any
 from pinecone import Pinecone, ServerlessSpec
 from app.config_pinecone import pinecone_settings
+from app.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +46,15 @@ def init_pinecone() -> Pinecone:
         raise
 
 
+def reset_client():
+    """
+    Forget the client (and its HTTP connection pool) so the next call
+    builds a new one; used after fork by app/prefork.py.
+    """
+    global _pc
+    _pc = None
+
+
 def get_index():
     """
     Return a live handle to the Pinecone index.
@@ -55,7 +65,8 @@ def get_index():
     return _pc.Index(_index_name)
 
 
-def upsert_vectors(items: List[Dict[str, Any]]) -> bool:
+@timed("pinecone")
+def upsert_vectors(items: List[Dict[str, Any]], namespace: Optional[str] = None) -> bool:
     """
     Upsert a batch of embeddings.
     Each item: {'id': str, 'values': [...], 'metadata': {...}}
@@ -63,31 +74,121 @@ def upsert_vectors(items: List[Dict[str, Any]]) -> bool:
     try:
         idx = get_index()
         vectors = [(i["id"], i["values"], i.get("metadata", {})) for i in items]
-        idx.upsert(vectors=vectors)
+        if namespace:
+            idx.upsert(vectors=vectors, namespace=namespace)
+        else:
+            idx.upsert(vectors=vectors)
         return True
     except Exception as e:
         logger.error("Upsert failed: %s\n%s", e, traceback.format_exc())
         return False
 
 
+@timed("pinecone")
 def query_vectors(
     vector: List[float],
     top_k: int = 5,
     filter: Optional[Dict] = None,
     include_metadata: bool = True,
+    namespace: Optional[str] = None,
+    include_values: bool = False,
 ):
     """
     Query Pinecone for similar vectors.
     """
     try:
         idx = get_index()
+        kwargs = {"namespace": namespace} if namespace else {}
         res = idx.query(
             vector=vector,
             top_k=top_k,
             filter=filter,
             include_metadata=include_metadata,
+            include_values=include_values,
+            **kwargs,
         )
         return res
     except Exception as e:
         logger.error("Query failed: %s\n%s", e, traceback.format_exc())
         return None
+
+
+@timed("pinecone")
+def delete_vectors(ids: List[str], namespace: Optional[str] = None) -> bool:
+    """
+    Delete vectors by id.
+    """
+    if not ids:
+        return True
+    try:
+        idx = get_index()
+        ids = list(ids)
+        # Pinecone caps delete-by-id requests at 1000 ids
+        for i in range(0, len(ids), 1000):
+            if namespace:
+                idx.delete(ids=ids[i:i + 1000], namespace=namespace)
+            else:
+                idx.delete(ids=ids[i:i + 1000])
+        return True
+    except Exception as e:
+        logger.error("Delete failed: %s\n%s", e, traceback.format_exc())
+        return False
+
+
+@timed("pinecone")
+def count_vectors(namespace: Optional[str] = None) -> int:
+    """
+    Return the vector count for the whole index or a single namespace.
+    """
+    try:
+        stats = get_index().describe_index_stats()
+        if namespace:
+            namespaces = stats.get("namespaces", {}) or {}
+            ns = namespaces.get(namespace) or {}
+            return int(ns.get("vector_count", 0))
+        return int(stats.get("total_vector_count", 0))
+    except Exception as e:
+        logger.error("Stats failed: %s\n%s", e, traceback.format_exc())
+        return 0
+
+
+@timed("pinecone")
+def list_vector_ids(
+    namespace: Optional[str] = None,
+    limit: int = 100,
+    pagination_token: Optional[str] = None,
+):
+    """
+    List one page of vector ids (serverless indexes only).
+    Returns (ids, next_pagination_token).
+    """
+    idx = get_index()
+    kwargs = {"limit": limit, "namespace": namespace or ""}
+    if pagination_token:
+        kwargs["pagination_token"] = pagination_token
+    page = idx.list_paginated(**kwargs)
+    ids = [v.id for v in (page.vectors or [])]
+    pagination = getattr(page, "pagination", None)
+    return ids, getattr(pagination, "next", None) if pagination else None
+
+
+@timed("pinecone")
+def fetch_vectors(ids: List[str], namespace: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch vectors by id. Returns {id: {'values': [...], 'metadata': {...}}}.
+    """
+    if not ids:
+        return {}
+    try:
+        res = get_index().fetch(ids=list(ids), namespace=namespace or "")
+        vectors = getattr(res, "vectors", None) or res.get("vectors", {})
+        out = {}
+        for vid, v in vectors.items():
+            out[vid] = {
+                "values": list(getattr(v, "values", None) or v.get("values", [])),
+                "metadata": dict(getattr(v, "metadata", None) or v.get("metadata", {}) or {}),
+            }
+        return out
+    except Exception as e:
+        logger.error("Fetch failed: %s\n%s", e, traceback.format_exc())
+        return {}
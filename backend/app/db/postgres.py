@@ -1,8 +1,11 @@
 # backend/app/db/postgres.py
+import logging
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # ---------------- DATABASE CONNECTION ----------------
 def get_connection():
     return psycopg2.connect(
@@ -43,7 +46,7 @@ def create_tables():
     conn.commit()
     cur.close()
     conn.close()
-    print("✅ Tables created or verified: tasks, chat_history")
+    logger.info("Tables created or verified: tasks, chat_history")
 
 # ---------------- TASK FUNCTIONS ----------------
 def save_task(task_data: dict):
@@ -63,7 +66,7 @@ def save_task(task_data: dict):
     conn.commit()
     cur.close()
     conn.close()
-    print(f"✅ Task saved: {task_data.get('title')}")
+    logger.debug("Task saved")
 
 def get_tasks():
     conn = get_connection()
@@ -85,7 +88,7 @@ def save_chat(user_query: str, ai_response: str):
     conn.commit()
     cur.close()
     conn.close()
-    print(f"💬 Chat saved: {user_query[:40]}...")
+    logger.debug("Chat saved")
 
 def get_chat_history(limit: int = 10):
     """
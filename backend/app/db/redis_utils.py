@@ -1,6 +1,8 @@
 # redis_utils.py
 from app.config import settings
 import redis, json
+import redis.asyncio as aioredis
+import msgpack
 
 # Use Redis DB for chat history explicitly
 client = redis.Redis.from_url(settings.REDIS_URL_CHAT, decode_responses=True)
@@ -11,11 +13,15 @@ def get_redis_client():
 def _user_key(user_id: int) -> str:
     return f"{settings.REDIS_CHAT_HISTORY_KEY}:{user_id}"
 
+LAST_CHATS_KEPT = 10
+
 def save_chat_redis(user_id: int, user_message: str, bot_reply: str, chat_id: str | None = None):
     chat_entry = {"chat_id": chat_id, "user": user_message, "bot": bot_reply}
     key = _user_key(user_id)
-    client.lpush(key, json.dumps(chat_entry))
-    client.ltrim(key, 0, 9)  # keep only last 10 messages
+    pipe = client.pipeline()  # MULTI/EXEC: push and trim in one round trip
+    pipe.lpush(key, json.dumps(chat_entry))
+    pipe.ltrim(key, 0, LAST_CHATS_KEPT - 1)
+    pipe.execute()
 
 def get_last_chats(user_id: int, limit: int = 10):
     """
@@ -25,3 +31,230 @@ def get_last_chats(user_id: int, limit: int = 10):
     key = _user_key(user_id)
     chats = client.lrange(key, 0, limit-1)
     return [json.loads(c) for c in chats]
+
+
+# ======================================================
+# 🔹 User facts cache (write-through, see services/memory.py)
+# ======================================================
+# Hash per user; the "__loaded__" field marks a complete copy, so users with
+# no facts are cached too and single-field writes never create a partial hash.
+_FACTS_LOADED_FIELD = "__loaded__"
+
+# HSET only if the hash already holds a complete copy
+_HSET_IF_LOADED = client.register_script(
+    "if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then "
+    "redis.call('HSET', KEYS[1], ARGV[2], ARGV[3]) return 1 end return 0"
+)
+
+def _facts_key(user_id) -> str:
+    return f"user_facts:{user_id}"
+
+def get_cached_facts(user_id):
+    """
+    Cached {key: value} facts for a user, or None on a miss.
+    """
+    data = client.hgetall(_facts_key(user_id))
+    if not data or _FACTS_LOADED_FIELD not in data:
+        return None
+    data.pop(_FACTS_LOADED_FIELD)
+    return data
+
+def cache_facts(user_id, facts: dict):
+    key = _facts_key(user_id)
+    pipe = client.pipeline()
+    pipe.delete(key)
+    pipe.hset(key, mapping={_FACTS_LOADED_FIELD: "1", **{k: str(v) for k, v in facts.items()}})
+    pipe.expire(key, settings.FACTS_CACHE_TTL)
+    pipe.execute()
+
+def cache_fact_if_loaded(user_id, fact_key: str, value: str) -> bool:
+    return bool(_HSET_IF_LOADED(keys=[_facts_key(user_id)], args=[_FACTS_LOADED_FIELD, fact_key, str(value)]))
+
+def invalidate_cached_facts(user_id):
+    client.delete(_facts_key(user_id))
+
+
+# ======================================================
+# 🔹 Recent turns per chat (hot tier, see services/memory.py)
+# ======================================================
+# chat_turns:{user}:{chat} is a list of msgpack [row_id, user_query, ai_response]
+# holding a recent suffix of the chat's chat_history rows (at most
+# CHAT_HOT_TURNS entries / CHAT_HOT_MAX_BYTES). The companion :meta hash keeps
+# "hwm", the highest chat_history id written for the chat, and "bytes", the
+# list's size. Appends only extend an existing list and a fill never
+# overwrites one or loads data older than hwm, so a list is never missing a turn.
+_bin_client = redis.Redis.from_url(settings.REDIS_URL_CHAT)  # msgpack values: no decoding
+CHAT_TURNS_STATS_KEY = "chat_turns:stats"
+
+_TRIM_TO_CAPS = (
+    "local n = redis.call('LLEN', KEYS[1]) "
+    "local bytes = tonumber(redis.call('HGET', KEYS[2], 'bytes') or '0') "
+    "while n > 1 and (n > tonumber(ARGV[3]) or bytes > tonumber(ARGV[4])) do "
+    "  local old = redis.call('LPOP', KEYS[1]) "
+    "  bytes = redis.call('HINCRBY', KEYS[2], 'bytes', -#old) "
+    "  n = n - 1 "
+    "end "
+)
+
+# KEYS: list, meta; ARGV: row_id, entry, max_turns, max_bytes, ttl
+_APPEND_TURN = _bin_client.register_script(
+    "local hwm = redis.call('HGET', KEYS[2], 'hwm') "
+    "local id = tonumber(ARGV[1]) "
+    "if not hwm then redis.call('DEL', KEYS[1]) "  # list without meta: can't trust it
+    "elseif id < tonumber(hwm) then "  # turns saved out of order: drop the list, refill later
+    "  redis.call('DEL', KEYS[1]) redis.call('HSET', KEYS[2], 'bytes', 0) return -1 "
+    "elseif id == tonumber(hwm) then return 0 end "
+    "redis.call('HSET', KEYS[2], 'hwm', id) "
+    "redis.call('EXPIRE', KEYS[2], ARGV[5]) "
+    "if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end "
+    "redis.call('RPUSH', KEYS[1], ARGV[2]) "
+    "redis.call('HINCRBY', KEYS[2], 'bytes', #ARGV[2]) "
+    + _TRIM_TO_CAPS +
+    "redis.call('EXPIRE', KEYS[1], ARGV[5]) "
+    "return 1"
+)
+
+# KEYS: list, meta; ARGV: max_row_id, ttl, bytes, entries...
+_FILL_TURNS = _bin_client.register_script(
+    "local hwm = redis.call('HGET', KEYS[2], 'hwm') "
+    "if hwm and tonumber(hwm) > tonumber(ARGV[1]) then return 0 end "  # a newer turn landed meanwhile
+    "if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end "
+    "redis.call('RPUSH', KEYS[1], unpack(ARGV, 4)) "
+    "redis.call('HSET', KEYS[2], 'hwm', ARGV[1], 'bytes', ARGV[3]) "
+    "redis.call('EXPIRE', KEYS[1], ARGV[2]) "
+    "redis.call('EXPIRE', KEYS[2], ARGV[2]) "
+    "return 1"
+)
+
+# KEYS: list, stats
+_READ_TURNS = _bin_client.register_script(
+    "local items = redis.call('LRANGE', KEYS[1], 0, -1) "
+    "redis.call('HINCRBY', KEYS[2], #items > 0 and 'hits' or 'misses', 1) "
+    "return items"
+)
+
+def _turns_keys(user_id, chat_id):
+    key = f"chat_turns:{user_id}:{chat_id}"
+    return [key, f"{key}:meta"]
+
+def encode_turn(row_id: int, user_query: str, ai_response: str | None) -> bytes:
+    return msgpack.packb([row_id, user_query, ai_response or ""])
+
+def get_cached_turns(user_id, chat_id):
+    """
+    Cached turns for a chat, oldest first, as [(row_id, user_query, ai_response), ...];
+    None on a miss. Counts the hit or miss.
+    """
+    items = _READ_TURNS(keys=[_turns_keys(user_id, chat_id)[0], CHAT_TURNS_STATS_KEY])
+    if not items:
+        return None
+    return [tuple(msgpack.unpackb(i)) for i in items]
+
+def cache_turns(user_id, chat_id, entries: list, max_row_id: int) -> bool:
+    """
+    Load encoded turns (oldest first, already within the caps) into an empty
+    slot. Refused when the slot is filled or a newer turn has been saved since.
+    """
+    if not entries:
+        return False
+    args = [max_row_id, settings.CHAT_HOT_TTL, sum(len(e) for e in entries), *entries]
+    return bool(_FILL_TURNS(keys=_turns_keys(user_id, chat_id), args=args))
+
+def append_cached_turn(user_id, chat_id, row_id: int, user_query: str, ai_response: str | None) -> int:
+    """1 appended, 0 nothing cached to extend, -1 out-of-order save dropped the list."""
+    args = [row_id, encode_turn(row_id, user_query, ai_response),
+            settings.CHAT_HOT_TURNS, settings.CHAT_HOT_MAX_BYTES, settings.CHAT_HOT_TTL]
+    return _APPEND_TURN(keys=_turns_keys(user_id, chat_id), args=args)
+
+def invalidate_cached_turns(user_id, chat_id):
+    _bin_client.delete(_turns_keys(user_id, chat_id)[0])
+
+def invalidate_cached_turns_many(chats, batch: int = 1000) -> int:
+    """invalidate_cached_turns() for many (user_id, chat_id) pairs, pipelined."""
+    deleted = 0
+    pipe = _bin_client.pipeline(transaction=False)
+    for n, (user_id, chat_id) in enumerate(chats, 1):
+        pipe.delete(_turns_keys(user_id, chat_id)[0])
+        if n % batch == 0:
+            deleted += sum(pipe.execute())
+    deleted += sum(pipe.execute())
+    return deleted
+
+def get_chat_turns_stats() -> dict:
+    stats = {k.decode(): int(v) for k, v in _bin_client.hgetall(CHAT_TURNS_STATS_KEY).items()}
+    hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None}
+
+
+# ======================================================
+# 🔹 Async client (request handlers)
+# ======================================================
+# Handlers await these instead of calling the sync client on the event loop
+# or hopping to the threadpool. The pool holds at most REDIS_MAX_CONNECTIONS
+# connections; when all are busy callers wait up to REDIS_POOL_TIMEOUT
+# seconds for one rather than opening more. Multi-step operations are one
+# round trip each (MULTI/EXEC pipelines or a single command).
+_async_client = None
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL_CHAT,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            decode_responses=True,
+        )
+        _async_client = aioredis.Redis.from_pool(pool)
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def reset_after_fork():
+    """
+    Forget connections inherited from a preforking master (app/prefork.py).
+    They are not closed: the sockets are shared with the master. Each client
+    connects again on first use in the worker.
+    """
+    global _async_client
+    client.connection_pool.reset()
+    _bin_client.connection_pool.reset()
+    _async_client = None
+
+async def save_chat_redis_async(user_id: int, user_message: str, bot_reply: str, chat_id: str | None = None):
+    chat_entry = {"chat_id": chat_id, "user": user_message, "bot": bot_reply}
+    key = _user_key(user_id)
+    async with get_async_client().pipeline() as pipe:
+        pipe.lpush(key, json.dumps(chat_entry))
+        pipe.ltrim(key, 0, LAST_CHATS_KEPT - 1)
+        await pipe.execute()
+
+async def get_last_chats_async(user_id: int, limit: int = 10):
+    chats = await get_async_client().lrange(_user_key(user_id), 0, limit - 1)
+    return [json.loads(c) for c in chats]
+
+async def mark_greeted(user_id, ttl: int = 24 * 60 * 60) -> bool:
+    """
+    Set the user's daily greeting flag. True if this call set it (greet now),
+    False if it was already set; check and set are a single SET NX.
+    """
+    return bool(await get_async_client().set(f"greeted:{user_id}:daily", "1", nx=True, ex=ttl))
+
+async def get_cached_facts_async(user_id):
+    data = await get_async_client().hgetall(_facts_key(user_id))
+    if not data or _FACTS_LOADED_FIELD not in data:
+        return None
+    data.pop(_FACTS_LOADED_FIELD)
+    return data
+
+async def cache_facts_async(user_id, facts: dict):
+    key = _facts_key(user_id)
+    async with get_async_client().pipeline() as pipe:
+        pipe.delete(key)
+        pipe.hset(key, mapping={_FACTS_LOADED_FIELD: "1", **{k: str(v) for k, v in facts.items()}})
+        pipe.expire(key, settings.FACTS_CACHE_TTL)
+        await pipe.execute()
@@ -1,9 +1,13 @@
+import logging
 import psycopg
 from psycopg.extras import RealDictCursor  # ✅ Added to get dicts instead of tuples
 from app.config import settings
-from passlib.context import CryptContext
+from app.utils.passwords import get_context as get_password_context
+from app.utils.metrics import timed
 from typing import Optional, Dict
 
+logger = logging.getLogger(__name__)
+
 
 # ---------------- DATABASE CONNECTION ----------------
 def get_connection():
@@ -77,18 +81,44 @@ def create_tables():
         );
     """)
 
+    # Semantic memory ledger (vector ids, text, retention bookkeeping)
+    from app.db.vector_ledger import create_ledger_table
+    create_ledger_table(cur)
+
+    # Background fact extraction progress (last processed chat_history id per user)
+    from app.db.fact_checkpoints import create_checkpoint_table
+    create_checkpoint_table(cur)
+
     # Lightweight migrations for existing databases
     cur.execute("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS user_id INTEGER REFERENCES users(id) ON DELETE CASCADE;")
     cur.execute("ALTER TABLE chat_history ADD COLUMN IF NOT EXISTS user_id INTEGER REFERENCES users(id) ON DELETE CASCADE;")
     cur.execute("ALTER TABLE chat_history ADD COLUMN IF NOT EXISTS chat_id TEXT;")
+    # Due time a reminder job was enqueued for (services/reminders.py)
+    cur.execute("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS reminder_eta TIMESTAMP;")
+    # The reminder sweep only ever looks at pending tasks by due time
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_pending_due ON tasks (datetime) WHERE notified IS NOT TRUE;")
+    # Reminder digests: per-user preference and which tasks each digest covered
+    cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS reminder_digest BOOLEAN NOT NULL DEFAULT FALSE;")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_digests (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            task_ids INTEGER[] NOT NULL,
+            sent_at TIMESTAMP NOT NULL
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reminder_digests_user ON reminder_digests (user_id, sent_at);")
+    # History cache misses read a chat's latest turns (get_recent_turns)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_chat ON chat_history (user_id, chat_id, created_at);")
 
     conn.commit()
     cur.close()
     conn.close()
-    print("✅ Tables created or verified: tasks, chat_history")
+    logger.info("Tables created or verified: tasks, chat_history")
 
 
 # ---------------- TASK FUNCTIONS ----------------
+@timed("postgres")
 def save_task(task_data: dict):
     conn = get_connection()
     cur = conn.cursor()
@@ -96,7 +126,8 @@ def save_task(task_data: dict):
     # ✅ Fixed VALUES to match all 6 columns (notified added)
     cur.execute("""
         INSERT INTO tasks (user_id, title, datetime, priority, category, notes, notified)
-        VALUES (%s, %s, %s, %s, %s, %s, %s);
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        RETURNING id;
     """, (
         task_data.get("user_id"),
         task_data.get("title"),
@@ -106,13 +137,19 @@ def save_task(task_data: dict):
         task_data.get("notes", ""),
         False
     ))
+    task_id = cur.fetchone()["id"]
 
     conn.commit()
     cur.close()
     conn.close()
-    print(f"✅ Task saved: {task_data.get('title')}")
+    logger.debug("Task saved", extra={"task_id": task_id, "user_id": task_data.get("user_id")})
+
+    from app.services.reminders import schedule_reminder
+    schedule_reminder(task_id, task_data.get("datetime"))
+    return task_id
 
 
+@timed("postgres")
 def get_tasks(user_id: int):
     conn = get_connection()
     cur = conn.cursor()
@@ -123,27 +160,32 @@ def get_tasks(user_id: int):
     return rows
 
 
+@timed("postgres")
 def delete_task(user_id: int, task_id: int):
     """Delete a task for a specific user"""
     conn = get_connection()
     cur = conn.cursor()
     
     # Delete task only if it belongs to the user
-    cur.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s;", (task_id, user_id))
-    deleted_count = cur.rowcount
+    cur.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s RETURNING reminder_eta;", (task_id, user_id))
+    deleted = cur.fetchone()
     
     conn.commit()
     cur.close()
     conn.close()
     
-    if deleted_count > 0:
-        print(f"✅ Task {task_id} deleted for user {user_id}")
+    if deleted:
+        logger.debug("Task deleted", extra={"task_id": task_id, "user_id": user_id})
+        if deleted["reminder_eta"]:
+            from app.services.reminders import cancel_reminder
+            cancel_reminder(task_id, deleted["reminder_eta"])
         return True
     else:
-        print(f"❌ Task {task_id} not found or doesn't belong to user {user_id}")
+        logger.info("Task to delete not found", extra={"task_id": task_id, "user_id": user_id})
         return False
 
 
+@timed("postgres")
 def delete_completed_tasks(user_id: int):
     """Delete all tasks marked as completed (notified = TRUE) for the user."""
     conn = get_connection()
@@ -153,42 +195,60 @@ def delete_completed_tasks(user_id: int):
         deleted = cur.fetchall()
         conn.commit()
         deleted_count = len(deleted) if deleted else 0
-        print(f"✅ Deleted {deleted_count} completed tasks for user {user_id}")
+        logger.info("Deleted completed tasks", extra={"user_id": user_id, "count": deleted_count})
         return deleted_count
     except Exception as e:
         conn.rollback()
-        print(f"❌ Failed to delete completed tasks for user {user_id}: {e}")
+        logger.error("Failed to delete completed tasks", extra={"user_id": user_id, "error": str(e)})
         return 0
     finally:
         cur.close()
         conn.close()
 
 
+@timed("postgres")
 def set_task_notified(user_id: int, task_id: int, notified: bool):
     """Set the notified flag for a specific task belonging to a user."""
     conn = get_connection()
     cur = conn.cursor()
     try:
-        cur.execute("UPDATE tasks SET notified = %s WHERE id = %s AND user_id = %s RETURNING id;", (notified, task_id, user_id))
+        # The self-join returns the pre-update reminder_eta, so its job can be revoked
+        cur.execute(
+            """
+            UPDATE tasks t SET notified = %s, reminder_eta = NULL
+            FROM tasks old
+            WHERE t.id = %s AND t.user_id = %s AND old.id = t.id
+            RETURNING t.id, t.datetime, old.reminder_eta;
+            """,
+            (notified, task_id, user_id),
+        )
         updated = cur.fetchone()
         conn.commit()
-        return bool(updated)
     except Exception as e:
         conn.rollback()
-        print(f"❌ Failed to update task {task_id} for user {user_id}: {e}")
+        logger.error("Failed to update task", extra={"task_id": task_id, "user_id": user_id, "error": str(e)})
         return False
     finally:
         cur.close()
         conn.close()
 
+    if not updated:
+        return False
+    from app.services import reminders
+    if updated["reminder_eta"]:
+        reminders.cancel_reminder(task_id, updated["reminder_eta"])
+    if not notified:
+        # Back to pending: remind again (immediately if already past due)
+        reminders.schedule_reminder(task_id, updated["datetime"])
+    return True
+
 
 # ---------------- CHAT FUNCTIONS ----------------
+@timed("postgres")
 def save_chat(user_id: int, user_query: str, ai_response: str, chat_id: Optional[str] = None):
     conn = get_connection()
     cur = conn.cursor()
 
-    print(f"💾 Saving chat - user_id: {user_id}, chat_id: {chat_id}, query: {user_query[:40]}...")
-
     # Ensure the referenced user exists to avoid foreign key violations.
     try:
         cur.execute("SELECT id FROM users WHERE id = %s;", (user_id,))
@@ -198,7 +258,7 @@ def save_chat(user_id: int, user_query: str, ai_response: str, chat_id: Optional
         user_row = None
 
     if not user_row:
-        print(f"⚠️  User {user_id} not found in 'users' table. Creating placeholder user.")
+        logger.warning("User not found; creating a placeholder user", extra={"user_id": user_id})
         try:
             # Try to insert a placeholder user with the requested id. This handles cases where
             # tokens contain an externally-assigned numeric id.
@@ -209,11 +269,11 @@ def save_chat(user_id: int, user_query: str, ai_response: str, chat_id: Optional
             # Ensure the serial sequence for users.id is at least the current max id
             cur.execute("SELECT setval(pg_get_serial_sequence('users','id'), (SELECT MAX(id) FROM users));")
             conn.commit()
-            print(f"✅ Placeholder user {user_id} created.")
+            logger.info("Placeholder user created", extra={"user_id": user_id})
         except Exception as e:
             # If inserting with explicit id fails (e.g. sequence/permission), rollback and try
             # creating a user without specifying id and then use that id for the chat.
-            print(f"⚠️  Failed to insert placeholder user with id {user_id}: {e}. Trying fallback insert.")
+            logger.warning("Placeholder user insert failed; trying without the id", extra={"user_id": user_id, "error": str(e)})
             conn.rollback()
             try:
                 cur.execute(
@@ -224,11 +284,11 @@ def save_chat(user_id: int, user_query: str, ai_response: str, chat_id: Optional
                 if new_user:
                     # RealDictCursor returns a dict
                     new_id = new_user.get("id") if isinstance(new_user, dict) else new_user[0]
-                    print(f"✅ Fallback user created with id {new_id}; will use this id for chat.")
+                    logger.info("Fallback user created; saving the chat under its id", extra={"user_id": user_id, "new_user_id": new_id})
                     user_id = new_id
                 conn.commit()
             except Exception as e2:
-                print(f"❌ Fallback insert also failed: {e2}. Proceeding to attempt chat insert which may fail.")
+                logger.error("Fallback user insert failed; attempting the chat insert anyway", extra={"user_id": user_id, "error": str(e2)})
                 conn.rollback()
 
     try:
@@ -245,8 +305,10 @@ def save_chat(user_id: int, user_query: str, ai_response: str, chat_id: Optional
 
         cur.execute("""
             INSERT INTO chat_history (user_id, chat_id, user_query, ai_response)
-            VALUES (%s, %s, %s, %s);
+            VALUES (%s, %s, %s, %s)
+            RETURNING id;
         """, (user_id, used_chat_id, user_query, ai_response))
+        row_id = cur.fetchone()["id"]
 
         # Update chats.last_activity if the chat exists
         try:
@@ -255,11 +317,13 @@ def save_chat(user_id: int, user_query: str, ai_response: str, chat_id: Optional
             pass
 
         conn.commit()
-        print(f"💬 Chat saved: {user_query[:40]}... (chat_id={used_chat_id})")
+        logger.debug("Chat saved", extra={"user_id": user_id, "chat_id": used_chat_id, "row_id": row_id})
+        from app.services import memory
+        memory.record_chat_turn(user_id, used_chat_id, row_id, user_query, ai_response)
         return used_chat_id
     except Exception as e:
         conn.rollback()
-        print(f"❌ Failed to save chat for user {user_id}: {e}")
+        logger.error("Failed to save chat", extra={"user_id": user_id, "chat_id": chat_id, "error": str(e)})
         raise
     finally:
         cur.close()
@@ -267,6 +331,7 @@ def save_chat(user_id: int, user_query: str, ai_response: str, chat_id: Optional
 
 
 # ✅ Corrected to return dicts compatible with main.py
+@timed("postgres")
 def get_chat_history(user_id: int, limit: int = 10):
     """
     Fetch last N chats from PostgreSQL chat_history table.
@@ -284,6 +349,7 @@ def get_chat_history(user_id: int, limit: int = 10):
     finally:
         cur.close()
         conn.close()
+@timed("postgres")
 def get_conversations(user_id: int, limit: int = 50):
     """
     Returns latest conversations grouped by chat_id with a title inferred from first user message.
@@ -355,6 +421,7 @@ def get_conversations(user_id: int, limit: int = 50):
 
 
 # ---------------- PENDING TASKS ----------------
+@timed("postgres")
 def save_pending_task(user_id: int, title: str):
     conn = get_connection()
     cur = conn.cursor()
@@ -367,6 +434,7 @@ def save_pending_task(user_id: int, title: str):
     conn.close()
 
 
+@timed("postgres")
 def get_pending_task(user_id: int):
     conn = get_connection()
     cur = conn.cursor()
@@ -380,6 +448,7 @@ def get_pending_task(user_id: int):
     return row
 
 
+@timed("postgres")
 def delete_pending_task(pending_id: int):
     conn = get_connection()
     cur = conn.cursor()
@@ -389,6 +458,7 @@ def delete_pending_task(pending_id: int):
     conn.close()
 
 
+@timed("postgres")
 def get_messages_by_chat(user_id: int, chat_id: str, limit: int = 200):
     """Return ordered messages for a chat_id as list of dicts with role & content."""
     conn = get_connection()
@@ -436,8 +506,35 @@ def get_messages_by_chat(user_id: int, chat_id: str, limit: int = 200):
     return messages
 
 
+@timed("postgres")
+def get_recent_turns(user_id: int, chat_id: str, limit: int = 50):
+    """The chat's last `limit` turns, oldest first: [{"id", "user_query", "ai_response"}, ...]."""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT id, user_query, ai_response FROM (
+                SELECT id, user_query, ai_response, created_at
+                FROM chat_history
+                WHERE user_id = %s AND chat_id = %s
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+            ) recent
+            ORDER BY created_at ASC, id ASC;
+            """,
+            (user_id, chat_id, limit)
+        )
+        return cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+
+
 # ---------------- AUTH HELPERS ----------------
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+# Same argon2 parameters as the hashing pool (app/utils/passwords.py); the
+# API awaits the pool, these sync helpers are for scripts and tools
+pwd_context = get_password_context()
 
 def hash_password(plain_password: str) -> str:
     # Ensure password length compatibility for bcrypt; argon2 supports long inputs
@@ -448,12 +545,14 @@ def hash_password(plain_password: str) -> str:
 def verify_password(plain_password: str, password_hash: str) -> bool:
     return pwd_context.verify(plain_password, password_hash)
 
-def create_user(name: str, email: str, plain_password: str) -> Dict:
+@timed("postgres")
+def create_user(name: str, email: str, plain_password: str | None = None, password_hash: str | None = None) -> Dict:
+    """Create a user from a plain password, or from a hash computed elsewhere (the hashing pool)."""
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
         "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s) RETURNING id, name, email;",
-        (name, email, hash_password(plain_password))
+        (name, email, password_hash or hash_password(plain_password))
     )
     user = cur.fetchone()
     conn.commit()
@@ -461,6 +560,7 @@ def create_user(name: str, email: str, plain_password: str) -> Dict:
     conn.close()
     return user
 
+@timed("postgres")
 def get_user_by_email(email: str) -> Optional[Dict]:
     conn = get_connection()
     cur = conn.cursor()
@@ -471,6 +571,25 @@ def get_user_by_email(email: str) -> Optional[Dict]:
     return user
 
 
+@timed("postgres")
+def update_password_hash(user_id: int, password_hash: str) -> bool:
+    """Store a re-hashed password (argon2 parameters changed since it was set)."""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("UPDATE users SET password_hash = %s WHERE id = %s;", (password_hash, user_id))
+        conn.commit()
+        return cur.rowcount > 0
+    except Exception as e:
+        conn.rollback()
+        logger.error("Failed to update password hash", extra={"user_id": user_id, "error": str(e)})
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+@timed("postgres")
 def get_user_by_id(user_id: int) -> Optional[Dict]:
     """Return user dict for given id or None if not found."""
     conn = get_connection()
@@ -484,6 +603,26 @@ def get_user_by_id(user_id: int) -> Optional[Dict]:
         conn.close()
 
 
+@timed("postgres")
+def set_reminder_digest(user_id: int, enabled: bool) -> bool:
+    """Turn digest reminders (one email for tasks due together) on or off for a user."""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("UPDATE users SET reminder_digest = %s WHERE id = %s RETURNING id;", (enabled, user_id))
+        updated = cur.fetchone()
+        conn.commit()
+        return bool(updated)
+    except Exception as e:
+        conn.rollback()
+        logger.error("Failed to update reminder preference", extra={"user_id": user_id, "error": str(e)})
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+@timed("postgres")
 def update_user_profile(user_id: int, name: str | None = None, email: str | None = None):
     """Update user's name and/or email if provided."""
     if not name and not email:
@@ -500,7 +639,7 @@ def update_user_profile(user_id: int, name: str | None = None, email: str | None
         elif email:
             cur.execute("UPDATE users SET email = %s WHERE id = %s;", (email, user_id))
         conn.commit()
-        logger.info(f"Updated profile for user {user_id}: name={name}, email={email}")
+        logger.info("Updated profile", extra={"user_id": user_id, "name_changed": bool(name), "email_changed": bool(email)})
         return True
     except Exception:
         conn.rollback()
@@ -0,0 +1,211 @@
+# backend/app/db/vector_ledger.py
+"""
+Postgres ledger of every vector written to semantic memory.
+
+The vector store only keeps ids plus the small metadata needed for filtering
+(user_id, stored_at); text and any extra metadata live here. This makes
+retention enforceable (expired ids are enumerated here, not in Pinecone) and
+lets query results be hydrated with one bulk SELECT.
+"""
+
+import json
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+from app.db.utils import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Metadata kept on the vector itself; everything else goes to the ledger
+VECTOR_METADATA_KEYS = ("user_id", "stored_at")
+
+
+def create_ledger_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS semantic_vectors (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            namespace TEXT,
+            text TEXT,
+            metadata JSONB DEFAULT '{}'::jsonb,
+            hit_count INTEGER DEFAULT 1,
+            stored_at BIGINT NOT NULL,
+            last_seen_at BIGINT
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_semantic_vectors_stored_at ON semantic_vectors (stored_at);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_semantic_vectors_user ON semantic_vectors (user_id);")
+
+
+def slim_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Strip a metadata dict down to what the vector store needs.
+    """
+    return {k: metadata[k] for k in VECTOR_METADATA_KEYS if k in metadata}
+
+
+def record_vectors(rows: List[Dict[str, Any]], namespace: Optional[str] = None, skip_existing: bool = False) -> bool:
+    """
+    Insert ledger rows. Each row: {'id', 'user_id', 'text', 'stored_at', 'metadata'}.
+    """
+    if not rows:
+        return True
+    conflict = "DO NOTHING" if skip_existing else (
+        "DO UPDATE SET text = EXCLUDED.text, metadata = EXCLUDED.metadata, namespace = EXCLUDED.namespace"
+    )
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.executemany(
+            f"""
+            INSERT INTO semantic_vectors (id, user_id, namespace, text, metadata, hit_count, stored_at)
+            VALUES (%s, %s, %s, %s, %s::jsonb, %s, %s)
+            ON CONFLICT (id) {conflict};
+            """,
+            [
+                (
+                    r["id"],
+                    str(r["user_id"]),
+                    namespace,
+                    r.get("text"),
+                    json.dumps(r.get("metadata") or {}),
+                    int(r.get("hit_count", 1)),
+                    int(r["stored_at"]),
+                )
+                for r in rows
+            ],
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        logger.error("Vector ledger insert failed: %s", e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+def bump_hits(ids: List[str], seen_at: int) -> bool:
+    """
+    Increment hit_count for near-duplicate writes that were merged.
+    An id listed n times is incremented by n, in one statement.
+    """
+    if not ids:
+        return True
+    counts = Counter(ids)
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            UPDATE semantic_vectors s
+            SET hit_count = s.hit_count + c.n, last_seen_at = %s
+            FROM (SELECT unnest(%s::text[]) AS id, unnest(%s::int[]) AS n) c
+            WHERE s.id = c.id;
+            """,
+            (seen_at, list(counts.keys()), list(counts.values())),
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        logger.error("Vector ledger hit update failed: %s", e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_vectors(ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Bulk fetch ledger rows by id in a single SELECT.
+    """
+    if not ids:
+        return {}
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT id, user_id, namespace, text, metadata, hit_count, stored_at, last_seen_at
+            FROM semantic_vectors
+            WHERE id = ANY(%s);
+            """,
+            (list(ids),),
+        )
+        return {r["id"]: r for r in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def hydrate_matches(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fill match metadata (text, hit_count, extra metadata) from the ledger.
+    Vectors written before the ledger existed keep their inline metadata.
+    """
+    if not matches:
+        return matches
+    try:
+        rows = get_vectors([m["id"] for m in matches])
+    except Exception as e:
+        logger.error("Vector ledger hydration failed: %s", e)
+        return matches
+
+    for m in matches:
+        row = rows.get(m["id"])
+        if not row:
+            continue
+        extra = row.get("metadata") or {}
+        if isinstance(extra, str):
+            extra = json.loads(extra)
+        md = dict(extra)
+        md.update(m.get("metadata") or {})
+        md.update({
+            "user_id": row["user_id"],
+            "text": row["text"],
+            "stored_at": row["stored_at"],
+            "hit_count": row["hit_count"],
+        })
+        if row.get("last_seen_at"):
+            md["last_seen_at"] = row["last_seen_at"]
+        m["metadata"] = md
+    return matches
+
+
+def get_expired(cutoff: int, limit: int = 500) -> List[Dict[str, Any]]:
+    """
+    Oldest ledger rows stored before the cutoff (epoch seconds).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT id, namespace FROM semantic_vectors WHERE stored_at < %s ORDER BY stored_at LIMIT %s;",
+            (cutoff, limit),
+        )
+        return cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def delete_entries(ids: List[str]) -> int:
+    if not ids:
+        return 0
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM semantic_vectors WHERE id = ANY(%s);", (list(ids),))
+        deleted = cur.rowcount
+        conn.commit()
+        return deleted
+    except Exception as e:
+        conn.rollback()
+        logger.error("Vector ledger delete failed: %s", e)
+        return 0
+    finally:
+        cur.close()
+        conn.close()
@@ -0,0 +1,226 @@
+# backend/app/db/vector_store.py
+"""
+Vector store abstraction used by semantic memory.
+
+Every backend exposes the same four operations (upsert, query, delete, count)
+and returns plain dicts, so callers never deal with Pinecone response objects
+directly. Select the backend with VECTOR_STORE_BACKEND ("pinecone" or "local").
+
+Per-user data lives in its own namespace (user-<id>). SEMANTIC_NAMESPACE_MODE
+controls the cutover from the legacy shared index:
+    shared      read/write the shared index with a user_id filter (legacy)
+    dual        write to the user namespace, read both and merge
+    namespaced  read/write the user namespace only
+"""
+
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStore:
+    """
+    Minimal interface shared by all vector backends.
+
+    Items are {'id': str, 'values': [...], 'metadata': {...}}.
+    Query results are {'matches': [{'id':..., 'score':..., 'metadata':{...}}]}.
+    """
+
+    name = "base"
+
+    def upsert(self, items: List[Dict[str, Any]], namespace: Optional[str] = None) -> bool:
+        raise NotImplementedError
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict] = None,
+        namespace: Optional[str] = None,
+        include_metadata: bool = True,
+        include_values: bool = False,
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None) -> bool:
+        raise NotImplementedError
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def list_ids(
+        self, namespace: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Return one page of ids and the cursor for the next page (None when done).
+        """
+        raise NotImplementedError
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Return {id: {'values': [...], 'metadata': {...}}} for the ids that exist.
+        """
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """
+    Pinecone-backed store. Thin adapter over app.db.pinecone_utils.
+    """
+
+    name = "pinecone"
+
+    def __init__(self):
+        # Imported lazily so the local backend works without Pinecone credentials
+        from app.db import pinecone_utils
+        self._pc = pinecone_utils
+        self._pc.init_pinecone()
+
+    def upsert(self, items, namespace=None):
+        return self._pc.upsert_vectors(items, namespace=namespace)
+
+    def query(self, vector, top_k=5, filter=None, namespace=None, include_metadata=True, include_values=False):
+        res = self._pc.query_vectors(
+            vector=vector,
+            top_k=top_k,
+            filter=filter,
+            include_metadata=include_metadata,
+            namespace=namespace,
+            include_values=include_values,
+        )
+        if not res:
+            return {"matches": []}
+
+        # Normalize Pinecone response objects into plain dicts
+        matches = []
+        raw = getattr(res, "matches", None) or res.get("matches", [])
+        for m in raw:
+            match = {
+                "id": getattr(m, "id", None) or m.get("id"),
+                "score": getattr(m, "score", None) or m.get("score"),
+                "metadata": getattr(m, "metadata", None) or m.get("metadata", {}) or {},
+            }
+            if include_values:
+                match["values"] = list(getattr(m, "values", None) or m.get("values", []) or [])
+            matches.append(match)
+        return {"matches": matches}
+
+    def delete(self, ids, namespace=None):
+        return self._pc.delete_vectors(ids, namespace=namespace)
+
+    def count(self, namespace=None):
+        return self._pc.count_vectors(namespace=namespace)
+
+    def list_ids(self, namespace=None, limit=100, cursor=None):
+        return self._pc.list_vector_ids(namespace=namespace, limit=limit, pagination_token=cursor)
+
+    def fetch(self, ids, namespace=None):
+        return self._pc.fetch_vectors(ids, namespace=namespace)
+
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Return the process-wide vector store selected by settings.VECTOR_STORE_BACKEND.
+    """
+    global _store
+    if _store is not None:
+        return _store
+
+    with _store_lock:
+        if _store is None:
+            backend = (settings.VECTOR_STORE_BACKEND or "pinecone").lower()
+            if backend == "local":
+                from app.db.local_vector_store import LocalVectorStore
+                _store = LocalVectorStore(
+                    path=settings.LOCAL_VECTOR_STORE_PATH,
+                    index_type=settings.LOCAL_VECTOR_STORE_INDEX,
+                )
+            elif backend == "pinecone":
+                _store = PineconeVectorStore()
+            else:
+                raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+            logger.info("Vector store ready: %s", _store.name)
+    return _store
+
+
+def set_vector_store(store: Optional[VectorStore]) -> None:
+    """
+    Override the process-wide store (benchmarks, tests, offline tools).
+    """
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def reset_after_fork() -> None:
+    """
+    Called in each worker forked by app/prefork.py. A Pinecone store is
+    dropped so the worker opens its own HTTPS connections on first use. A
+    local store is kept: each worker goes on with its own copy of the index.
+    """
+    global _store
+    with _store_lock:
+        if _store is not None and _store.name == "pinecone":
+            from app.db import pinecone_utils
+            pinecone_utils.reset_client()
+            _store = None
+
+
+# ======================================================
+# 🔹 Per-user namespaces
+# ======================================================
+USER_NAMESPACE_PREFIX = "user-"
+
+
+def user_namespace(user_id) -> str:
+    return f"{USER_NAMESPACE_PREFIX}{user_id}"
+
+
+def _namespace_mode() -> str:
+    return (settings.SEMANTIC_NAMESPACE_MODE or "dual").lower()
+
+
+def write_namespace(user_id) -> Optional[str]:
+    """
+    Namespace new vectors for this user should be written to.
+    """
+    return None if _namespace_mode() == "shared" else user_namespace(user_id)
+
+
+def query_user_vectors(
+    user_id, vector: List[float], top_k: int = 5, include_metadata: bool = True, include_values: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Query a user's vectors according to SEMANTIC_NAMESPACE_MODE.
+    During the dual-read cutover, results from the user namespace and the legacy
+    shared index are merged by id (migrated copies keep their id) and score.
+    """
+    store = get_vector_store()
+    mode = _namespace_mode()
+    legacy_filter = {"user_id": {"$eq": user_id}}
+
+    if mode == "shared":
+        return store.query(vector=vector, top_k=top_k, filter=legacy_filter, include_metadata=include_metadata, include_values=include_values).get("matches", [])
+
+    matches = store.query(
+        vector=vector, top_k=top_k, namespace=user_namespace(user_id),
+        include_metadata=include_metadata, include_values=include_values,
+    ).get("matches", [])
+    if mode != "dual":
+        return matches
+
+    legacy = store.query(vector=vector, top_k=top_k, filter=legacy_filter, include_metadata=include_metadata, include_values=include_values).get("matches", [])
+    merged: Dict[str, Dict[str, Any]] = {}
+    for m in matches + legacy:
+        prev = merged.get(m["id"])
+        if prev is None or (m.get("score") or 0) > (prev.get("score") or 0):
+            merged[m["id"]] = m
+    return sorted(merged.values(), key=lambda m: m.get("score") or 0, reverse=True)[:top_k]
@@ -1,19 +1,24 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, Body
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, Body, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+import asyncio
+import hmac
 import logging
 import jwt
 
-from app.services import ai_services, nlu
+from app.services import ai_services, nlu, memory, intent_classifier, document_ingest
 from app.db import utils as db_utils
 from app.db.utils import create_tables, save_chat, get_chat_history, get_conversations, get_messages_by_chat, delete_task, get_user_by_id  # correct import
-from app.db.neo4j_utils import save_fact_neo4j, get_fact_neo4j, get_all_facts_for_user, get_facts_neo4j
-from app.db.redis_utils import save_chat_redis, get_last_chats
+from app.db.neo4j_utils import ensure_constraints, close_driver, close_async_driver
+from app.db.redis_utils import save_chat_redis_async, get_last_chats_async, mark_greeted, close_async_client
 from app.config import settings
 from app.api.auth import router as auth_router
-from app.db.redis_utils import get_redis_client
+from app.utils import passwords, metrics, profiler
+from app.utils.logging_setup import configure_logging, shutdown_logging, RequestIdMiddleware
 
+configure_logging()
 app = FastAPI(title="Personal AI Assistant")
 logger = logging.getLogger(__name__)
 
@@ -23,12 +28,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
+# Per-stage timings as a Server-Timing header; histograms on /metrics
+app.add_middleware(metrics.ServerTimingMiddleware)
+# Marks /chat/ requests in flight for an active POST /admin/profile session
+app.add_middleware(profiler.ProfileRequestsMiddleware)
+# Outermost, so every log line of a request carries its request id
+app.add_middleware(RequestIdMiddleware)
 
 @app.on_event("startup")
 async def startup_event():
     await run_in_threadpool(create_tables)
     logger.info("✅ Tables checked/created (tasks, chat_history)")
+    await run_in_threadpool(ensure_constraints)
+    await run_in_threadpool(passwords.start_pool)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_async_driver()
+    await close_async_client()
+    await run_in_threadpool(close_driver)
+    passwords.shutdown_pool()
+    document_ingest.shutdown()
+    shutdown_logging()
 
 app.include_router(auth_router)
 
@@ -66,16 +90,14 @@ async def greet(token: str, chat_id: str | None = None):
             user_name = None
             user_email = None
 
-    # Track greeting per-user globally (so user hears greeting once per day)
-    greeted = False
-    greeting_key = f"greeted:{user_id}:daily"
+    # Track greeting per-user globally (so user hears greeting once per day):
+    # one SET NX with a 24h TTL both checks and marks the flag
     try:
-        redis = get_redis_client()
-        greeted = bool(redis.get(greeting_key))
+        first_today = await mark_greeted(user_id)
     except Exception:
-        greeted = False
+        first_today = True
 
-    if greeted:
+    if not first_today:
         return {"greeted": True, "message": None}
 
     # Compose a friendly greeting
@@ -84,13 +106,6 @@ async def greet(token: str, chat_id: str | None = None):
     else:
         message = "Hello! How can I assist you today?"
 
-    # Mark as greeted in Redis with a TTL (24 hours)
-    try:
-        if redis:
-            redis.set(greeting_key, "1", ex=24 * 60 * 60)
-    except Exception:
-        pass
-
     return {"greeted": False, "message": message}
 
 class ChatRequest(BaseModel):
@@ -124,6 +139,78 @@ async def debug_token(payload: dict):
         return {"ok": False, "error": str(e)}
 
 
+@app.get("/debug/semantic-stats")
+async def debug_semantic_stats():
+    """Dev-only: semantic memory write dedup and retrieval pruning counters."""
+    from app.services.semantic_memory import get_dedup_stats
+    from app.services.retrieval import get_retrieval_stats
+    return {"ok": True, "dedup": get_dedup_stats(), "retrieval": get_retrieval_stats()}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+
+@app.post("/admin/profile")
+async def admin_profile(
+    requests: int = 20,
+    seconds: float = 30,
+    interval_ms: float = 5,
+    x_admin_token: str = Header(None),
+):
+    """
+    Admin-only: sample live /chat/ requests until `requests` of them have
+    finished or `seconds` have passed, and return the collapsed stacks
+    (feed to flamegraph.pl or open in speedscope). Only sampled while a
+    profiled request is in flight; one session at a time.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if requests < 0 or seconds <= 0 or interval_ms < 1:
+        raise HTTPException(status_code=400, detail="requests >= 0, seconds > 0 and interval_ms >= 1 required")
+
+    try:
+        session = profiler.start_session(interval_ms / 1000, requests)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        await asyncio.wait_for(session.done.wait(), min(seconds, settings.PROFILER_MAX_SECONDS))
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        await run_in_threadpool(profiler.stop_session, session)
+
+    summary = session.summary()
+    logger.info(f"📈 Profile collected: {summary}")
+    headers = {f"X-Profile-{k.replace('_', '-').title()}": str(v) for k, v in summary.items()}
+    return PlainTextResponse(session.collapsed(), headers=headers)
+
+
+@app.get("/debug/reminder-stats")
+async def debug_reminder_stats():
+    """Dev-only: reminder delivery lag (due time → email sent) over recent reminders."""
+    from app.services.reminders import get_reminder_stats
+    return {"ok": True, "reminders": await run_in_threadpool(get_reminder_stats)}
+
+
+@app.get("/debug/mail-stats")
+async def debug_mail_stats():
+    """Dev-only: outbound mail queue depth, dead letters and send/retry counters."""
+    from app.services.mail_queue import get_mail_stats
+    return {"ok": True, "mail": await run_in_threadpool(get_mail_stats)}
+
+
+@app.get("/debug/chat-cache-stats")
+async def debug_chat_cache_stats():
+    """Dev-only: hit rate of the per-chat recent turns cache used for prompt history."""
+    from app.db.redis_utils import get_chat_turns_stats
+    return {"ok": True, "chat_turns": await run_in_threadpool(get_chat_turns_stats)}
+
+
 @app.get("/debug/chat")
 async def debug_chat(token: str, chat_id: str):
     """Dev-only: return persisted messages for chat_id as seen by get_messages_by_chat"""
@@ -143,23 +230,23 @@ async def chat(request: ChatRequest):
     user_id = get_current_user_id(request.token)
     chat_id = request.chat_id
     
-    print(f"🔍 Chat request - user_id: {user_id}, chat_id: {chat_id}, message: {user_message[:50]}...")
+    logger.debug("Chat request", extra={"user_id": user_id, "chat_id": chat_id, "message_chars": len(user_message)})
     
     try:
         # ---------- Determine intent ----------
-        structured = nlu.get_structured_intent(user_message)
+        with metrics.span("chat.intent"):
+            structured = nlu.get_structured_intent(user_message)
+            if structured.get("action") == "general_chat" and settings.INTENT_CLASSIFIER_ENABLED:
+                # Paraphrases the rules miss ("don't let me forget to ...")
+                structured = await run_in_threadpool(intent_classifier.refine_intent, user_message)
         action = structured.get("action")
 
         # Quick answers: if user asks about their name/email or just greets, prefer DB/token lookup
         try:
             norm = (user_message or "").lower().strip()
-            import re
 
             # Greeting detection (user says hi/hello/...)
-            greeting_match = bool(re.match(r'^\s*(?:hi|hello|hey|greetings|good morning|good afternoon|good evening)\b(?:\s+\S{1,30}){0,3}[,!.\-]*\s*', norm, re.IGNORECASE))
-
-            name_queries = ["what is my name", "what's my name", "who am i", "do you know my name", "my name"]
-            email_queries = ["what is my email", "what's my email", "what is my e-mail", "my email"]
+            greeting_match = bool(nlu.GREETING_RE.match(norm))
 
             # If user greets, respond with a personalized greeting when possible
             if greeting_match:
@@ -186,13 +273,13 @@ async def chat(request: ChatRequest):
 
                 # Save chat and return immediately
                 await run_in_threadpool(save_chat, user_id, user_message, reply, chat_id)
-                await run_in_threadpool(save_chat_redis, user_id, user_message, reply, chat_id)
+                await save_chat_redis_async(user_id, user_message, reply, chat_id)
                 return {"success": True, "reply": reply, "intent": structured, "chat_id": chat_id}
 
         
             # Quick identity queries (name/email)
             
-            if any(q in norm for q in name_queries):
+            if nlu.NAME_QUERY_RE.search(norm):
                 # try token payload first
                 try:
                     payload = jwt.decode(request.token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
@@ -216,10 +303,10 @@ async def chat(request: ChatRequest):
 
                 # Save chat and return immediately
                 await run_in_threadpool(save_chat, user_id, user_message, reply, chat_id)
-                await run_in_threadpool(save_chat_redis, user_id, user_message, reply, chat_id)
+                await save_chat_redis_async(user_id, user_message, reply, chat_id)
                 return {"success": True, "reply": reply, "intent": structured, "chat_id": chat_id}
 
-            if any(q in norm for q in email_queries):
+            if nlu.EMAIL_QUERY_RE.search(norm):
                 try:
                     payload = jwt.decode(request.token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
                     email_from_token = payload.get("email")
@@ -240,7 +327,7 @@ async def chat(request: ChatRequest):
                         reply = "I don't have your email yet. Please provide it if you'd like notifications."
 
                 await run_in_threadpool(save_chat, user_id, user_message, reply, chat_id)
-                await run_in_threadpool(save_chat_redis, user_id, user_message, reply, chat_id)
+                await save_chat_redis_async(user_id, user_message, reply, chat_id)
                 return {"success": True, "reply": reply, "intent": structured, "chat_id": chat_id}
         except Exception:
             # if any error in quick path, proceed to normal AI flow
@@ -256,18 +343,25 @@ async def chat(request: ChatRequest):
             logging.getLogger(__name__).exception(f"Failed to persist profile for user {user_id}: {e}")
 
         # ---------- Fetch global context ----------
-        # 1️⃣ Build history text from DB by chat_id if provided; fallback to recent chats
+        # 1️⃣ Build history text from the chat's recent turns (Redis, Postgres on a miss); fallback to recent chats
         history_text = ""
-        if chat_id:
-            msgs = await run_in_threadpool(get_messages_by_chat, user_id, chat_id, 50)
-            history_text = "\n".join([f"{'Human' if m['sender']=='user' else 'Assistant'}: {m['content']}" for m in msgs])
-        else:
-            extra_chats = await run_in_threadpool(get_chat_history, user_id, 10)
-            history_text = "\n".join([f"Human: {c['user_query']}\nAssistant: {c['ai_response']}" for c in extra_chats])
+        with metrics.span("chat.history"):
+            if chat_id:
+                turns = await run_in_threadpool(memory.get_recent_turns, user_id, chat_id)
+                if turns:
+                    history_text = "\n".join(f"Human: {q}\nAssistant: {a}" if a else f"Human: {q}" for _, q, a in turns)
+                elif chat_id.isdigit():
+                    # Older clients may pass a chat_history row id as chat_id
+                    msgs = await run_in_threadpool(get_messages_by_chat, user_id, chat_id, 50)
+                    history_text = "\n".join([f"{'Human' if m['sender']=='user' else 'Assistant'}: {m['content']}" for m in msgs])
+            else:
+                extra_chats = await run_in_threadpool(get_chat_history, user_id, 10)
+                history_text = "\n".join([f"Human: {c['user_query']}\nAssistant: {c['ai_response']}" for c in extra_chats])
 
-        # 3️⃣ Fetch all facts from Neo4j
-        facts_list = await run_in_threadpool(get_facts_neo4j, user_id)
-        facts_text = "\n".join([f"{fact['key']}: {fact['value']}" for fact in facts_list])
+        # 3️⃣ Fetch all facts (Redis cache, Neo4j on a miss)
+        with metrics.span("chat.facts"):
+            facts = await memory.get_all_user_facts_async(user_id)
+        facts_text = "\n".join([f"{key}: {value}" for key, value in facts.items()])
 
         # ---------- Handle actions ----------
         if action == "general_chat":
@@ -311,8 +405,7 @@ async def chat(request: ChatRequest):
                         # or already mentions their name in the opening chunk.
                         first_chunk = (response or "")[:200]
                         try:
-                            import re
-                            starts_with_greeting = bool(re.match(r"^\s*(hi|hello|hey|greetings|good morning|good afternoon|good evening)\b", first_chunk, re.IGNORECASE))
+                            starts_with_greeting = bool(nlu.GREETING_RE.match(first_chunk))
                         except Exception:
                             starts_with_greeting = False
 
@@ -339,11 +432,9 @@ async def chat(request: ChatRequest):
             # to avoid the model greeting on every turn (the frontend also has a one-time greeting).
             if not is_new_conversation_check and response:
                 try:
-                    import re
-                    # Safer regex: match leading greeting words and up to 3 short tokens after them
+                    # Match leading greeting words and up to 3 short tokens after them
                     # Example matches: "Hello John, how are you?" -> "how are you?"
-                    pattern = r'^\s*(?:hi|hello|hey|greetings|good morning|good afternoon|good evening)\b(?:\s+\S{1,30}){0,3}[,!.\-]*\s*'
-                    stripped = re.sub(pattern, '', response, flags=re.IGNORECASE)
+                    stripped = nlu.GREETING_RE.sub('', response)
                     # Only replace if something meaningful remains; otherwise keep original
                     if stripped and stripped.strip():
                         response = stripped
@@ -352,9 +443,10 @@ async def chat(request: ChatRequest):
                     pass
 
             # Save chat for this user; ensure we get a canonical chat_id back
-            saved_chat_id = await run_in_threadpool(save_chat, user_id, user_message, response, chat_id)
-            # propagate to redis and response
-            await run_in_threadpool(save_chat_redis, user_id, user_message, response, saved_chat_id)
+            with metrics.span("chat.persist"):
+                saved_chat_id = await run_in_threadpool(save_chat, user_id, user_message, response, chat_id)
+                # propagate to redis and response
+                await save_chat_redis_async(user_id, user_message, response, saved_chat_id)
 
             return {"success": True, "reply": response, "intent": structured, "chat_id": saved_chat_id}
 
@@ -379,7 +471,7 @@ async def chat(request: ChatRequest):
                         await run_in_threadpool(db_utils.delete_pending_task, pending_id)
                         confirmation_message = f"Task saved: {pending_title} due {parsed_time}"
                         saved_chat_id = await run_in_threadpool(save_chat, user_id, user_message, confirmation_message, chat_id)
-                        await run_in_threadpool(save_chat_redis, user_id, user_message, confirmation_message, saved_chat_id)
+                        await save_chat_redis_async(user_id, user_message, confirmation_message, saved_chat_id)
                         return {"success": True, "reply": confirmation_message, "status": "✅ Task saved", "task": data_with_user}
 
                 # Default: ask follow-up for datetime and save pending task
@@ -390,7 +482,7 @@ async def chat(request: ChatRequest):
                 await run_in_threadpool(db_utils.save_pending_task, user_id, task_data.get('title'))
                 # Save the chat but don't create the DB task yet
                 saved_chat_id = await run_in_threadpool(save_chat, user_id, user_message, follow_up, chat_id)
-                await run_in_threadpool(save_chat_redis, user_id, user_message, follow_up, saved_chat_id)
+                await save_chat_redis_async(user_id, user_message, follow_up, saved_chat_id)
                 return {"success": True, "reply": follow_up, "status": "awaiting_time", "task": task_data, "chat_id": saved_chat_id}
 
             # attach user_id and persist
@@ -399,7 +491,7 @@ async def chat(request: ChatRequest):
             confirmation_message = f"Task saved: {task_data['title']} due {task_data['datetime']}"
 
             saved_chat_id = await run_in_threadpool(save_chat, user_id, user_message, confirmation_message, chat_id)
-            await run_in_threadpool(save_chat_redis, user_id, user_message, confirmation_message, saved_chat_id)
+            await save_chat_redis_async(user_id, user_message, confirmation_message, saved_chat_id)
 
             return {"success": True, "reply": confirmation_message, "status": "✅ Task saved", "task": task_data, "chat_id": saved_chat_id}
 
@@ -421,7 +513,7 @@ async def chat(request: ChatRequest):
         elif action == "save_fact":
             key = structured["data"]["key"]
             value = structured["data"]["value"]
-            await run_in_threadpool(save_fact_neo4j, key, value)
+            await run_in_threadpool(memory.save_user_fact, str(user_id), key, value)
 
             confirmation_message = f"I have saved the fact '{key}: {value}' in your knowledge base."
             confirm_msg_dict = {"sender": str(user_id), "text": confirmation_message}  # ✅ wrapped
@@ -465,13 +557,13 @@ async def chat(request: ChatRequest):
             # Save the command like any other chat
             confirmation = f"Opening {target} for: {query}" if open_url else f"Could not open target: {target}"
             saved_chat_id = await run_in_threadpool(save_chat, user_id, user_message, confirmation, chat_id)
-            await run_in_threadpool(save_chat_redis, user_id, user_message, confirmation, saved_chat_id)
+            await save_chat_redis_async(user_id, user_message, confirmation, saved_chat_id)
 
             return {"success": True, "reply": confirmation, "intent": structured, "open_url": open_url, "chat_id": chat_id}
 
         elif action == "get_chat_history":
             # Return last 10 chats from Redis globally
-            history = await run_in_threadpool(get_last_chats, user_id)
+            history = await get_last_chats_async(user_id)
             return {"success": True, "history": history, "intent": structured}
 
         else:
@@ -565,6 +657,21 @@ async def api_update_task_status(task_id: int, token: str, status: str):
         raise HTTPException(status_code=500, detail="Failed to update task status")
 
 
+@app.patch("/api/preferences/reminders")
+async def api_update_reminder_preferences(token: str, digest: bool):
+    """Digest mode: tasks due within REMINDER_DIGEST_WINDOW of each other arrive in one email."""
+    try:
+        user_id = get_current_user_id(token)
+        if not await run_in_threadpool(db_utils.set_reminder_digest, user_id, digest):
+            raise HTTPException(status_code=404, detail="User not found")
+        return {"success": True, "digest": digest}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error updating reminder preferences: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update reminder preferences")
+
+
 @app.get("/api/conversations")
 async def api_get_conversations(token: str):
     try:
@@ -605,23 +712,42 @@ async def chat_with_upload(
         except Exception:
             user_text = str(prompt)
 
-        # We don't process the file contents in this stub; ensure read to avoid warnings
-        await file.read()  # discard
+        # Stream the upload to a temp file, then chunk/embed/store it in the background
+        try:
+            kind = document_ingest.detect_kind(file.filename, file.content_type)
+            path, size = await run_in_threadpool(document_ingest.spool_upload, file.file, file.filename)
+        except document_ingest.UnsupportedDocument as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except document_ingest.UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        job = document_ingest.submit(user_id, path, file.filename, kind, query=user_text)
+
+        # Ground the reply in the most relevant chunks; a large document keeps
+        # ingesting after INGEST_WAIT_SECONDS and the reply uses what is ranked so far
+        ingest_done = asyncio.wrap_future(job.future)
+        await asyncio.wait([ingest_done], timeout=settings.INGEST_WAIT_SECONDS)
+        if not ingest_done.done():
+            ingest_done.add_done_callback(lambda f: f.cancelled() or f.exception())
+        chunks = job.best_chunks()
+        if job.error and not chunks:
+            raise HTTPException(status_code=422, detail=f"Could not read the uploaded document: {job.error}")
 
-        # Create a simple response using AI service context if available
         user_msg_dict = {"sender": str(user_id), "text": user_text}
         ai_reply = await run_in_threadpool(
             ai_services.get_response,
             user_msg_dict,
             history="",
+            pinecone_context=document_ingest.format_context(job, chunks),
             neo4j_facts=""
         )
 
         # Save entries
         await run_in_threadpool(save_chat, user_id, user_text, ai_reply, chat_id)
-        await run_in_threadpool(save_chat_redis, user_id, user_text, ai_reply, chat_id)
+        await save_chat_redis_async(user_id, user_text, ai_reply, chat_id)
 
-        return {"success": True, "response": ai_reply}
+        return {"success": True, "response": ai_reply, "document": {**job.status(), "bytes": size}}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Upload chat failed: {e}")
         raise HTTPException(status_code=500, detail="Upload chat failed")
\ No newline at end of file
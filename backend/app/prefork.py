@@ -0,0 +1,344 @@
+# backend/app/prefork.py
+"""
+Preforking API server
+---------------------
+`uvicorn --workers N` starts N fresh interpreters, and each one imports
+torch and loads its own SentenceTransformer: a few hundred MB per worker.
+This launcher loads the app once in a master process instead: the embedding
+model, the intent classifier's prototype vectors (when enabled) and the rest of what
+importing app.main builds. It then forks N workers that accept on the same
+listening socket. Nothing writes to the model weights after loading, so
+their pages stay shared copy-on-write between the workers. gc.freeze() keeps
+the collector from writing to the preloaded objects (and so copying their
+pages) in every worker.
+
+Anything that owns sockets, threads or processes is per worker:
+    recreated after the fork   Redis clients, Neo4j drivers, the Pinecone
+                               client, the logging listener thread
+    created in the worker      the password-hash process pool (startup
+                               event), the document ingest threads (lazily)
+Postgres opens a connection per call, so there is nothing to reset there.
+The master stops its logging thread around each fork and keeps no other
+threads, so no lock is inherited mid-use.
+
+Per worker:
+    - torch gets WORKER_TORCH_THREADS intra-op threads (default: usable CPUs
+      / workers), so N workers encoding at once do not oversubscribe the cores
+    - Prometheus histograms go to per-process files in PROMETHEUS_MULTIPROC_DIR
+      (a temp dir unless set) and /metrics merges them
+    - POST /admin/profile only samples the worker that receives it
+    - with VECTOR_STORE_BACKEND=local each worker has its own copy of the
+      index and does not see the others' writes; use Pinecone with workers > 1
+
+The master restarts workers that exit (waiting longer each time one dies
+soon after starting) and on SIGTERM/SIGINT gives them WORKER_GRACEFUL_TIMEOUT
+seconds to finish in-flight requests before killing them.
+
+Measure per-worker memory (RSS/PSS/USS) and throughput against the worker
+count with app/tools/bench_prefork.py.
+
+Usage:
+    python -m app.prefork --port 5000                 # WEB_CONCURRENCY workers
+    python -m app.prefork --port 5000 --workers 4
+    python -m app.prefork --port 5000 --no-preload    # each worker loads its own model (for comparison)
+"""
+
+import argparse
+import gc
+import glob
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from app.config import settings
+from app.utils.logging_setup import configure_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+# Restart backoff for workers that die within MIN_WORKER_LIFETIME seconds
+MIN_WORKER_LIFETIME = 10.0
+MAX_RESTART_DELAY = 30.0
+
+
+def usable_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # respects the container's cpuset
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(requested: Optional[int] = None) -> int:
+    requested = requested or settings.WEB_CONCURRENCY
+    return requested if requested > 0 else usable_cpus()
+
+
+def torch_threads_per_worker(workers: int, requested: Optional[int] = None) -> int:
+    requested = requested or settings.WORKER_TORCH_THREADS
+    return requested if requested > 0 else max(1, usable_cpus() // max(1, workers))
+
+
+def prepare_metrics_dir() -> Optional[str]:
+    """
+    Point prometheus_client at a per-run directory of per-process files.
+    Must run before prometheus_client is imported. Returns the directory if
+    this call created it (to be removed on exit).
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for stale in glob.glob(os.path.join(path, "*.db")):
+            os.unlink(stale)  # samples from an earlier run would be merged in
+        return None
+    path = tempfile.mkdtemp(prefix="prometheus-")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+# ======================================================
+# 🔹 App preload and per-worker reset
+# ======================================================
+def load_app():
+    """Import the app and build the read-only state the workers share."""
+    try:
+        import torch
+        # No intra-op pool threads in the master: threads do not survive a fork
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    try:
+        from tqdm import tqdm
+        tqdm.monitor_interval = 0  # model loading progress bars would leave a monitor thread
+    except ImportError:
+        pass
+
+    from app.main import app
+    from app.services import intent_classifier
+
+    if settings.INTENT_CLASSIFIER_ENABLED:
+        try:
+            intent_classifier.get_classifier().scores("hello")  # embeds the prototype phrasings
+        except Exception as e:
+            logger.warning("Intent classifier not preloaded", extra={"error": str(e)})
+    return app
+
+
+def reinit_worker():
+    """Recreate the per-process resources a worker inherited from the master."""
+    from app.db import neo4j_utils, redis_utils, vector_store
+
+    redis_utils.reset_after_fork()
+    neo4j_utils.reset_after_fork()
+    vector_store.reset_after_fork()
+
+
+def _configure_torch_threads(threads: int):
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+
+# ======================================================
+# 🔹 Master
+# ======================================================
+class Master:
+    """
+    Forks `workers` processes that each run uvicorn on the shared socket.
+    With preload, `load` runs once here before the first fork; otherwise in
+    every worker. `after_fork` runs in each worker right after the fork.
+    """
+
+    def __init__(self, load: Callable, workers: int, host: str, port: int, preload: bool = True,
+                 after_fork: Optional[Callable[[], None]] = None, torch_threads: int = 1,
+                 graceful_timeout: Optional[float] = None, uvicorn_options: Optional[dict] = None):
+        self.load = load
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.preload = preload
+        self.after_fork = after_fork
+        self.torch_threads = torch_threads
+        self.graceful_timeout = settings.WORKER_GRACEFUL_TIMEOUT if graceful_timeout is None else graceful_timeout
+        self.uvicorn_options = uvicorn_options or {}
+        self.app = None
+        self.sock: Optional[socket.socket] = None
+        self.children: Dict[int, dict] = {}  # pid -> {"slot", "started"}
+        self.restart_delay: Dict[int, float] = {}  # slot -> seconds
+        self.stopping = False
+
+    def run(self) -> int:
+        self.sock = socket.create_server((self.host, self.port), backlog=2048)
+        self.port = self.sock.getsockname()[1]
+
+        if self.preload:
+            started = time.perf_counter()
+            self.app = self.load()
+            gc.collect()
+            gc.freeze()  # later collections in the workers skip (and do not copy) the preloaded objects
+            logger.info("Preloaded the app in the master", extra={"seconds": round(time.perf_counter() - started, 2)})
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_stop_signal)
+        logger.info("Starting workers", extra={
+            "workers": self.workers, "port": self.port, "preload": self.preload, "torch_threads": self.torch_threads,
+        })
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+        pending: Dict[int, float] = {}  # slot -> restart time
+        while not self.stopping:
+            time.sleep(0.2)
+            for pid, slot, status in self._reap():
+                lived = time.monotonic() - self.children.pop(pid)["started"]
+                if self.stopping:
+                    continue
+                delay = self._next_delay(slot, lived)
+                logger.error("Worker exited; restarting it", extra={
+                    "worker_pid": pid, "slot": slot, "status": _describe(status), "restart_in": delay,
+                })
+                pending[slot] = time.monotonic() + delay
+            for slot, at in list(pending.items()):
+                if not self.stopping and time.monotonic() >= at:
+                    del pending[slot]
+                    self._spawn(slot)
+
+        self._stop_children()
+        self.sock.close()
+        return 0
+
+    def _next_delay(self, slot: int, lived: float) -> float:
+        if lived >= MIN_WORKER_LIFETIME:
+            delay = 1.0
+        else:
+            delay = min(self.restart_delay.get(slot, 0.5) * 2, MAX_RESTART_DELAY)
+        self.restart_delay[slot] = delay
+        return delay
+
+    def _on_stop_signal(self, signum, frame):
+        self.stopping = True
+
+    def _spawn(self, slot: int):
+        shutdown_logging()  # its thread would not exist in the child, but its locks would
+        others = [t.name for t in threading.enumerate() if t is not threading.main_thread()]
+        pid = os.fork()
+        if pid == 0:
+            self._worker_main(slot)  # never returns
+        configure_logging()
+        if others:
+            logger.warning("Forked with other threads running in the master", extra={"threads": others})
+        self.children[pid] = {"slot": slot, "started": time.monotonic()}
+        logger.info("Worker started", extra={"worker_pid": pid, "slot": slot})
+
+    def _reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.children:
+                _mark_metrics_dead(pid)
+                yield pid, self.children[pid]["slot"], status
+
+    def _stop_children(self):
+        logger.info("Stopping workers", extra={"workers": len(self.children)})
+        for pid in self.children:
+            _kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            for pid, _, _ in list(self._reap()):
+                self.children.pop(pid, None)
+            time.sleep(0.1)
+        for pid in self.children:
+            logger.warning("Worker did not stop in time; killing it", extra={
+                "worker_pid": pid, "graceful_timeout": self.graceful_timeout,
+            })
+            _kill(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.children.clear()
+
+    # ------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------
+    def _worker_main(self, slot: int):
+        code = 1
+        try:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)  # uvicorn installs its own once it runs
+            configure_logging()
+            if self.after_fork is not None:
+                self.after_fork()
+            app = self.app if self.app is not None else self.load()
+            _configure_torch_threads(self.torch_threads)
+
+            import uvicorn
+            config = uvicorn.Config(app, log_config=None, **self.uvicorn_options)
+            uvicorn.Server(config).run(sockets=[self.sock])
+            code = 0
+        except BaseException:
+            logger.exception("Worker crashed", extra={"worker_pid": os.getpid(), "slot": slot})
+        finally:
+            try:
+                shutdown_logging()
+            finally:
+                # Never return into the master's loop
+                os._exit(code)
+
+
+def _kill(pid: int, sig: int):
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def _describe(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        return f"signal {signal.Signals(os.WTERMSIG(status)).name}"
+    return f"exit code {os.waitstatus_to_exitcode(status)}"
+
+
+def _mark_metrics_dead(pid: int):
+    if "prometheus_client" in sys.modules and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preforking server: one model copy shared by N uvicorn workers")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=0, help="default: WEB_CONCURRENCY, or one per usable CPU")
+    parser.add_argument("--torch-threads", type=int, default=0, help="per worker; default: WORKER_TORCH_THREADS")
+    parser.add_argument("--no-preload", action="store_true", help="load the app in every worker instead")
+    args = parser.parse_args()
+
+    workers = worker_count(args.workers)
+    created_dir = prepare_metrics_dir()
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")  # its Rust pool does not survive fork either
+
+    configure_logging()
+    if workers > 1 and (settings.VECTOR_STORE_BACKEND or "").lower() == "local":
+        logger.warning("VECTOR_STORE_BACKEND=local: each worker keeps its own copy of the index")
+
+    master = Master(load_app, workers, args.host, args.port, preload=not args.no_preload,
+                    after_fork=reinit_worker, torch_threads=torch_threads_per_worker(workers, args.torch_threads))
+    try:
+        code = master.run()
+    finally:
+        if created_dir:
+            shutil.rmtree(created_dir, ignore_errors=True)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,10 @@ except Exception:
     cohere = None
 from app.config import settings
 from app.prompt_templates import MAIN_SYSTEM_PROMPT
-from app.services.semantic_memory import query_semantic_memory, store_semantic_memory
+from app.services import nlu
+from app.services.semantic_memory import store_semantic_memory
+from app.services.retrieval import retrieve_memory_context
+from app.utils.metrics import span, timed
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +49,7 @@ def _is_provider_available(name: str) -> bool:
 # =====================================================
 # 🔹 Gemini Helper
 # =====================================================
+@timed("llm.gemini")
 def _try_gemini(prompt: str) -> str:
     """
     Attempt to generate a response using Google Gemini.
@@ -84,6 +88,7 @@ def _try_gemini(prompt: str) -> str:
 # =====================================================
 # 🔹 Cohere Helper
 # =====================================================
+@timed("llm.cohere")
 def _try_cohere(prompt: str) -> str:
     """
     Attempt to generate a response using Cohere's Command-R model.
@@ -99,6 +104,7 @@ def _try_cohere(prompt: str) -> str:
 # =====================================================
 # 🔹 Main AI Response Generator (Personalized)
 # =====================================================
+@timed("ai.response")
 def get_response(
     prompt: dict,  # {"sender": "user_id", "text": "message"}
     history: Optional[List[dict] | str] = None,
@@ -121,35 +127,15 @@ def get_response(
     # Note: uses server local time via datetime.now(). If you need user
     # timezone-aware answers, replace with zoneinfo/pytz and a configured tz.
     lt = user_text.lower().strip()
-    # simple phrase checks for date/day/time questions
-    date_phrases = [
-        "what is the date",
-        "what's the date",
-        "date today",
-        "what is today's date",
-        "what's today's date",
-        "what day is it",
-        "what day is today",
-        "day today",
-        "today's date",
-        "what is today",
-        "what day is it today",
-    ]
-    time_phrases = [
-        "what time is it",
-        "what's the time",
-        "current time",
-        "time now",
-    ]
 
     try:
-        if any(p in lt for p in date_phrases):
+        if nlu.DATE_QUERY_RE.search(lt):
             now = datetime.now()
             # Example: Friday, October 17, 2025
             date_str = now.strftime("%A, %B %d, %Y")
             return f"Today is {date_str}."
 
-        if any(p in lt for p in time_phrases):
+        if nlu.TIME_QUERY_RE.search(lt):
             now = datetime.now()
             time_str = now.strftime("%I:%M %p").lstrip("0")
             # Include date for context when asked for time
@@ -161,7 +147,8 @@ def get_response(
     # 🧠 Retrieve prior context from semantic memory if not already passed
     if pinecone_context is None:
         try:
-            matches = query_semantic_memory(user_id, user_text, top_k=5)
+            with span("ai.retrieval"):
+                matches, _ = retrieve_memory_context(user_id, user_text, top_k=5)
             pinecone_context = "\n".join(
                 f"• {m['metadata'].get('text', '')}" for m in matches if m.get("metadata")
             ) or "No similar conversations found."
@@ -171,7 +158,8 @@ def get_response(
 
     # 💾 Store current user message in Pinecone
     try:
-        store_semantic_memory(user_id, user_text)
+        with span("ai.store_memory"):
+            store_semantic_memory(user_id, user_text)
     except Exception as e:
         logger.error(f"[AI] Failed to store message in Pinecone: {e}")
 
@@ -205,7 +193,7 @@ def get_response(
         "Do NOT prepend a greeting or the user's name to every response. Keep replies focused and avoid unnecessary salutations."
     )
 
-    logger.debug(f"[AI] Final prompt prepared for {user_id}:\n{full_prompt}")
+    logger.debug("[AI] Final prompt prepared", extra={"user_id": user_id, "prompt_chars": len(full_prompt)})
 
     # 🔄 Try available providers (Gemini → Cohere)
     for provider in AI_PROVIDERS:
@@ -252,25 +240,45 @@ def summarize_text(text: str) -> str:
 # =====================================================
 # 🔹 Fact Extraction Utility
 # =====================================================
-def extract_facts_from_text(text: str) -> dict:
+def _parse_extraction(raw_response: str) -> dict:
+    start = raw_response.find("{")
+    end = raw_response.rfind("}")
+    if start == -1 or end == -1:
+        return {"entities": [], "relationships": []}
+    parsed = json.loads(raw_response[start:end + 1])
+    return {
+        "entities": parsed.get("entities") or [],
+        "relationships": parsed.get("relationships") or [],
+    }
+
+
+def extract_facts_from_turns(turns: List[str]) -> dict:
     """
-    Extract entities and relationships from text for storing in Neo4j.
+    Extract entities and relationships from several conversation turns in a
+    single LLM call. Raises on API or parse errors so batch callers can retry.
     """
+    numbered = "\n\n".join(f"[{i + 1}]\n{t}" for i, t in enumerate(turns))
     extraction_prompt = f"""
-    Extract entities and relationships in JSON.
-    Return ONLY valid JSON.
+    Extract durable facts about the human user from these conversation turns.
+    Return ONLY valid JSON of the form:
+    {{"entities": [{{"name": "...", "type": "person|place|organization|thing|preference|other"}}],
+      "relationships": [{{"source": "...", "relation": "UPPER_SNAKE_CASE", "target": "..."}}]}}
+    Use "user" as the name for the human user. Skip small talk and anything
+    the assistant said that the user did not confirm.
     If nothing found, return {{"entities": [], "relationships": []}}.
 
-    Text:
-    ---{text}---
+    Turns:
+    ---{numbered}---
+    """
+    return _parse_extraction(_try_gemini(extraction_prompt))
+
+
+def extract_facts_from_text(text: str) -> dict:
+    """
+    Extract entities and relationships from text for storing in Neo4j.
     """
     try:
-        raw_response = _try_gemini(extraction_prompt)
-        start = raw_response.find("{")
-        end = raw_response.rfind("}")
-        if start != -1 and end != -1:
-            return json.loads(raw_response[start:end + 1])
-        return {"entities": [], "relationships": []}
+        return extract_facts_from_turns([text])
     except Exception as e:
         logger.error(f"[AI] Fact extraction failed: {e}")
         return {"entities": [], "relationships": []}
@@ -3,12 +3,16 @@ import logging
 from typing import List, Optional
 
 from app.services import ai_services
-from app.services.semantic_memory import query_semantic_memory, store_semantic_memory
+from app.services.semantic_memory import store_semantic_memory
+from app.services.retrieval import retrieve_memory_context
 from app.services.memory import get_all_user_facts, save_user_fact
 
 logger = logging.getLogger(__name__)
 
 def build_context_from_matches(matches: List[dict], max_chars: int = 800) -> str:
+    """
+    Format already-pruned matches (see app.services.retrieval); max_chars is a last-resort cap.
+    """
     pieces = []
     for m in matches:
         md = m.get("metadata", {})
@@ -30,7 +34,7 @@ def manage_dialogue(user_message: str, history: Optional[List[dict]] = None, use
     """
     try:
         # 1️⃣ Get similar memory from Pinecone
-        matches = query_semantic_memory(user_id=user_id, query=user_message, top_k=5)
+        matches, _ = retrieve_memory_context(user_id, user_message, top_k=5)
         pinecone_context = build_context_from_matches(matches)
 
         # 2️⃣ Detect if user is telling their name
@@ -0,0 +1,325 @@
+# backend/app/services/document_ingest.py
+"""
+Document ingestion for /chat-with-upload/.
+
+1. spool_upload() copies the upload to a temp file UPLOAD_READ_CHUNK bytes
+   at a time (on a worker thread), enforcing UPLOAD_MAX_BYTES.
+2. submit() hands the file to a small thread pool (INGEST_WORKERS). The job
+   extracts text incrementally (text/markdown in blocks, PDF page by page),
+   cuts it into overlapping INGEST_CHUNK_CHARS chunks, and embeds and stores
+   them INGEST_EMBED_BATCH at a time with get_batch_embeddings/store_many.
+3. While it goes, the job keeps the INGEST_TOP_CHUNKS chunks most similar to
+   the user's prompt, so the reply can be grounded in them even if the
+   document is still being ingested when the reply is generated.
+
+At most one text block (or PDF page), one partial chunk, one batch and the
+top chunks are held in memory, whatever the file size. The temp file is
+removed when the job ends, or by shutdown() for jobs that never started.
+
+PDF support needs pypdf; without it PDFs are rejected as unsupported.
+"""
+
+import heapq
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.embeddings import get_batch_embeddings, get_embedding
+from app.services.semantic_memory import store_many
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_READ_CHUNK = 1024 * 1024
+TEXT_READ_CHARS = 64 * 1024
+
+TEXT_EXTENSIONS = {".txt", ".text", ".md", ".markdown", ".csv", ".log"}
+
+
+class UnsupportedDocument(ValueError):
+    pass
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+# ======================================================
+# 🔹 Upload → temp file
+# ======================================================
+def detect_kind(filename: Optional[str], content_type: Optional[str]) -> str:
+    """'text' or 'pdf'; UnsupportedDocument for anything else."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if ext == ".pdf" or content_type == "application/pdf":
+        return "pdf"
+    if ext in TEXT_EXTENSIONS or content_type.startswith("text/"):
+        return "text"
+    raise UnsupportedDocument(f"Unsupported file type: {ext or content_type or 'unknown'}")
+
+
+def spool_upload(src, filename: Optional[str] = None, max_bytes: Optional[int] = None) -> Tuple[str, int]:
+    """
+    Copy a file object (UploadFile.file) to a new temp file in chunks.
+    Returns (path, size). Blocking: call it via run_in_threadpool.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    suffix = os.path.splitext(filename or "")[1][:16]
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=settings.UPLOAD_TMP_DIR)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = src.read(UPLOAD_READ_CHUNK)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                out.write(block)
+    except BaseException:
+        _remove(path)
+        raise
+    return path, size
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+# ======================================================
+# 🔹 Text extraction and chunking
+# ======================================================
+def iter_text(path: str, kind: str) -> Iterator[str]:
+    """Yield the document's text a block (or PDF page) at a time."""
+    if kind == "pdf":
+        yield from _iter_pdf_pages(path)
+        return
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            block = f.read(TEXT_READ_CHARS)
+            if not block:
+                break
+            yield block
+
+
+def _iter_pdf_pages(path: str) -> Iterator[str]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise UnsupportedDocument("PDF support is not installed (pip install pypdf)")
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+            yield "\n"
+
+
+def _collapse_whitespace(block: str, after_space: bool) -> str:
+    # str.split() is much faster than a regex; keep one space at either edge
+    # so words are not glued to the neighbouring blocks
+    core = " ".join(block.split())
+    lead = " " if block[:1].isspace() and not after_space else ""
+    trail = " " if core and block[-1:].isspace() else ""
+    return lead + core + trail
+
+
+def iter_chunks(blocks: Iterable[str], size: int, overlap: int) -> Iterator[str]:
+    """
+    Split streamed text into chunks of at most `size` characters, each
+    starting `overlap` characters before the previous one ended. Chunks end
+    at whitespace where possible; whitespace runs are collapsed.
+    """
+    overlap = max(0, min(overlap, size // 2 - 1))
+    buf, pos = "", 0  # text not yet chunked is buf[pos:]
+    emitted = 0  # buf[:emitted] is already in some chunk
+    for block in blocks:
+        block = _collapse_whitespace(block, after_space=buf.endswith(" "))
+        buf, emitted, pos = buf[pos:] + block, max(emitted - pos, 0), 0
+        while len(buf) - pos >= size:
+            end = pos + size
+            cut = buf.rfind(" ", pos + size // 2, end)
+            if cut <= pos + overlap:
+                cut = end
+            chunk = buf[pos:cut].strip()
+            if chunk:
+                yield chunk
+            emitted = cut
+            pos = cut - overlap
+            if overlap:
+                # Start the overlap on a word boundary too
+                space = buf.find(" ", pos, cut)
+                if space != -1:
+                    pos = space + 1
+    tail = buf[pos:].strip()
+    if tail and len(buf) > emitted:
+        yield tail
+
+
+# ======================================================
+# 🔹 Ingestion jobs
+# ======================================================
+class IngestJob:
+    """
+    One uploaded document being chunked, embedded and stored. `future`
+    completes when ingestion ends; best_chunks() can be read at any time.
+    """
+
+    def __init__(self, user_id: str, path: str, filename: str, kind: str, query: Optional[str] = None,
+                 top_k: Optional[int] = None):
+        self.document_id = uuid.uuid4().hex
+        self.user_id = str(user_id)
+        self.path = path
+        self.filename = filename or "upload"
+        self.kind = kind
+        self.query = query
+        self.top_k = top_k or settings.INGEST_TOP_CHUNKS
+        self.chunks = 0
+        self.stored = 0
+        self.skipped = 0
+        self.error: Optional[str] = None
+        self.future: Future = Future()
+        self._top: List[Tuple[float, int, str]] = []  # min-heap of (score, chunk index, text)
+        self._lock = threading.Lock()
+
+    def run(self):
+        with _executor_lock:
+            _pending.discard(self)
+        if not self.future.set_running_or_notify_cancel():
+            _remove(self.path)
+            return
+        try:
+            query_vec = _unit(get_embedding(self.query)) if self.query else None
+            batch: List[str] = []
+            chunks = iter_chunks(iter_text(self.path, self.kind), settings.INGEST_CHUNK_CHARS,
+                                 settings.INGEST_CHUNK_OVERLAP)
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= settings.INGEST_EMBED_BATCH:
+                    self._ingest_batch(batch, query_vec)
+                    batch = []
+            if batch:
+                self._ingest_batch(batch, query_vec)
+            logger.info("Document ingested", extra={
+                "document_id": self.document_id, "chunks": self.chunks, "stored": self.stored, "skipped": self.skipped,
+            })
+            self.future.set_result(self.status())
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"❌ Document ingestion failed ({self.filename}): {e}")
+            self.future.set_exception(e)
+        finally:
+            _remove(self.path)
+
+    def _ingest_batch(self, texts: List[str], query_vec: Optional[np.ndarray]):
+        first = self.chunks
+        embeddings = get_batch_embeddings(texts)
+        metadatas = [
+            {"source": "upload", "document_id": self.document_id, "filename": self.filename, "chunk": first + i}
+            for i in range(len(texts))
+        ]
+        result = store_many(self.user_id, texts, metadatas, embeddings=embeddings)
+        if not result.get("ok"):
+            raise RuntimeError(result.get("error") or "vector store upsert failed")
+
+        with self._lock:
+            self.chunks += len(texts)
+            self.stored += result.get("stored", 0)
+            self.skipped += result.get("skipped", 0)
+            if query_vec is None:
+                return
+            vecs = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(vecs, axis=1)
+            scores = (vecs @ query_vec) / np.where(norms > 0, norms, 1.0)
+            for i, score in enumerate(scores.tolist()):
+                entry = (score, first + i, texts[i])
+                if len(self._top) < self.top_k:
+                    heapq.heappush(self._top, entry)
+                elif entry > self._top[0]:
+                    heapq.heapreplace(self._top, entry)
+
+    def best_chunks(self) -> List[Dict[str, Any]]:
+        """The most relevant chunks so far, best first."""
+        with self._lock:
+            top = sorted(self._top, reverse=True)
+        return [{"chunk": index, "score": round(score, 4), "text": text} for score, index, text in top]
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "document_id": self.document_id,
+            "filename": self.filename,
+            "chunks": self.chunks,
+            "stored": self.stored,
+            "skipped": self.skipped,
+            "done": self.future.done(),
+            "error": self.error,
+        }
+
+
+def _unit(vec) -> np.ndarray:
+    arr = np.asarray(vec, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    return arr / norm if norm > 0 else arr
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending: Set[IngestJob] = set()  # submitted, not started yet
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.INGEST_WORKERS, thread_name_prefix="ingest")
+    return _executor
+
+
+def submit(user_id: str, path: str, filename: str, kind: str, query: Optional[str] = None) -> IngestJob:
+    """Queue a spooled upload for ingestion; the job owns (and removes) `path`."""
+    job = IngestJob(user_id, path, filename, kind, query=query)
+    executor = _get_executor()
+    with _executor_lock:
+        _pending.add(job)
+    # Keep the request id on the job's log lines
+    executor.submit(copy_context().run, job.run)
+    return job
+
+
+def shutdown():
+    """
+    Stop the pool. Queued jobs are dropped without running, so their futures
+    are cancelled and their temp files removed here; running jobs finish.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        pending = list(_pending)
+        _pending.clear()
+    for job in pending:
+        # Fails if the job started in the meantime; it then removes its own file
+        if job.future.cancel():
+            job.error = "cancelled at shutdown"
+            _remove(job.path)
+
+
+def format_context(job: IngestJob, chunks: List[Dict[str, Any]]) -> str:
+    """Prompt context block built from best_chunks()."""
+    if not chunks:
+        return f'Uploaded document "{job.filename}": no readable text found yet.'
+    lines = [f'Relevant excerpts from the uploaded document "{job.filename}":']
+    lines += [f"• {c['text']}" for c in chunks]
+    return "\n".join(lines)
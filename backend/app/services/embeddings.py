@@ -8,6 +8,9 @@ This module exposes get_embedding(text: str) -> List[float] and get_batch_embedd
 import logging
 import os
 from typing import List
+
+from app.utils.metrics import timed
+
 logger = logging.getLogger(__name__)
 
 # Try local sentence-transformers first (recommended for 'all-MiniLM-L6-v2')
@@ -17,10 +20,12 @@ try:
     _s_model = SentenceTransformer(_SENTENCE_MODEL_NAME)
     logger.info("Loaded local SentenceTransformer model: %s", _SENTENCE_MODEL_NAME)
 
+    @timed("embedding")
     def get_embedding(text: str) -> List[float]:
         vec = _s_model.encode(text, show_progress_bar=False, convert_to_numpy=True)
         return vec.tolist()
 
+    @timed("embedding")
     def get_batch_embeddings(texts: List[str]) -> List[List[float]]:
         vecs = _s_model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
         return [v.tolist() for v in vecs]
@@ -34,10 +39,12 @@ except Exception as e:
         from app.services.ai_services import cohere_client
         if cohere_client is None:
             raise RuntimeError("Cohere client not configured")
+        @timed("embedding")
         def get_embedding(text: str):
             resp = cohere_client.embed(texts=[text], model="embed-english-v2.0")
             return resp.embeddings[0]
 
+        @timed("embedding")
         def get_batch_embeddings(texts: List[str]):
             resp = cohere_client.embed(texts=texts, model="embed-english-v2.0")
             return resp.embeddings
@@ -0,0 +1,170 @@
+# backend/app/services/fact_extraction.py
+"""
+Background fact extraction from chat history into Neo4j.
+
+Each cycle (Celery beat → worker.extract_facts):
+  1. reads chat_history rows newer than each user's checkpoint,
+  2. sends up to FACT_EXTRACTION_TURNS_PER_CALL turns per user through one
+     LLM call,
+  3. writes the extracted entities/relationships with a single UNWIND query
+     per batch,
+  4. advances that user's checkpoint only after the write succeeded.
+
+A failed LLM call or write stops that user for this cycle; the same turns
+are picked up again next time. After FACT_EXTRACTION_MAX_ATTEMPTS failures in
+a row the chunk is dead-lettered (fact_extraction_dead_letters) and skipped,
+so one bad chunk cannot hold a user back for good. Pending turns are shared
+out round-robin between users, so neither can one user's backlog hold back
+the others. Nothing here runs on the chat request path.
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from app.config import settings
+from app.db import fact_checkpoints
+from app.db.neo4j_utils import merge_extracted_facts
+from app.services import ai_services
+
+logger = logging.getLogger(__name__)
+
+USER_ENTITY = "user"
+
+_stats = {"cycles": 0, "turns": 0, "llm_calls": 0, "rows_written": 0, "errors": 0, "dead_lettered": 0, "seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def _entity_key(name: str) -> str:
+    return re.sub(r"\s+", " ", name).strip().casefold()
+
+
+def _relation_type(relation: str) -> str:
+    rel = re.sub(r"[^A-Za-z0-9]+", "_", relation or "").strip("_").upper()
+    return rel or "RELATED_TO"
+
+
+def _format_turn(row: Dict[str, Any]) -> str:
+    return f"User: {row['user_query']}\nAssistant: {row.get('ai_response') or ''}"
+
+
+def build_graph_rows(user_id: int, extraction: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flatten an extraction result into rows for merge_extracted_facts().
+    Entities that appear in no relationship get a row with a null target.
+    """
+    uid = str(user_id)
+    types = {}
+    for ent in extraction.get("entities", []):
+        if isinstance(ent, dict) and str(ent.get("name") or "").strip():
+            types[_entity_key(str(ent["name"]))] = (str(ent["name"]).strip(), ent.get("type") or "other")
+    types[USER_ENTITY] = (USER_ENTITY, "self")
+
+    def entity(name: str):
+        key = _entity_key(name)
+        display, etype = types.get(key, (name.strip(), "other"))
+        return key, display, etype
+
+    rows, seen, linked = [], set(), set()
+    for rel in extraction.get("relationships", []):
+        if not isinstance(rel, dict):
+            continue
+        source, target = str(rel.get("source") or ""), str(rel.get("target") or "")
+        if not source.strip() or not target.strip():
+            continue
+        s_key, s_name, s_type = entity(source)
+        t_key, t_name, t_type = entity(target)
+        relation = _relation_type(rel.get("relation") or rel.get("type"))
+        if (s_key, relation, t_key) in seen or s_key == t_key:
+            continue
+        seen.add((s_key, relation, t_key))
+        linked.update((s_key, t_key))
+        rows.append({
+            "user_id": uid,
+            "source_key": s_key, "source": s_name, "source_type": s_type,
+            "target_key": t_key, "target": t_name, "target_type": t_type,
+            "relation": relation,
+        })
+
+    for key, (name, etype) in types.items():
+        if key in linked or key == USER_ENTITY:
+            continue
+        rows.append({
+            "user_id": uid,
+            "source_key": key, "source": name, "source_type": etype,
+            "target_key": None, "target": None, "target_type": None,
+            "relation": None,
+        })
+    return rows
+
+
+def _process_user(user_id: int, turns: List[Dict[str, Any]], turns_per_call: int, cycle: Dict[str, Any]):
+    for i in range(0, len(turns), turns_per_call):
+        chunk = turns[i:i + turns_per_call]
+        try:
+            extraction = ai_services.extract_facts_from_turns([_format_turn(r) for r in chunk])
+            cycle["llm_calls"] += 1
+            rows = build_graph_rows(user_id, extraction)
+            cycle["rows_written"] += merge_extracted_facts(rows)
+        except Exception as e:
+            cycle["errors"] += 1
+            logger.warning("Fact extraction failed for user %s (turns %s..%s): %s", user_id, chunk[0]["id"], chunk[-1]["id"], e)
+            attempts = fact_checkpoints.record_failure(user_id)
+            if attempts < settings.FACT_EXTRACTION_MAX_ATTEMPTS:
+                return
+            if not fact_checkpoints.dead_letter(user_id, chunk[0]["id"], chunk[-1]["id"], len(chunk), attempts, str(e)):
+                return
+            cycle["dead_lettered"] += len(chunk)
+            logger.error("❌ Skipping turns %s..%s of user %s after %d failed attempts",
+                         chunk[0]["id"], chunk[-1]["id"], user_id, attempts)
+            continue
+        if not fact_checkpoints.advance_checkpoint(user_id, chunk[-1]["id"], len(chunk)):
+            cycle["errors"] += 1
+            return
+        cycle["turns"] += len(chunk)
+
+
+def run_extraction_cycle(max_turns: Optional[int] = None, turns_per_call: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Process one batch of pending chat turns. Returns this cycle's metrics.
+    """
+    max_turns = max_turns or settings.FACT_EXTRACTION_MAX_TURNS
+    turns_per_call = turns_per_call or settings.FACT_EXTRACTION_TURNS_PER_CALL
+    cycle = {"users": 0, "turns": 0, "llm_calls": 0, "rows_written": 0, "errors": 0, "dead_lettered": 0}
+    start = time.perf_counter()
+
+    with fact_checkpoints.extraction_lock() as acquired:
+        if not acquired:
+            logger.info("⏭️ Fact extraction already running elsewhere; skipping this cycle.")
+            return {**cycle, "skipped": True}
+
+        by_user: Dict[int, List[Dict[str, Any]]] = {}
+        for row in fact_checkpoints.get_pending_turns(max_turns):
+            by_user.setdefault(row["user_id"], []).append(row)
+        cycle["users"] = len(by_user)
+
+        for user_id, turns in by_user.items():
+            _process_user(user_id, turns, turns_per_call, cycle)
+
+    elapsed = time.perf_counter() - start
+    cycle["seconds"] = round(elapsed, 3)
+    cycle["turns_per_s"] = round(cycle["turns"] / elapsed, 2) if elapsed else 0.0
+    with _stats_lock:
+        _stats["cycles"] += 1
+        for k in ("turns", "llm_calls", "rows_written", "errors", "dead_lettered"):
+            _stats[k] += cycle[k]
+        _stats["seconds"] += elapsed
+
+    logger.info(
+        "🧩 Fact extraction: users=%d turns=%d llm_calls=%d rows=%d errors=%d dead_lettered=%d in %.2fs (%.1f turns/s)",
+        cycle["users"], cycle["turns"], cycle["llm_calls"], cycle["rows_written"], cycle["errors"], cycle["dead_lettered"],
+        elapsed, cycle["turns_per_s"],
+    )
+    return cycle
+
+
+def get_extraction_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,220 @@
+# backend/app/services/intent_classifier.py
+"""
+Local embedding-based intent classifier.
+
+Sits between the regex engine (services/nlu.py) and the LLM: when the rules
+fall through to general_chat, the message is embedded with the already
+loaded sentence-transformer and compared against a few prototype phrasings
+per intent. The best intent wins if its similarity clears
+INTENT_CLASSIFIER_THRESHOLD and beats the runner-up intent by
+INTENT_CLASSIFIER_MARGIN; otherwise the message is "unsure".
+
+Only unsure messages, and slot-bearing intents we cannot fill locally, go to
+the LLM (ai_services.get_structured_intent), and only when
+INTENT_LLM_FALLBACK is enabled.
+
+A match is acted on like a rule match: a create_task creates the task with
+no confirmation step. The classifier is therefore off by default
+(INTENT_CLASSIFIER_ENABLED); enable it once app/tools/eval_intent_classifier.py
+shows acceptable per-intent precision at the configured threshold on the
+model the deployment actually loads.
+"""
+
+import logging
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services import nlu
+
+logger = logging.getLogger(__name__)
+
+PROTOTYPES: Dict[str, List[str]] = {
+    "create_task": [
+        "remind me to call mom at 5pm",
+        "set a reminder for my dentist appointment tomorrow",
+        "don't let me forget to pay the electricity bill",
+        "schedule a meeting with the team at 3pm",
+        "put buy milk on my to-do list",
+        "I need to submit the report by friday, add it to my tasks",
+        "make a note to water the plants in the evening",
+        "alert me in 30 minutes to check the oven",
+        "can you schedule gym for 6am tomorrow",
+        "new task: renew my passport",
+    ],
+    "fetch_tasks": [
+        "what do I have to do today",
+        "show me my to-do list",
+        "what are my pending reminders",
+        "do I have anything scheduled",
+        "what's on my agenda",
+        "list everything I need to get done",
+        "which tasks are still open",
+        "what reminders have I set",
+    ],
+    "get_chat_history": [
+        "what did we talk about earlier",
+        "show me our previous conversation",
+        "what did I ask you yesterday",
+        "scroll back through our chat",
+        "repeat what I said before",
+        "pull up my earlier messages",
+    ],
+    "save_fact": [
+        "keep in mind that I am allergic to peanuts",
+        "note that my birthday is on march 3rd",
+        "I want you to know I work as a nurse",
+        "for future reference, I prefer vegetarian food",
+        "don't forget that my wife's name is priya",
+        "store this: my car is a red honda city",
+        "I live in bangalore, remember that",
+    ],
+    "general_chat": [
+        "how are you doing",
+        "tell me a joke",
+        "what is the capital of france",
+        "explain how photosynthesis works",
+        "write a short poem about the sea",
+        "what's the weather like",
+        "thanks, that was helpful",
+        "who won the world cup in 2011",
+        "help me write an email to my manager",
+        "what do you think about artificial intelligence",
+        "translate good morning into hindi",
+        "recommend a good book",
+    ],
+}
+
+# Intents whose structured output needs no extracted slots
+SLOT_FREE_INTENTS = {"fetch_tasks", "get_chat_history", "general_chat"}
+
+# "don't let me forget to ...", "set a reminder to ...", "alert me in 5 minutes to ..."
+_TASK_LEAD_IN_RE = re.compile(
+    r"^(?:\S+\s+){0,4}?(?:remind(?:er)?|forget|note|alert me|need|task)\b(?:\s+\S+){0,3}?\s+(?:to|about)\s+"
+)
+_TRAILING_PREPOSITION_RE = re.compile(r"\s+(?:at|on|by|in|for)$")
+
+
+class IntentClassifier:
+    """
+    Nearest-prototype classifier over unit-normalized embeddings.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], prototypes: Dict[str, List[str]] = PROTOTYPES):
+        self._embed_batch = embed_batch
+        self._prototypes = prototypes
+        self._matrix: Optional[np.ndarray] = None
+        self._labels: List[str] = []
+        self._lock = threading.Lock()
+
+    def _ensure_prototypes(self):
+        if self._matrix is not None:
+            return
+        with self._lock:
+            if self._matrix is not None:
+                return
+            labels, texts = [], []
+            for intent, phrases in self._prototypes.items():
+                labels.extend([intent] * len(phrases))
+                texts.extend(phrases)
+            self._labels = labels
+            self._matrix = self._normalize(np.asarray(self._embed_batch(texts), dtype=np.float32))
+
+    @staticmethod
+    def _normalize(mat: np.ndarray) -> np.ndarray:
+        return mat / np.maximum(np.linalg.norm(mat, axis=-1, keepdims=True), 1e-12)
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """
+        Best prototype similarity per intent.
+        """
+        self._ensure_prototypes()
+        vec = self._normalize(np.asarray(self._embed_batch([text])[0], dtype=np.float32))
+        sims = self._matrix @ vec
+        best: Dict[str, float] = {}
+        for label, sim in zip(self._labels, sims.tolist()):
+            if sim > best.get(label, -1.0):
+                best[label] = sim
+        return best
+
+    def classify(self, text: str, threshold: Optional[float] = None, margin: Optional[float] = None) -> Tuple[Optional[str], float]:
+        """
+        Returns (intent, similarity). intent is None when unsure.
+        """
+        threshold = settings.INTENT_CLASSIFIER_THRESHOLD if threshold is None else threshold
+        margin = settings.INTENT_CLASSIFIER_MARGIN if margin is None else margin
+        ranked = sorted(self.scores(text).items(), key=lambda kv: kv[1], reverse=True)
+        if not ranked:
+            return None, 0.0
+        label, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if score < threshold or score - runner_up < margin:
+            return None, score
+        return label, score
+
+
+def task_from_paraphrase(message: str) -> dict:
+    """
+    Best-effort create_task slots for a paraphrased request, e.g.
+    "don't let me forget to call mom at 5pm" -> title "call mom", 5pm today.
+    """
+    msg = nlu.normalize_message(message).rstrip(" .!?")
+    tsrch = nlu.TIME_TOKEN_RE.search(msg)
+    time_part = tsrch.group(1) if tsrch else None
+    title = _TASK_LEAD_IN_RE.sub("", msg, count=1) or msg
+    if time_part:
+        title = title.replace(time_part, "")
+    title = _TRAILING_PREPOSITION_RE.sub("", " ".join(title.split()))
+    return nlu.build_task_intent(title or msg, time_part, search_title=False)
+
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier() -> IntentClassifier:
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                # Reuses the sentence-transformer that semantic memory already loaded
+                from app.services.embeddings import get_batch_embeddings
+                _classifier = IntentClassifier(get_batch_embeddings)
+    return _classifier
+
+
+def _llm_intent(message: str) -> Optional[dict]:
+    if not settings.INTENT_LLM_FALLBACK:
+        return None
+    from app.services import ai_services
+    result = ai_services.get_structured_intent(message)
+    # Only trust shapes the chat handler can act on
+    if not isinstance(result, dict) or result.get("action") not in PROTOTYPES:
+        return None
+    if result["action"] not in SLOT_FREE_INTENTS and not isinstance(result.get("data"), dict):
+        return None
+    return result
+
+
+def refine_intent(message: str, classifier: Optional[IntentClassifier] = None) -> dict:
+    """
+    Second stage for messages the regex engine left as general_chat.
+    Blocking (embeds the message); call from a worker thread in async code.
+    """
+    general = {"action": "general_chat"}
+    try:
+        intent, score = (classifier or get_classifier()).classify(message)
+    except Exception as e:
+        logger.warning("Intent classifier unavailable: %s", e)
+        return _llm_intent(message) or general
+
+    logger.debug("[Intent] classifier=%s score=%.3f", intent, score)
+    if intent in SLOT_FREE_INTENTS:
+        return {"action": intent}
+    if intent == "create_task":
+        return task_from_paraphrase(message)
+    # save_fact needs a key/value only the LLM can pull out; unsure messages too
+    return _llm_intent(message) or general
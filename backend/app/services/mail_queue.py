@@ -0,0 +1,198 @@
+# backend/app/services/mail_queue.py
+"""
+Durable outbound email queue.
+
+Every outgoing email (welcome emails, reminders, digests) is a message dict
+
+    {"to": ..., "subject": ..., "body": ..., "key": ..., "due": [...]}
+
+enqueued as a worker.send_emails job on the Celery "mail" queue. Request
+handlers and the reminder dispatcher only pay for the enqueue; SMTP happens
+in the worker (deliver_batch), over the pooled mailer.
+
+- Idempotency: `key` identifies the message ("welcome:<email>",
+  "reminder-<task_id>-<due timestamp>", "digest-<user_id>-<task ids>"; see
+  email_utils and reminders._message). A key is claimed in Redis before sending
+  and kept for MAIL_IDEMPOTENCY_TTL once sent, so a redelivered or
+  re-enqueued job never emails twice.
+- Retries: transient failures are re-enqueued as a new job with just the
+  failed messages, with exponential backoff from MAIL_RETRY_BACKOFF, up to
+  MAIL_MAX_ATTEMPTS.
+- Dead letters: permanent failures, exhausted retries and retries that could
+  not be re-enqueued are pushed to the mail:dead_letter Redis list with the
+  error.
+- Metrics: counters in the mail:stats hash plus the broker's queue depth
+  (get_mail_stats, /debug/mail-stats).
+
+`due` (optional) lists the due times of the reminders a message covers, so
+reminder delivery lag is measured when the email is actually sent.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAIL_QUEUE = "mail"
+SEND_EMAILS_TASK = "worker.send_emails"
+DEAD_LETTER_KEY = "mail:dead_letter"
+DEAD_LETTER_MAX = 10000
+STATS_KEY = "mail:stats"
+# Held while a message is being sent; expires so a crashed worker's messages
+# can be retried when the broker redelivers the job
+SENDING_TTL = 300
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _redis():
+    # The broker's Redis: mail bookkeeping lives next to the queue it describes
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(settings.REDIS_URL_CELERY, decode_responses=True)
+    return _client
+
+
+def _idem_key(key: str) -> str:
+    return f"mail:idem:{key}"
+
+
+def make_message(to: str, subject: str, body: str, key: str, due: Optional[List[datetime]] = None) -> Dict[str, Any]:
+    msg = {"to": to, "subject": subject, "body": body, "key": key}
+    if due:
+        msg["due"] = [d.isoformat() for d in due]
+    return msg
+
+
+def _celery():
+    from app.worker import celery
+    return celery
+
+
+def enqueue_emails(messages: List[Dict[str, Any]], attempt: int = 1, countdown: Optional[float] = None) -> List[Optional[Exception]]:
+    """
+    Enqueue messages as one worker.send_emails job. Returns one entry per
+    message: None if queued, else the enqueue error (same for all).
+    """
+    if not messages:
+        return []
+    try:
+        _celery().send_task(
+            SEND_EMAILS_TASK,
+            args=[messages],
+            kwargs={"attempt": attempt},
+            queue=MAIL_QUEUE,
+            countdown=countdown,
+        )
+    except Exception as e:
+        logger.error("Failed to enqueue %d email(s): %s", len(messages), e)
+        return [e] * len(messages)
+    return [None] * len(messages)
+
+
+def enqueue_email(to: str, subject: str, body: str, key: str) -> bool:
+    return enqueue_emails([make_message(to, subject, body, key)])[0] is None
+
+
+def _claim(client, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    pipe = client.pipeline()
+    for m in messages:
+        pipe.set(_idem_key(m["key"]), "sending", nx=True, ex=SENDING_TTL)
+    claimed = pipe.execute()
+    return [m for m, ok in zip(messages, claimed) if ok]
+
+
+def _dead_letter(pipe, message: Dict[str, Any], error: Exception, attempt: int):
+    pipe.lpush(DEAD_LETTER_KEY, json.dumps({
+        "message": message,
+        "error": f"{type(error).__name__}: {error}",
+        "attempts": attempt,
+        "failed_at": datetime.utcnow().isoformat(),
+    }))
+    pipe.ltrim(DEAD_LETTER_KEY, 0, DEAD_LETTER_MAX - 1)
+
+
+def deliver_batch(messages: List[Dict[str, Any]], attempt: int = 1, mailer=None) -> Dict[str, int]:
+    """
+    Worker side of worker.send_emails: send the messages not already sent,
+    then record, retry or dead-letter each one. Returns the batch counters.
+    """
+    from app.utils.mailer import get_mailer, is_transient
+
+    client = _redis()
+    mailer = mailer or get_mailer()
+    fresh = _claim(client, messages)
+    counts = {"sent": 0, "duplicates": len(messages) - len(fresh), "retried": 0, "dead": 0}
+    if not fresh:
+        client.hincrby(STATS_KEY, "duplicates", counts["duplicates"])
+        return counts
+
+    results = mailer.send_many([(m["to"], m["subject"], m["body"]) for m in fresh])
+
+    retry, lags = [], []
+    pipe = client.pipeline()
+    for m, error in zip(fresh, results):
+        if error is None:
+            counts["sent"] += 1
+            pipe.set(_idem_key(m["key"]), "sent", ex=settings.MAIL_IDEMPOTENCY_TTL)
+            lags.extend(m.get("due") or [])
+            continue
+        pipe.delete(_idem_key(m["key"]))
+        if is_transient(error) and attempt < settings.MAIL_MAX_ATTEMPTS:
+            retry.append(m)
+        else:
+            counts["dead"] += 1
+            _dead_letter(pipe, m, error, attempt)
+            logger.error("✉️ Dead-lettered email %s to %s after %d attempt(s): %s", m["key"], m["to"], attempt, error)
+
+    if retry:
+        # Release the retried keys before the retry job can claim them
+        pipe.execute()
+        pipe = client.pipeline()
+        delay = settings.MAIL_RETRY_BACKOFF * 2 ** (attempt - 1)
+        enqueue_error = enqueue_emails(retry, attempt=attempt + 1, countdown=delay)[0]
+        if enqueue_error is None:
+            counts["retried"] = len(retry)
+            logger.warning("✉️ Retrying %d email(s) in %.0fs (attempt %d)", len(retry), delay, attempt + 1)
+        else:
+            # Nothing else holds these messages any more: keep them for a manual replay
+            counts["dead"] += len(retry)
+            for m in retry:
+                _dead_letter(pipe, m, enqueue_error, attempt)
+            logger.error("✉️ Dead-lettered %d email(s) that could not be re-enqueued for retry: %s",
+                         len(retry), enqueue_error)
+
+    for field, n in counts.items():
+        if n:
+            pipe.hincrby(STATS_KEY, field, n)
+    pipe.execute()
+
+    if lags:
+        from app.services.reminders import IST, record_delivery_lag
+        sent_at = datetime.now(IST).replace(tzinfo=None)
+        record_delivery_lag(*[(sent_at - datetime.fromisoformat(d)).total_seconds() for d in lags])
+    return counts
+
+
+def get_mail_stats() -> Dict[str, Any]:
+    client = _redis()
+    pipe = client.pipeline()
+    pipe.hgetall(STATS_KEY)
+    pipe.llen(MAIL_QUEUE)  # Celery's Redis transport keeps each queue as a list
+    pipe.llen(DEAD_LETTER_KEY)
+    counters, depth, dead = pipe.execute()
+    return {
+        "queue_depth": depth,
+        "dead_letter": dead,
+        **{k: int(v) for k, v in counters.items()},
+    }
@@ -1,43 +1,161 @@
-# backend/app/services/memory.py
-import json
-from app.db import redis_utils as redis, postgres as postgres
+import logging
+from app.config import settings
+from app.db import redis_utils as redis, postgres as postgres, utils as db_utils
 from app.db.neo4j_utils import (
-    save_fact_neo4j,
-    get_fact_neo4j,
-    get_all_facts_for_user,
+    save_user_fact_neo4j,
+    get_user_fact_neo4j,
+    fetch_user_facts,
+    fetch_user_facts_async,
 )
 
+logger = logging.getLogger(__name__)
+
 # =========================================================
-# 🔹 USER FACTS (Neo4j)
+# 🔹 USER FACTS (Neo4j, cached in Redis)
 # =========================================================
-def save_user_fact(user_id: str, key: str, value: str):
+# Reads hit Redis first and fall back to Neo4j on a miss; writes go to Neo4j
+# and then through to the cached copy, so the chat path rarely touches Neo4j.
+def save_user_fact(user_id: str, key: str, value: str) -> bool:
     """
     Persist a long-term user fact (e.g., name, preferences).
     """
-    save_fact_neo4j(user_id, key, value)
+    if not save_user_fact_neo4j(user_id, key, value):
+        return False
+    try:
+        redis.cache_fact_if_loaded(user_id, key, value)
+    except Exception as e:
+        logger.warning("Facts cache write-through failed for user %s: %s", user_id, e)
+        _drop_cached_facts(user_id)
+    return True
 
 
 def get_user_fact(user_id: str, key: str):
     """
     Retrieve one user fact.
     """
-    return get_fact_neo4j(user_id, key)
+    return get_user_fact_neo4j(user_id, key)
+
+
+def _read_cached_facts(user_id: str):
+    try:
+        return redis.get_cached_facts(user_id)
+    except Exception as e:
+        logger.warning("Facts cache read failed for user %s: %s", user_id, e)
+        return None
+
+
+def _store_cached_facts(user_id: str, facts: dict):
+    try:
+        redis.cache_facts(user_id, facts)
+    except Exception as e:
+        logger.warning("Facts cache fill failed for user %s: %s", user_id, e)
+
+
+def _drop_cached_facts(user_id: str):
+    try:
+        redis.invalidate_cached_facts(user_id)
+    except Exception:
+        logger.exception("Facts cache invalidation failed for user %s", user_id)
 
 
 def get_all_user_facts(user_id: str) -> dict:
     """
     Retrieve all stored user facts as a dictionary.
     """
+    cached = _read_cached_facts(user_id)
+    if cached is not None:
+        return cached
+    try:
+        facts = fetch_user_facts(user_id) or {}
+    except Exception as e:
+        logger.error("Failed to fetch facts for user %s: %s", user_id, e)
+        return {}
+    _store_cached_facts(user_id, facts)
+    return facts
+
+
+async def get_all_user_facts_async(user_id: str) -> dict:
+    """
+    Async variant for request handlers: the async Redis client, and the async
+    Neo4j driver on a miss.
+    """
+    try:
+        cached = await redis.get_cached_facts_async(user_id)
+    except Exception as e:
+        logger.warning("Facts cache read failed for user %s: %s", user_id, e)
+        cached = None
+    if cached is not None:
+        return cached
+    try:
+        facts = await fetch_user_facts_async(user_id) or {}
+    except Exception as e:
+        logger.error("Failed to fetch facts for user %s: %s", user_id, e)
+        return {}
+    try:
+        await redis.cache_facts_async(user_id, facts)
+    except Exception as e:
+        logger.warning("Facts cache fill failed for user %s: %s", user_id, e)
+    return facts
+
+
+# =========================================================
+# 🔹 RECENT CHAT TURNS (PostgreSQL, hot copy in Redis)
+# =========================================================
+# The prompt history for a chat is its latest CHAT_HOT_TURNS turns (within
+# CHAT_HOT_MAX_BYTES). save_chat() appends each new turn to the Redis copy;
+# reads fall back to Postgres on a miss and refill it.
+def record_chat_turn(user_id, chat_id: str, row_id: int, user_query: str, ai_response: str):
+    try:
+        redis.append_cached_turn(user_id, chat_id, row_id, user_query, ai_response)
+    except Exception as e:
+        logger.warning("Chat turns cache append failed for chat %s: %s", chat_id, e)
+        _drop_cached_turns(user_id, chat_id)
+
+
+def _read_cached_turns(user_id, chat_id: str):
+    try:
+        return redis.get_cached_turns(user_id, chat_id)
+    except Exception as e:
+        logger.warning("Chat turns cache read failed for chat %s: %s", chat_id, e)
+        return None
+
+
+def _drop_cached_turns(user_id, chat_id: str):
+    try:
+        redis.invalidate_cached_turns(user_id, chat_id)
+    except Exception:
+        logger.exception("Chat turns cache invalidation failed for chat %s", chat_id)
+
+
+def _within_caps(rows: list):
+    """Drop the oldest rows until the encoded turns fit CHAT_HOT_MAX_BYTES, as the cache does."""
+    entries = [redis.encode_turn(r["id"], r["user_query"], r["ai_response"]) for r in rows]
+    total, start = sum(len(e) for e in entries), 0
+    while len(entries) - start > 1 and total > settings.CHAT_HOT_MAX_BYTES:
+        total -= len(entries[start])
+        start += 1
+    return rows[start:], entries[start:]
+
+
+def get_recent_turns(user_id, chat_id: str) -> list:
+    """
+    Latest turns of a chat, oldest first: [(row_id, user_query, ai_response), ...].
+    """
+    cached = _read_cached_turns(user_id, chat_id)
+    if cached is not None:
+        return cached
     try:
-        facts = get_all_facts_for_user(user_id)
-        if isinstance(facts, str):
-            try:
-                return json.loads(facts)
-            except json.JSONDecodeError:
-                return {"fact": facts}
-        return facts or {}
+        rows = db_utils.get_recent_turns(user_id, chat_id, settings.CHAT_HOT_TURNS)
     except Exception as e:
-        return {"error": str(e)}
+        logger.error("Failed to fetch recent turns for chat %s: %s", chat_id, e)
+        return []
+    rows, entries = _within_caps(rows)
+    if entries:
+        try:
+            redis.cache_turns(user_id, chat_id, entries, max(r["id"] for r in rows))
+        except Exception as e:
+            logger.warning("Chat turns cache fill failed for chat %s: %s", chat_id, e)
+    return [(r["id"], r["user_query"], r["ai_response"] or "") for r in rows]
 
 
 # =========================================================
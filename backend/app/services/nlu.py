@@ -1,10 +1,14 @@
 import re
 from datetime import datetime, date, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 import pytz
 
 # Use India Standard Time (IST)
 IST = pytz.timezone("Asia/Kolkata")
 
+_AMPM_SUFFIX_RE = re.compile(r"\s(am|pm)$")
+_RELATIVE_TIME_RE = re.compile(r'in\s+(\d+)\s+(minute|minutes|hour|hours)')
+
 
 def parse_time_string(time_str: str):
     """
@@ -26,7 +30,7 @@ def parse_time_string(time_str: str):
 
     # Normalize AM/PM spacing
     if time_str.endswith("am") or time_str.endswith("pm"):
-        if not re.search(r"\s(am|pm)$", time_str):
+        if not _AMPM_SUFFIX_RE.search(time_str):
             time_str = time_str[:-2] + " " + time_str[-2:]
 
     # Try to parse using multiple time formats
@@ -43,7 +47,7 @@ def parse_time_string(time_str: str):
         except ValueError:
             continue
     # Handle relative times like 'in 2 hours' or 'in 30 minutes'
-    m = re.search(r'in\s+(\d+)\s+(minute|minutes|hour|hours)', time_str)
+    m = _RELATIVE_TIME_RE.search(time_str)
     if m:
         amount = int(m.group(1))
         unit = m.group(2)
@@ -57,6 +61,178 @@ def parse_time_string(time_str: str):
     return None
 
 
+# ======================================================
+# 🔹 Compiled intent engine
+# ======================================================
+# Rules are tried in order and the first match wins, exactly like the
+# original if/elif chain. Each rule lists trigger keywords, at least one of
+# which must occur in the message for its pattern to be able to match. One
+# scan over the message finds every keyword present; only rules triggered
+# by a found keyword (and not excluded by one) run their compiled pattern.
+
+_POLITE_PREFIX_RE = re.compile(r'^(please\s+|please,\s+|can you\s+|could you\s+|would you\s+)')
+TIME_TOKEN_RE = re.compile(r"((?:\d{1,2}(?::\d{2})?\s?(?:am|pm))|\b(?:today|tomorrow)\b|in\s+\d+\s+(?:minute|minutes|hour|hours))")
+
+
+class IntentRule(NamedTuple):
+    name: str
+    triggers: Tuple[str, ...]
+    pattern: Optional["re.Pattern"]
+    build: Callable[["re.Match"], dict]
+    exclude: Tuple[str, ...] = ()
+
+
+def build_task_intent(title: str, time_part: Optional[str], search_title: bool = True) -> dict:
+    # If no explicit time was captured, look for time tokens inside the title
+    if not time_part and search_title:
+        tsrch = TIME_TOKEN_RE.search(title)
+        if tsrch:
+            time_part = tsrch.group(1)
+            title = title.replace(time_part, "").strip()
+    return {
+        "action": "create_task",
+        "data": {
+            "title": title,
+            "datetime": parse_time_string(time_part) if time_part else None,
+            "priority": "medium",
+            "category": "personal",
+            "notes": "",
+        },
+    }
+
+
+def _fact(m) -> dict:
+    return {"action": "save_fact", "data": {"key": m.group(2).strip(), "value": m.group(3).strip()}}
+
+
+def _task_due(m) -> dict:
+    return build_task_intent(m.group(1).strip(), m.group(2).strip(), search_title=False)
+
+
+def _task_optional_time(m) -> dict:
+    return build_task_intent(m.group(1).strip(), m.group(2).strip() if m.group(2) else None)
+
+
+def _external(target: str, with_query: bool = True):
+    def build(m) -> dict:
+        return {"action": "open_external", "data": {"target": target, "query": m.group(1).strip() if with_query else ""}}
+    return build
+
+
+def _fixed(action: str):
+    def build(_m) -> dict:
+        return {"action": action}
+    return build
+
+
+def _keywords(*phrases: str) -> "re.Pattern":
+    return re.compile("|".join(re.escape(p) for p in phrases))
+
+
+def _external_rules(target: str, patterns: List[str], action_only: str, triggers: Tuple[str, ...]) -> List[IntentRule]:
+    # Informational questions ("what is youtube", "tell me about youtube") stay general chat
+    exclude = (f"what is {target}", f"about {target}")
+    rules = [
+        IntentRule(f"open_{target}", triggers, re.compile(p), _external(target), exclude)
+        for p in patterns
+    ]
+    rules.append(IntentRule(f"open_{target}_app", (target,), re.compile(action_only), _external(target, with_query=False), exclude))
+    return rules
+
+
+INTENT_RULES: List[IntentRule] = [
+    # ---------- Save Fact ----------
+    IntentRule("save_fact", ("fact ",), re.compile(r"(save|remember) fact (.+?) as (.+)"), _fact),
+    IntentRule("save_fact_generic", (" is ",), re.compile(r"(remember|my) (.+?) is (.+)"), _fact),
+
+    # ---------- Create / Reminder Task ----------
+    IntentRule("create_task_due", (" due ",), re.compile(r"(?:create|add) task (.+?) due (.+)"), _task_due),
+    IntentRule("remind_me", ("remind me to ",), re.compile(r"remind me to (.+?)(?: at (.+))?$"), _task_optional_time),
+    IntentRule(
+        "create_task", ("add", "create"),
+        re.compile(r"(?:add|create)(?: me)?(?: a)?(?: task| reminder)?(?: to)? (.+?)(?: at (.+))?$"),
+        _task_optional_time,
+    ),
+
+    # ---------- Fetch Tasks / Chat History ----------
+    # No pattern: finding any trigger keyword is the match
+    IntentRule("fetch_tasks", ("show tasks", "list tasks", "my tasks"), None, _fixed("fetch_tasks")),
+    IntentRule("get_chat_history", ("show chat history", "last chats", "previous messages"), None, _fixed("get_chat_history")),
+
+    # ---------- External apps ----------
+    *_external_rules("youtube", [
+        r"(?:search|find|play) (.+) on (?:youtube)\b",
+        r"(?:open) (?:youtube) (?:and )?(?:search(?: for)?)? (.+)",
+        r"(?:search|find) (?:youtube) (?:for )?(.+)",
+        r"(?:youtube[:\-\s]+)(.+)",
+    ], r"^(?:open|launch|go to) (?:youtube)\b", ("youtube",)),
+    *_external_rules("maps", [
+        r"(?:open|search) (?:maps|google maps) (?:for )?(.+)",
+        r"(?:find|navigate to|navigate me to|take me to|go to) (.+)",
+        r"maps[:\-\s]+(.+)",
+    ], r"^(?:open|launch|go to) (?:maps|google maps)\b", ("maps", "find ", "navigate ", "take me to ", "go to ")),
+    IntentRule("open_whatsapp", ("whatsapp",), re.compile(r"(?:open|send on )?whatsapp(?: to)? (.+)"), _external("whatsapp")),
+    IntentRule("open_whatsapp", ("whatsapp",), re.compile(r"whatsapp[:\-\s]+(.+)"), _external("whatsapp")),
+    *_external_rules("spotify", [
+        r"(?:play|find) (.+) on (?:spotify)\b",
+        r"(?:open) (?:spotify) (?:and )?(?:search(?: for)?)? (.+)",
+        r"spotify[:\-\s]+(.+)",
+    ], r"^(?:open|launch|go to) (?:spotify)\b", ("spotify",)),
+    *_external_rules("instagram", [
+        r"(?:open|search|show|find) (?:instagram) (?:and )?(?:search(?: for)?)? (.+)",
+        r"instagram[:\-\s]+(.+)",
+    ], r"^(?:open|launch|go to) (?:instagram)\b", ("instagram",)),
+]
+
+
+class IntentEngine:
+    """
+    Keyword-prefiltered, first-match-wins rule matcher.
+
+    The prefilter is a single lookahead alternation over all keywords,
+    which reports every occurrence in one C-level pass (the same result as
+    an Aho-Corasick scan) as long as no keyword is a prefix of another.
+    """
+
+    def __init__(self, rules: List[IntentRule]):
+        self.rules = rules
+        keywords = sorted({k for r in rules for k in r.triggers + r.exclude})
+        for a in keywords:
+            for b in keywords:
+                if a != b and b.startswith(a):
+                    raise ValueError(f"Intent keyword {a!r} is a prefix of {b!r}")
+        self._scan = re.compile("(?=(" + "|".join(re.escape(k) for k in keywords) + "))")
+        self._rules_by_keyword: Dict[str, List[int]] = {k: [] for k in keywords}
+        for i, rule in enumerate(rules):
+            for k in rule.triggers:
+                self._rules_by_keyword[k].append(i)
+
+    def match(self, msg: str) -> Optional[dict]:
+        found = set(self._scan.findall(msg))
+        if not found:
+            return None
+        candidates = sorted({i for k in found for i in self._rules_by_keyword[k]})
+        for i in candidates:
+            rule = self.rules[i]
+            if rule.exclude and not found.isdisjoint(rule.exclude):
+                continue
+            m = rule.pattern.match(msg) if rule.pattern is not None else True
+            if m:
+                return rule.build(m)
+        return None
+
+
+_ENGINE = IntentEngine(INTENT_RULES)
+
+
+def normalize_message(user_message: str) -> str:
+    """
+    Lowercase, trim and strip one polite prefix ("please", "can you", ...).
+    """
+    msg = user_message.lower().strip()
+    return _POLITE_PREFIX_RE.sub('', msg, count=1)
+
+
 def get_structured_intent(user_message: str) -> dict:
     """
     Parse the user message into a structured intent dictionary.
@@ -65,190 +241,22 @@ def get_structured_intent(user_message: str) -> dict:
     - create tasks / reminders
     - fetch tasks
     - get chat history
-    - open external: youtube/maps/whatsapp
+    - open external: youtube/maps/whatsapp/spotify/instagram
     - general chat
     """
-    # Normalize and strip polite prefixes to simplify pattern matching
-    msg = user_message.lower().strip()
-    msg = re.sub(r'^(please\s+|please,\s+|can you\s+|could you\s+|would you\s+)', '', msg)
-
-    # ---------- Save Fact (explicit) ----------
-    match_fact = re.match(r"(save|remember) fact (.+?) as (.+)", msg)
-    if match_fact:
-        key = match_fact.group(2).strip()
-        value = match_fact.group(3).strip()
-        return {"action": "save_fact", "data": {"key": key, "value": value}}
-
-    # ---------- Save Fact (generic) ----------
-    match_generic_fact = re.match(r"(remember|my) (.+?) is (.+)", msg)
-    if match_generic_fact:
-        key = match_generic_fact.group(2).strip()
-        value = match_generic_fact.group(3).strip()
-        return {"action": "save_fact", "data": {"key": key, "value": value}}
-
-    # ---------- Create / Reminder Task (more flexible) ----------
-    # Patterns supported:
-    # - "create task <title> due <time>"
-    # - "add task to <title> at <time>"
-    # - "add a task to <title>" (optional time)
-    # - "remind me to <title> at <time>"
-    # - Polite prefixes like 'can you', 'please' are stripped above
-
-    # Try exact "create task ... due ..."
-    match_task = re.match(r"(?:create|add) task (.+?) due (.+)", msg)
-    if match_task:
-        title = match_task.group(1).strip()
-        time_part = match_task.group(2).strip()
-        datetime_value = parse_time_string(time_part) or None
-        return {
-            "action": "create_task",
-            "data": {
-                "title": title,
-                "datetime": datetime_value,
-                "priority": "medium",
-                "category": "personal",
-                "notes": "",
-            },
-        }
-
-    # "remind me to <action> at <time>" (common natural phrasing)
-    match_reminder = re.match(r"remind me to (.+?)(?: at (.+))?$,", msg)
-    # The previous regex above had a trailing comma; handle with a safer pattern below
-    match_reminder = re.match(r"remind me to (.+?)(?: at (.+))?$", msg)
-    if match_reminder:
-        title = match_reminder.group(1).strip()
-        time_part = match_reminder.group(2).strip() if match_reminder.group(2) else None
-        # If time_part is not provided, try to find time tokens inside the title
-        if not time_part:
-            tsrch = re.search(r"((?:\d{1,2}(?::\d{2})?\s?(?:am|pm))|\b(?:today|tomorrow)\b|in\s+\d+\s+(?:minute|minutes|hour|hours))", title)
-            if tsrch:
-                time_part = tsrch.group(1)
-                title = title.replace(time_part, "").strip()
-        datetime_value = parse_time_string(time_part) if time_part else None
-        return {
-            "action": "create_task",
-            "data": {
-                "title": title,
-                "datetime": datetime_value,
-                "priority": "medium",
-                "category": "personal",
-                "notes": "",
-            },
-        }
-
-    # Flexible "add/create (a) task to <title> [at <time>]" or "add me a task to <title>"
-    match_task_flex = re.match(r"(?:add|create)(?: me)?(?: a)?(?: task| reminder)?(?: to)? (.+?)(?: at (.+))?$", msg)
-    if match_task_flex:
-        title = match_task_flex.group(1).strip()
-        time_part = match_task_flex.group(2).strip() if match_task_flex.group(2) else None
-        # If time not captured, search anywhere in the title
-        if not time_part:
-            tsrch = re.search(r"((?:\d{1,2}(?::\d{2})?\s?(?:am|pm))|\b(?:today|tomorrow)\b|in\s+\d+\s+(?:minute|minutes|hour|hours))", title)
-            if tsrch:
-                time_part = tsrch.group(1)
-                title = title.replace(time_part, "").strip()
-        datetime_value = parse_time_string(time_part) if time_part else None
-        return {
-            "action": "create_task",
-            "data": {
-                "title": title,
-                "datetime": datetime_value,
-                "priority": "medium",
-                "category": "personal",
-                "notes": "",
-            },
-        }
-
-    # ---------- Fetch Tasks ----------
-    if any(keyword in msg for keyword in ["show tasks", "list tasks", "my tasks"]):
-        return {"action": "fetch_tasks"}
-
-    # ---------- Get Last Chat History ----------
-    if any(
-        keyword in msg for keyword in ["show chat history", "last chats", "previous messages"]
-    ):
-        return {"action": "get_chat_history"}
-
-    # ---------- External: YouTube ----------
-    # Support forms: 'play X on youtube', 'open youtube and search for X', 'search youtube for X', 'youtube: X', and action-only 'open youtube'
-    if not any(k in msg for k in ["what is youtube", "tell me about youtube", "about youtube"]):
-        m = None
-        # "play X on youtube" or "find X on youtube"
-        m = re.match(r"(?:search|find|play) (.+) on (?:youtube)\b", msg)
-        # "open youtube and search for X" or "open youtube search X"
-        if not m:
-            m = re.match(r"(?:open) (?:youtube) (?:and )?(?:search(?: for)?)? (.+)", msg)
-        # "search youtube for X" or "youtube: X"
-        if not m:
-            m = re.match(r"(?:search|find) (?:youtube) (?:for )?(.+)", msg)
-        if not m:
-            m = re.match(r"(?:youtube[:\-\s]+)(.+)", msg)
-        # action-only: 'open youtube' or 'launch youtube'
-        if not m:
-            m = re.match(r"^(?:open|launch|go to) (?:youtube)\b", msg)
-            if m:
-                return {"action": "open_external", "data": {"target": "youtube", "query": ""}}
-        if m:
-            query = m.group(1).strip()
-            return {"action": "open_external", "data": {"target": "youtube", "query": query}}
-
-    # ---------- External: Google Maps ----------
-    # Maps: support 'open maps for X', 'navigate to X', 'find X on maps', 'navigate me to', 'take me to', and action-only 'open maps'
-    if not any(k in msg for k in ["what is maps", "tell me about maps", "about maps"]):
-        m = None
-        m = re.match(r"(?:open|search) (?:maps|google maps) (?:for )?(.+)", msg)
-        if not m:
-            m = re.match(r"(?:find|navigate to|navigate me to|take me to|go to) (.+)", msg)
-        if not m:
-            m = re.match(r"maps[:\-\s]+(.+)", msg)
-        # action-only 'open maps'
-        if not m:
-            m = re.match(r"^(?:open|launch|go to) (?:maps|google maps)\b", msg)
-            if m:
-                return {"action": "open_external", "data": {"target": "maps", "query": ""}}
-        if m:
-            query = m.group(1).strip()
-            return {"action": "open_external", "data": {"target": "maps", "query": query}}
-
-    # ---------- External: WhatsApp ----------
-    wa = re.match(r"(?:open|send on )?whatsapp(?: to)? (.+)", msg) or re.match(r"whatsapp[:\-\s]+(.+)", msg)
-    if wa:
-        query = wa.group(1).strip()
-        return {"action": "open_external", "data": {"target": "whatsapp", "query": query}}
-
-    # ---------- External: Spotify ----------
-    # Spotify: 'play <song> on spotify', 'open spotify and search for <query>', 'spotify: <query>' and action-only 'open spotify'
-    if not any(k in msg for k in ["what is spotify", "tell me about spotify", "about spotify"]):
-        m = None
-        m = re.match(r"(?:play|find) (.+) on (?:spotify)\b", msg)
-        if not m:
-            m = re.match(r"(?:open) (?:spotify) (?:and )?(?:search(?: for)?)? (.+)", msg)
-        if not m:
-            m = re.match(r"spotify[:\-\s]+(.+)", msg)
-        # action-only 'open spotify'
-        if not m:
-            m = re.match(r"^(?:open|launch|go to) (?:spotify)\b", msg)
-            if m:
-                return {"action": "open_external", "data": {"target": "spotify", "query": ""}}
-        if m:
-            query = m.group(1).strip()
-            return {"action": "open_external", "data": {"target": "spotify", "query": query}}
-
-    # ---------- External: Instagram ----------
-    # Instagram: 'open instagram and search for X', 'instagram: X' and action-only 'open instagram'
-    if not any(k in msg for k in ["what is instagram", "tell me about instagram", "about instagram"]):
-        m = None
-        m = re.match(r"(?:open|search|show|find) (?:instagram) (?:and )?(?:search(?: for)?)? (.+)", msg)
-        if not m:
-            m = re.match(r"instagram[:\-\s]+(.+)", msg)
-        # action-only 'open instagram'
-        if not m:
-            m = re.match(r"^(?:open|launch|go to) (?:instagram)\b", msg)
-            if m:
-                return {"action": "open_external", "data": {"target": "instagram", "query": ""}}
-        if m:
-            query = m.group(1).strip()
-            return {"action": "open_external", "data": {"target": "instagram", "query": query}}
+    return _ENGINE.match(normalize_message(user_message)) or {"action": "general_chat"}
+
 
-    # ---------- General Chat ----------
-    return {"action": "general_chat"}
\ No newline at end of file
+# ======================================================
+# 🔹 Quick-answer phrase matchers
+# ======================================================
+# Shared by main.py (greeting/name/email) and ai_services (date/time) so the
+# phrase lists are compiled once instead of scanned with any(...) per call.
+GREETING_RE = re.compile(r'^\s*(?:hi|hello|hey|greetings|good morning|good afternoon|good evening)\b(?:\s+\S{1,30}){0,3}[,!.\-]*\s*', re.IGNORECASE)
+NAME_QUERY_RE = _keywords("what is my name", "what's my name", "who am i", "do you know my name", "my name")
+EMAIL_QUERY_RE = _keywords("what is my email", "what's my email", "what is my e-mail", "my email")
+DATE_QUERY_RE = _keywords(
+    "what is the date", "what's the date", "date today", "what is today's date", "what's today's date", "what day is it", "what day is today", "day today",
+    "today's date", "what is today", "what day is it today",
+)
+TIME_QUERY_RE = _keywords("what time is it", "what's the time", "current time", "time now")
@@ -0,0 +1,426 @@
+# backend/app/services/reminders.py
+"""
+Exact-time task reminders.
+
+A reminder is a Celery ETA job (worker.send_reminder) enqueued for the task's
+due time when the task is saved. Jobs are only enqueued for reminders due
+within REMINDER_ETA_HORIZON seconds, because the Redis broker redelivers
+unacknowledged ETA messages after its visibility timeout; tasks further out
+are picked up by the reconciliation sweep (worker.check_and_trigger_tasks)
+once they enter the horizon.
+
+tasks.reminder_eta records the due time a job was enqueued for. Moving a
+task's datetime makes it differ, so the sweep enqueues a fresh job. Every
+job re-checks the row when it fires (dispatch_due), so jobs for deleted,
+completed or rescheduled tasks are no-ops; cancel_reminder() additionally
+revokes them as a courtesy.
+
+Users can opt into digests (users.reminder_digest): when one of their
+reminders fires, their other tasks due within REMINDER_DIGEST_WINDOW go out
+in the same email, and reminder_digests records which tasks it covered.
+
+Backlogs (reminders still unsent after the grace period) are not fanned out
+one job per task: the sweep starts a few worker.dispatch_reminders jobs that
+claim due tasks in batches with FOR UPDATE SKIP LOCKED.
+
+Task datetimes are naive IST timestamps, like the rest of the tasks table.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import pytz
+
+from app.config import settings
+from app.db.utils import get_connection
+from app.services.mail_queue import make_message
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone("Asia/Kolkata")
+SEND_REMINDER_TASK = "worker.send_reminder"
+SWEEP_BATCH_SIZE = 1000
+
+_LAG_KEY = "reminders:delivery_lag_ms"
+_LAG_SAMPLES = 1000
+
+
+def now_ist() -> datetime:
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def _as_naive_ist(due: Union[str, datetime]) -> datetime:
+    if isinstance(due, str):
+        due = datetime.fromisoformat(due)
+    if due.tzinfo is not None:
+        due = due.astimezone(IST).replace(tzinfo=None)
+    return due
+
+
+def reminder_job_id(task_id: int, due: Union[str, datetime]) -> str:
+    """
+    Deterministic Celery task id, so a job can be revoked without storing it.
+    """
+    return f"reminder-{task_id}-{int(_as_naive_ist(due).timestamp())}"
+
+
+def _celery():
+    # Imported lazily: the web process only needs the Celery client to enqueue
+    from app.worker import celery
+    return celery
+
+
+def _enqueue(task_id: int, due: datetime):
+    _celery().send_task(
+        SEND_REMINDER_TASK,
+        args=[task_id],
+        eta=IST.localize(due),
+        task_id=reminder_job_id(task_id, due),
+    )
+
+
+def _mark_enqueued(cur, jobs: List[tuple]):
+    # Only rows whose datetime still matches what was enqueued
+    cur.execute(
+        """
+        UPDATE tasks t SET reminder_eta = v.due
+        FROM unnest(%s::int[], %s::timestamp[]) AS v(id, due)
+        WHERE t.id = v.id AND t.datetime = v.due;
+        """,
+        ([j[0] for j in jobs], [j[1] for j in jobs]),
+    )
+
+
+def schedule_reminder(task_id: int, due: Union[str, datetime, None]) -> bool:
+    """
+    Enqueue the reminder for a newly saved or rescheduled task if it is due
+    within the ETA horizon. Returns True if a job was enqueued. Failures are
+    logged and left to the reconciliation sweep.
+    """
+    if not task_id or not due:
+        return False
+    try:
+        due = _as_naive_ist(due)
+    except ValueError:
+        logger.warning("Task %s has an unparseable datetime %r; no reminder scheduled", task_id, due)
+        return False
+    if due > now_ist() + timedelta(seconds=settings.REMINDER_ETA_HORIZON):
+        return False
+
+    try:
+        _enqueue(task_id, due)
+    except Exception as e:
+        logger.warning("Failed to enqueue reminder for task %s: %s", task_id, e)
+        return False
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        _mark_enqueued(cur, [(task_id, due)])
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.warning("Failed to record reminder for task %s: %s", task_id, e)
+    finally:
+        cur.close()
+        conn.close()
+    return True
+
+
+def cancel_reminder(task_id: int, due: Union[str, datetime, None]):
+    """
+    Best-effort revoke of an enqueued reminder job. Not required for
+    correctness: the job re-checks the task when it fires.
+    """
+    if not task_id or not due:
+        return
+    try:
+        _celery().control.revoke(reminder_job_id(task_id, due))
+    except Exception as e:
+        logger.debug("Could not revoke reminder for task %s: %s", task_id, e)
+
+
+def reconcile_reminders(now: Optional[datetime] = None, limit: int = SWEEP_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Safety net, run every REMINDER_SWEEP_INTERVAL seconds. Enqueues ETA jobs
+    for pending tasks that entered the horizon or were rescheduled, and
+    counts tasks still unsent REMINDER_GRACE_SECONDS after their due time
+    (lost job, worker outage) so the caller can fan out batch dispatchers
+    for them. Both queries use the partial index on pending tasks' datetime.
+    """
+    now = now or now_ist()
+    horizon_end = now + timedelta(seconds=settings.REMINDER_ETA_HORIZON)
+    stale_before = now - timedelta(seconds=settings.REMINDER_GRACE_SECONDS)
+    result = {"enqueued": 0, "overdue": 0, "errors": 0}
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT id, datetime FROM tasks
+            WHERE notified IS NOT TRUE
+              AND user_id IS NOT NULL
+              AND datetime > %s AND datetime <= %s
+              AND reminder_eta IS DISTINCT FROM datetime
+            ORDER BY datetime
+            LIMIT %s;
+            """,
+            (stale_before, horizon_end, limit),
+        )
+        rows = cur.fetchall()
+
+        jobs = []
+        for row in rows:
+            try:
+                _enqueue(row["id"], row["datetime"])
+            except Exception as e:
+                result["errors"] += 1
+                logger.warning("Failed to enqueue reminder for task %s: %s", row["id"], e)
+                continue
+            jobs.append((row["id"], row["datetime"]))
+        if jobs:
+            _mark_enqueued(cur, jobs)
+            conn.commit()
+        result["enqueued"] = len(jobs)
+
+        # Bounded count: only needs to tell "how many dispatchers", not the exact backlog
+        cur.execute(
+            """
+            SELECT count(*) AS overdue FROM (
+                SELECT 1 FROM tasks
+                WHERE notified IS NOT TRUE AND user_id IS NOT NULL AND datetime <= %s
+                LIMIT %s
+            ) o;
+            """,
+            (stale_before, settings.REMINDER_DISPATCH_BATCH * settings.REMINDER_DISPATCH_FANOUT),
+        )
+        result["overdue"] = cur.fetchone()["overdue"]
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    if result["overdue"]:
+        logger.warning("⏰ %d+ reminder(s) still unsent past the grace period", result["overdue"])
+    return result
+
+
+def dispatchers_needed(overdue: int) -> int:
+    batch = max(1, settings.REMINDER_DISPATCH_BATCH)
+    return min(settings.REMINDER_DISPATCH_FANOUT, -(-overdue // batch))
+
+
+def _format_reminder(task: Dict[str, Any]) -> tuple:
+    subject = f"Task Reminder: {task['title']}"
+    body = (
+        f"📌 Hi {task.get('name') or 'there'},\n\nThis is a reminder for your task:\n\n"
+        f"Title: {task['title']}\nDetails: {task.get('notes') or 'No details provided.'}\n\n"
+        "— Your Personal AI Assistant"
+    )
+    return subject, body
+
+
+def _format_digest(tasks: List[Dict[str, Any]]) -> tuple:
+    subject = f"Task Reminders: {len(tasks)} tasks due"
+    lines = []
+    for task in tasks:
+        line = f"• {task['datetime']:%H:%M} — {task['title']}"
+        if task.get("notes"):
+            line += f"\n    {task['notes']}"
+        lines.append(line)
+    body = (
+        f"📌 Hi {tasks[0].get('name') or 'there'},\n\nThese tasks are due now or shortly:\n\n"
+        + "\n".join(lines)
+        + "\n\n— Your Personal AI Assistant"
+    )
+    return subject, body
+
+
+def _claim_digest_companions(cur, claimed: List[Dict[str, Any]], until: datetime) -> List[Dict[str, Any]]:
+    """
+    For users who prefer digests, also claim their other pending tasks due
+    by `until`, so they go out in the same email.
+    """
+    digest_users = sorted({t["user_id"] for t in claimed if t["reminder_digest"]})
+    if not digest_users:
+        return []
+    cur.execute(
+        """
+        SELECT t.id, t.user_id, t.title, t.notes, t.datetime, u.email, u.name, u.reminder_digest
+        FROM tasks t
+        JOIN users u ON u.id = t.user_id
+        WHERE t.user_id = ANY(%s)
+          AND t.notified IS NOT TRUE
+          AND t.datetime <= %s
+          AND t.id <> ALL(%s)
+        ORDER BY t.datetime
+        FOR UPDATE OF t SKIP LOCKED;
+        """,
+        (digest_users, until, [t["id"] for t in claimed]),
+    )
+    return cur.fetchall()
+
+
+def _message(tasks: List[Dict[str, Any]], now: datetime) -> Dict[str, Any]:
+    if len(tasks) == 1:
+        subject, body = _format_reminder(tasks[0])
+        key = reminder_job_id(tasks[0]["id"], tasks[0]["datetime"])
+    else:
+        subject, body = _format_digest(tasks)
+        key = f"digest-{tasks[0]['user_id']}-" + "-".join(str(t["id"]) for t in tasks)
+    # Lag is only meaningful for reminders already due, not ones pulled forward
+    due = [t["datetime"] for t in tasks if t["datetime"] <= now]
+    return make_message(tasks[0]["email"], subject, body, key=key, due=due)
+
+
+def build_messages(claimed: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[tuple]:
+    """
+    Group claimed tasks into mail-queue messages: one per task, or one per
+    user for users with reminder_digest on. Returns [(message, [tasks]), ...].
+    """
+    now = now or now_ist()
+    by_user: Dict[int, List[Dict[str, Any]]] = {}
+    messages = []
+    for task in claimed:
+        if task.get("reminder_digest"):
+            by_user.setdefault(task["user_id"], []).append(task)
+        else:
+            messages.append((_message([task], now), [task]))
+    for tasks in by_user.values():
+        tasks.sort(key=lambda t: t["datetime"])
+        messages.append((_message(tasks, now), tasks))
+    return messages
+
+
+def dispatch_due(
+    send_many: Callable[[List[Dict[str, Any]]], List[Optional[Exception]]],
+    limit: Optional[int] = None,
+    task_ids: Optional[List[int]] = None,
+    now: Optional[datetime] = None,
+) -> List[int]:
+    """
+    Claim up to `limit` due, pending tasks (optionally only `task_ids`) with
+    their owners in one query, hand them to send_many() as one batch of
+    mail-queue messages (mail_queue.enqueue_emails in the worker), then mark
+    the handed-off ones notified in one UPDATE and commit.
+
+    Users with reminder_digest on get one email per batch: their other
+    pending tasks due within REMINDER_DIGEST_WINDOW seconds are claimed too
+    and listed in it, and the digest is recorded in reminder_digests.
+
+    Rows stay locked (FOR UPDATE ... SKIP LOCKED) until the commit, so any
+    number of workers can run this concurrently without double-sending;
+    each skips what the others hold. If the worker dies mid-batch the locks
+    are released and the rows are picked up again. Each message carries an
+    idempotency key, so a batch retried after a crash can't email twice.
+    Returns the ids of the tasks handed off.
+    """
+    limit = limit or settings.REMINDER_DISPATCH_BATCH
+    now = now or now_ist()
+    only_ids = "AND t.id = ANY(%s)" if task_ids is not None else ""
+    params = [now + timedelta(seconds=1)]  # one second of slack for an ETA job that fires a hair early
+    if task_ids is not None:
+        params.append(list(task_ids))
+    params.append(limit)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            SELECT t.id, t.user_id, t.title, t.notes, t.datetime, u.email, u.name, u.reminder_digest
+            FROM tasks t
+            JOIN users u ON u.id = t.user_id
+            WHERE t.notified IS NOT TRUE
+              AND t.datetime <= %s
+              {only_ids}
+            ORDER BY t.datetime
+            LIMIT %s
+            FOR UPDATE OF t SKIP LOCKED;
+            """,
+            params,
+        )
+        claimed = cur.fetchall()
+        if claimed:
+            until = now + timedelta(seconds=settings.REMINDER_DIGEST_WINDOW)
+            claimed = claimed + _claim_digest_companions(cur, claimed, until)
+
+        messages = build_messages(claimed, now)
+        results = send_many([m for m, _ in messages]) if messages else []
+        sent, digests = [], []
+        sent_at = now_ist()
+        for (_, tasks), error in zip(messages, results):
+            ids = [t["id"] for t in tasks]
+            if error is not None:
+                # Left unmarked: retried by the next sweep
+                logger.warning("Reminder for task(s) %s failed: %s", ids, error)
+                continue
+            sent.extend(ids)
+            if len(tasks) > 1:
+                digests.append((tasks[0]["user_id"], ids))
+
+        if sent:
+            cur.execute("UPDATE tasks SET notified = TRUE WHERE id = ANY(%s);", (sent,))
+        for user_id, ids in digests:
+            cur.execute(
+                "INSERT INTO reminder_digests (user_id, task_ids, sent_at) VALUES (%s, %s, %s);",
+                (user_id, ids, sent_at),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    if digests:
+        logger.info("📬 Queued %d digest(s) covering %d task(s)", len(digests), sum(len(ids) for _, ids in digests))
+    return sent
+
+
+# ======================================================
+# 🔹 Delivery lag (due time → email accepted by SMTP, recorded by mail_queue)
+# ======================================================
+def record_delivery_lag(*seconds: float):
+    from app.db.redis_utils import client
+    try:
+        pipe = client.pipeline()
+        pipe.lpush(_LAG_KEY, *[int(s * 1000) for s in seconds])
+        pipe.ltrim(_LAG_KEY, 0, _LAG_SAMPLES - 1)
+        pipe.execute()
+    except Exception as e:
+        logger.debug("Could not record reminder lag: %s", e)
+
+
+def get_reminder_stats() -> Dict[str, Any]:
+    """
+    Delivery lag percentiles over the last _LAG_SAMPLES reminders.
+    """
+    from app.db.redis_utils import client
+    samples = sorted(int(v) for v in client.lrange(_LAG_KEY, 0, -1))
+    if not samples:
+        return {"samples": 0}
+
+    def pct(p: float) -> int:
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+    return {
+        "samples": len(samples),
+        "lag_ms_p50": pct(0.50),
+        "lag_ms_p95": pct(0.95),
+        "lag_ms_max": samples[-1],
+    }
+
+
+def deliver(task_id: int, send_many: Callable[[List[Dict[str, Any]]], List[Optional[Exception]]]) -> bool:
+    """
+    Hand one task's reminder to the mail queue (the ETA job path). False if
+    the task was deleted, completed, moved later, already sent, or is being
+    dispatched by a batch dispatcher right now.
+    """
+    return bool(dispatch_due(send_many, limit=1, task_ids=[task_id]))
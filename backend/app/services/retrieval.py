@@ -0,0 +1,162 @@
+# backend/app/services/retrieval.py
+"""
+Retrieval post-processing for semantic memory context.
+
+Over-fetches candidates from the vector store, then:
+  1. drops matches below RETRIEVAL_MIN_SCORE,
+  2. drops repeated texts (case/whitespace-insensitive),
+  3. re-ranks with Maximal Marginal Relevance so near-identical snippets do
+     not crowd out other relevant ones,
+  4. stops adaptively once relevance falls too far below the best match or
+     the context token budget is spent.
+
+Token counts are estimated at ~4 characters per token.
+"""
+
+import logging
+import re
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.semantic_memory import query_semantic_memory
+
+logger = logging.getLogger(__name__)
+
+_stats = {"requests": 0, "candidates": 0, "selected": 0, "tokens_saved": 0}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _text(match: Dict[str, Any]) -> str:
+    return (match.get("metadata") or {}).get("text") or ""
+
+
+def _norm_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _token_set(text: str) -> set:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def _similarity_matrix(cands: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Pairwise cosine similarity of candidate vectors, or token Jaccard
+    similarity when the store did not return vectors.
+    """
+    if cands and all(c.get("values") for c in cands):
+        mat = np.asarray([c["values"] for c in cands], dtype=np.float32)
+        mat /= np.maximum(np.linalg.norm(mat, axis=1, keepdims=True), 1e-12)
+        return mat @ mat.T
+
+    sets = [_token_set(_text(c)) for c in cands]
+    n = len(cands)
+    sim = np.eye(n, dtype=np.float32)
+    for i in range(n):
+        for j in range(i + 1, n):
+            union = len(sets[i] | sets[j])
+            sim[i, j] = sim[j, i] = len(sets[i] & sets[j]) / union if union else 0.0
+    return sim
+
+
+def prune_matches(
+    matches: List[Dict[str, Any]],
+    max_results: int = 5,
+    min_score: Optional[float] = None,
+    mmr_lambda: Optional[float] = None,
+    relative_cutoff: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Select the matches worth putting in the prompt.
+    Returns (selected matches, stats). Stats compare against the previous
+    behaviour of pasting the first `max_results` raw matches.
+    """
+    min_score = settings.RETRIEVAL_MIN_SCORE if min_score is None else min_score
+    mmr_lambda = settings.RETRIEVAL_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    relative_cutoff = settings.RETRIEVAL_RELATIVE_CUTOFF if relative_cutoff is None else relative_cutoff
+    max_tokens = settings.RETRIEVAL_MAX_TOKENS if max_tokens is None else max_tokens
+
+    baseline_tokens = sum(estimate_tokens(_text(m)) for m in matches[:max_results])
+    stats = {"candidates": len(matches), "below_threshold": 0, "duplicates": 0}
+
+    # 1️⃣ Score threshold + 2️⃣ exact-text dedup (keep the best-scoring copy)
+    best_by_text: Dict[str, Dict[str, Any]] = {}
+    for m in matches:
+        score = m.get("score") or 0.0
+        txt = _text(m)
+        if score < min_score or not txt.strip():
+            stats["below_threshold"] += 1
+            continue
+        key = _norm_text(txt)
+        prev = best_by_text.get(key)
+        if prev is not None:
+            stats["duplicates"] += 1
+            if score <= (prev.get("score") or 0.0):
+                continue
+        best_by_text[key] = m
+    cands = sorted(best_by_text.values(), key=lambda m: m.get("score") or 0.0, reverse=True)
+
+    # 3️⃣ MMR re-ranking with 4️⃣ adaptive stopping
+    selected: List[int] = []
+    used_tokens = 0
+    if cands:
+        sim = _similarity_matrix(cands)
+        relevance = np.asarray([c.get("score") or 0.0 for c in cands], dtype=np.float32)
+        floor = float(relevance[0]) * relative_cutoff
+        remaining = list(range(len(cands)))
+        while remaining and len(selected) < max_results:
+            if selected:
+                redundancy = sim[np.ix_(remaining, selected)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining), dtype=np.float32)
+            mmr = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+            pick = remaining[int(np.argmax(mmr))]
+            if selected and relevance[pick] < floor:
+                break
+            cost = estimate_tokens(_text(cands[pick]))
+            if selected and used_tokens + cost > max_tokens:
+                break
+            selected.append(pick)
+            used_tokens += cost
+            remaining.remove(pick)
+
+    chosen = [cands[i] for i in selected]
+    stats.update({
+        "selected": len(chosen),
+        "tokens_baseline": baseline_tokens,
+        "tokens_selected": used_tokens,
+        "tokens_saved": baseline_tokens - used_tokens,
+    })
+    return chosen, stats
+
+
+def retrieve_memory_context(user_id: str, query: str, top_k: int = 5) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Over-fetch semantic memory for a query and prune it for the prompt.
+    """
+    fetch_k = max(top_k, top_k * settings.RETRIEVAL_OVERFETCH)
+    matches = query_semantic_memory(user_id, query, top_k=fetch_k, include_values=True)
+    chosen, stats = prune_matches(matches, max_results=top_k)
+
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["candidates"] += stats["candidates"]
+        _stats["selected"] += stats["selected"]
+        _stats["tokens_saved"] += stats["tokens_saved"]
+    logger.info(
+        "[Retrieval] user=%s candidates=%d selected=%d below_threshold=%d duplicates=%d tokens_saved=%d",
+        user_id, stats["candidates"], stats["selected"], stats["below_threshold"], stats["duplicates"], stats["tokens_saved"],
+    )
+    return chosen, stats
+
+
+def get_retrieval_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
@@ -2,20 +2,101 @@
 import uuid
 import time
 import logging
+import threading
+from collections import OrderedDict, deque
 from typing import List, Dict, Any, Optional
 
-from app.db.pinecone_utils import upsert_vectors, query_vectors, init_pinecone
+import numpy as np
+
+from app.config import settings
+from app.db import vector_ledger
+from app.db.vector_store import get_vector_store, query_user_vectors, write_namespace
 from app.services.embeddings import get_embedding, get_batch_embeddings
 
 logger = logging.getLogger(__name__)
 
-# Ensure Pinecone client/Index is initialized once at import
+# Ensure the vector store is initialized once at import
 try:
-    init_pinecone()
+    get_vector_store()
 except Exception as e:
-    logger.error("Pinecone init failed at import: %s", e)
+    logger.error("Vector store init failed at import: %s", e)
+
+
+# =========================================================
+# 🔹 Near-duplicate suppression
+# =========================================================
+class RecentVectorBuffer:
+    """
+    Per-user ring buffer of recently written vectors.
+    A new vector whose cosine similarity to a buffered one is at or above the
+    threshold is treated as a near-duplicate of it.
+    """
+
+    def __init__(self, window: int = 32, max_users: int = 2000):
+        self.window = window
+        self.max_users = max_users
+        self._buffers: "OrderedDict[tuple, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vec) -> np.ndarray:
+        arr = np.asarray(vec, dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm > 0 else arr
+
+    def find(self, key: tuple, vec, threshold: float) -> Optional[Dict[str, Any]]:
+        """
+        Return the most similar buffered entry above the threshold, if any.
+        """
+        with self._lock:
+            buf = self._buffers.get(key)
+            if not buf:
+                return None
+            self._buffers.move_to_end(key)
+            unit = self._unit(vec)
+            sims = np.stack([e["unit"] for e in buf]) @ unit
+            best = int(np.argmax(sims))
+            return buf[best] if sims[best] >= threshold else None
+
+    def add(self, key: tuple, item_id: str, vec):
+        with self._lock:
+            buf = self._buffers.get(key)
+            if buf is None:
+                buf = self._buffers[key] = deque(maxlen=self.window)
+                if len(self._buffers) > self.max_users:
+                    self._buffers.popitem(last=False)
+            else:
+                self._buffers.move_to_end(key)
+            buf.append({"id": item_id, "unit": self._unit(vec)})
+
+
+_recent = RecentVectorBuffer(window=settings.SEMANTIC_DEDUP_WINDOW)
+_dedup_stats = {"checked": 0, "skipped": 0}
+_dedup_stats_lock = threading.Lock()
+
+
+def get_dedup_stats() -> Dict[str, int]:
+    """
+    Writes checked for near-duplicates and writes skipped (merged into an existing vector).
+    """
+    with _dedup_stats_lock:
+        return dict(_dedup_stats)
+
+
+def _dedup_enabled() -> bool:
+    return settings.SEMANTIC_DEDUP_THRESHOLD > 0 and settings.SEMANTIC_DEDUP_WINDOW > 0
 
 
+def _record_check(skipped: bool):
+    with _dedup_stats_lock:
+        _dedup_stats["checked"] += 1
+        if skipped:
+            _dedup_stats["skipped"] += 1
+
+
+# =========================================================
+# 🔹 Store / Query
+# =========================================================
 def store_semantic_memory(
     user_id: str,
     text: str,
@@ -24,13 +105,37 @@ def store_semantic_memory(
 ) -> Dict[str, Any]:
     """
     Store one text entry with embedding for user.
+    Defaults to the user's own namespace (see SEMANTIC_NAMESPACE_MODE).
+    Text and extra metadata go to the Postgres ledger; the vector keeps ids only.
+    Near-duplicates of a recent entry only bump that entry's hit_count.
     """
     try:
         vec = get_embedding(text)
+        ns = namespace or write_namespace(user_id)
+        key = (user_id, ns)
+
+        if _dedup_enabled():
+            dup = _recent.find(key, vec, settings.SEMANTIC_DEDUP_THRESHOLD)
+            _record_check(dup is not None)
+            if dup is not None:
+                ok = vector_ledger.bump_hits([dup["id"]], int(time.time()))
+                return {"ok": ok, "id": dup["id"], "deduplicated": True}
+
         item_id = f"{user_id}-{uuid.uuid4()}"
-        meta = dict(metadata or {})
-        meta.update({"user_id": user_id, "text": text, "stored_at": int(time.time())})
-        ok = upsert_vectors([{"id": item_id, "values": vec, "metadata": meta}])
+        now = int(time.time())
+        # The vector carries no text: without its ledger row it could never be
+        # hydrated or expired, so do not write it
+        if not vector_ledger.record_vectors(
+            [{"id": item_id, "user_id": user_id, "text": text, "stored_at": now, "metadata": metadata}],
+            namespace=ns,
+        ):
+            return {"ok": False, "error": "vector ledger write failed"}
+        ok = get_vector_store().upsert(
+            [{"id": item_id, "values": vec, "metadata": {"user_id": user_id, "stored_at": now}}],
+            namespace=ns,
+        )
+        if ok and _dedup_enabled():
+            _recent.add(key, item_id, vec)
         return {"ok": ok, "id": item_id}
     except Exception as e:
         logger.error("store_semantic_memory failed: %s", e)
@@ -38,58 +143,74 @@ def store_semantic_memory(
 
 
 def store_many(
-    user_id: str, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None
+    user_id: str,
+    texts: List[str],
+    metadatas: Optional[List[Dict[str, Any]]] = None,
+    embeddings: Optional[List[List[float]]] = None,
 ) -> Dict[str, Any]:
     """
     Batch store multiple text entries.
+    Pass `embeddings` when the caller already has them (one per text).
+    Near-duplicates (of recent entries or of each other) are merged, not stored.
     """
     try:
         if not texts:
-            return {"ok": True, "stored": 0}
+            return {"ok": True, "stored": 0, "skipped": 0}
         if metadatas is None:
             metadatas = [{} for _ in texts]
-        embeddings = get_batch_embeddings(texts)
-        items = []
+        if embeddings is None:
+            embeddings = get_batch_embeddings(texts)
+        ns = write_namespace(user_id)
+        key = (user_id, ns)
+        dedup = _dedup_enabled()
+        # Duplicates within the batch are caught here; _recent only learns the
+        # new vectors once they are stored
+        batch = RecentVectorBuffer(window=len(embeddings), max_users=1)
+
+        items, ledger_rows, hits = [], [], []
         now = int(time.time())
         for i, emb in enumerate(embeddings):
-            meta = dict(metadatas[i]) if i < len(metadatas) else {}
-            meta.update({"user_id": user_id, "text": texts[i], "stored_at": now})
-            items.append(
-                {"id": f"{user_id}-{uuid.uuid4()}", "values": emb, "metadata": meta}
-            )
-        ok = upsert_vectors(items)
-        return {"ok": ok, "stored": len(items)}
+            if dedup:
+                dup = _recent.find(key, emb, settings.SEMANTIC_DEDUP_THRESHOLD) or batch.find(
+                    key, emb, settings.SEMANTIC_DEDUP_THRESHOLD)
+                _record_check(dup is not None)
+                if dup is not None:
+                    hits.append(dup["id"])
+                    continue
+
+            item_id = f"{user_id}-{uuid.uuid4()}"
+            extra = metadatas[i] if i < len(metadatas) else {}
+            ledger_rows.append({"id": item_id, "user_id": user_id, "text": texts[i], "stored_at": now, "metadata": extra})
+            items.append({"id": item_id, "values": emb, "metadata": {"user_id": user_id, "stored_at": now}})
+            if dedup:
+                batch.add(key, item_id, emb)
+
+        if not vector_ledger.record_vectors(ledger_rows, namespace=ns):
+            return {"ok": False, "error": "vector ledger write failed"}
+        ok = get_vector_store().upsert(items, namespace=ns)
+        if ok and dedup:
+            for item in items:
+                _recent.add(key, item["id"], item["values"])
+        if hits:
+            # Rows created earlier in this same batch are in the ledger by now
+            vector_ledger.bump_hits(hits, now)
+        return {"ok": ok, "stored": len(items), "skipped": len(hits)}
     except Exception as e:
         logger.error("store_many failed: %s", e)
         return {"ok": False, "error": str(e)}
 
 
 def query_semantic_memory(
-    user_id: str, query: str, top_k: int = 5
+    user_id: str, query: str, top_k: int = 5, include_values: bool = False
 ) -> List[Dict[str, Any]]:
     """
-    Query Pinecone for semantically similar past messages.
-    Returns list of {'id':..., 'score':..., 'metadata':{...}}.
+    Query the vector store for semantically similar past messages.
+    Returns list of {'id':..., 'score':..., 'metadata':{...}} (plus 'values' if requested).
     """
     try:
         vec = get_embedding(query)
-        filter_obj = {"user_id": {"$eq": user_id}}
-        res = query_vectors(vector=vec, top_k=top_k, filter=filter_obj)
-        if not res:
-            return []
-
-        # Normalize Pinecone results
-        matches = []
-        raw = getattr(res, "matches", None) or res.get("matches", [])
-        for m in raw:
-            matches.append(
-                {
-                    "id": getattr(m, "id", None) or m.get("id"),
-                    "score": getattr(m, "score", None) or m.get("score"),
-                    "metadata": getattr(m, "metadata", None) or m.get("metadata", {}),
-                }
-            )
-        return matches
+        matches = query_user_vectors(user_id, vec, top_k=top_k, include_values=include_values)
+        return vector_ledger.hydrate_matches(matches)
     except Exception as e:
         logger.error("query_semantic_memory failed: %s", e)
         return []
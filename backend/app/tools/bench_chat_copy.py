@@ -0,0 +1,158 @@
+# backend/app/tools/bench_chat_copy.py
+"""
+Chat History Bulk Copy Benchmark
+--------------------------------
+Measures chat history throughput in rows/s against the configured
+PostgreSQL for a throwaway bench user:
+
+    save_chat     the per-message path (--legacy-rows messages)
+    copy import   app.tools.chat_history_copy.import_chats on a generated CSV
+                  of --rows messages in chats of --turns-per-chat
+    re-import     the same file again (every row is a duplicate and is dropped)
+    copy export   app.tools.chat_history_copy.export_chats for the bench user
+
+The bench user and everything it owns are deleted afterwards.
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.bench_chat_copy --rows 200000 --legacy-rows 2000
+"""
+
+import argparse
+import csv
+import logging
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.db.utils import get_connection, save_chat
+from app.tools.chat_history_copy import export_chats, import_chats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORDS = ("remind", "meeting", "tomorrow", "groceries", "project", "deadline", "call", "mom", "weather",
+         "flight", "book", "dentist", "report", "gym", "budget", "recipe", "friday", "summary")
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def create_user() -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "INSERT INTO users (name, email, password_hash) VALUES ('bench', %s, 'x') RETURNING id;",
+            (f"bench-copy-{uuid.uuid4().hex[:8]}@example.invalid",),
+        )
+        user_id = cur.fetchone()["id"]
+        conn.commit()
+        return user_id
+    finally:
+        cur.close()
+        conn.close()
+
+
+def cleanup(user_id: int, chat_ids):
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM users WHERE id = %s;", (user_id,))  # cascades to chats and chat_history
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    try:
+        from app.db.redis_utils import invalidate_cached_turns_many
+        invalidate_cached_turns_many((user_id, chat_id) for chat_id in chat_ids)
+    except Exception as e:
+        logger.warning("Could not evict the bench chats from Redis: %s", e)
+
+
+def write_csv(path: str, user_id: int, rows: int, turns_per_chat: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=30)
+    chat_ids = []
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["user_id", "chat_id", "user_query", "ai_response", "created_at"])
+        for i in range(rows):
+            if i % turns_per_chat == 0:
+                chat_ids.append(str(uuid.uuid4()))
+            created_at = start + timedelta(seconds=i)
+            out.writerow([user_id, chat_ids[-1], _sentence(rng, 10), _sentence(rng, 60), created_at.isoformat(sep=" ")])
+    return chat_ids
+
+
+def bench_save_chat(user_id: int, rows: int, turns_per_chat: int) -> tuple:
+    rng = random.Random(1)
+    chat_ids = []
+    start = time.perf_counter()
+    for i in range(rows):
+        chat_id = chat_ids[-1] if i % turns_per_chat else None
+        used = save_chat(user_id, _sentence(rng, 10), _sentence(rng, 60), chat_id)
+        if chat_id is None:
+            chat_ids.append(used)
+    return {"mode": "save_chat", "rows": rows, "seconds": time.perf_counter() - start}, chat_ids
+
+
+def _timed(fn, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat history COPY import/export throughput benchmark")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--legacy-rows", type=int, default=2_000, help="0 skips the save_chat baseline")
+    parser.add_argument("--turns-per-chat", type=int, default=20)
+    args = parser.parse_args()
+
+    user_id = create_user()
+    chat_ids = []
+    fd, csv_path = tempfile.mkstemp(prefix="bench-chats-", suffix=".csv")
+    os.close(fd)
+    export_path = csv_path.replace(".csv", "-export.csv")
+    results = []
+    try:
+        if args.legacy_rows:
+            result, legacy_chats = bench_save_chat(user_id, args.legacy_rows, args.turns_per_chat)
+            chat_ids += legacy_chats
+            results.append(result)
+
+        chat_ids += write_csv(csv_path, user_id, args.rows, args.turns_per_chat)
+        logger.info("Generated %d rows (%.1f MiB)", args.rows, os.path.getsize(csv_path) / 2**20)
+
+        with open(csv_path, "rb") as src:
+            seconds, counts = _timed(import_chats, src)
+        results.append({"mode": "copy import", "rows": counts["imported"], "seconds": seconds})
+        if counts["imported"] != args.rows:
+            logger.warning("Imported %d of %d rows: %s", counts["imported"], args.rows, counts)
+
+        with open(csv_path, "rb") as src:
+            seconds, counts = _timed(import_chats, src)
+        results.append({"mode": f"re-import ({counts['duplicate']} dup)", "rows": counts["rows"], "seconds": seconds})
+
+        with open(export_path, "wb") as dst:
+            seconds, exported = _timed(export_chats, dst, user_id=user_id)
+        results.append({"mode": "copy export", "rows": exported, "seconds": seconds})
+    finally:
+        cleanup(user_id, chat_ids)
+        for path in (csv_path, export_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    logger.info("")
+    logger.info("%-24s %10s %10s %12s", "mode", "rows", "seconds", "rows/s")
+    for r in results:
+        logger.info("%-24s %10d %10.2f %12.0f", r["mode"], r["rows"], r["seconds"],
+                    r["rows"] / r["seconds"] if r["seconds"] else 0.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# backend/app/tools/bench_chat_load.py
+"""
+End-to-end Chat Load Benchmark
+------------------------------
+Boots the API in a subprocess with local stand-ins for the paid/remote
+backends, drives mixed traffic at fixed concurrency levels and reports
+requests/sec and p50/p95/p99 per endpoint (chat requests split by intent).
+
+Stand-ins inside the server process:
+    LLM          app.ai.model.generate_response with --llm-ms ± --llm-jitter-ms latency
+    embeddings   app.ai.embedding (deterministic, hash-seeded), --embed-dim wide
+    vectors      in-memory LocalVectorStore instead of Pinecone
+Postgres, Redis and Neo4j are the configured ones (the docker-compose
+services). Bench users (…@bench.invalid) and their rows, keys and facts are
+removed at the end unless --keep-data.
+
+Each run is written to --out-dir as JSON (config, git commit, per-level and
+per-endpoint stats, mean Server-Timing stage breakdown); --compare <file>
+prints the change against an earlier run.
+
+Usage:
+    docker exec -it <backend_container> pip install -r requirements-dev.txt   # httpx
+    docker exec -it <backend_container> python -m app.tools.bench_chat_load --concurrency 1,8,32 --duration 30
+    docker exec -it <backend_container> python -m app.tools.bench_chat_load --compare data/bench/chat_load-20250101-120000.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import types
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+
+BENCH_EMAIL_DOMAIN = "bench.invalid"
+
+TOPICS = ["black holes", "sourdough", "the Roman empire", "jazz", "tide pools", "chess openings", "volcanoes", "bees"]
+CHORES = ["call the bank", "water the plants", "book a dentist visit", "pay rent", "renew the passport"]
+
+# (weight, endpoint label, request builder); chat messages are chosen so the
+# NLU rules route them to the labelled intent
+SCENARIOS = [
+    (40, "POST /chat/ general_chat", lambda u, r: ("POST", "/chat/", {"json": _chat(u, f"tell me something interesting about {r.choice(TOPICS)}")})),
+    (8, "POST /chat/ create_task", lambda u, r: ("POST", "/chat/", {"json": _chat(u, f"remind me to {r.choice(CHORES)} at 9am tomorrow")})),
+    (7, "POST /chat/ fetch_tasks", lambda u, r: ("POST", "/chat/", {"json": _chat(u, "show tasks")})),
+    (5, "POST /chat/ save_fact", lambda u, r: ("POST", "/chat/", {"json": _chat(u, f"remember my favourite topic is {r.choice(TOPICS)}")})),
+    (5, "POST /chat/ greeting", lambda u, r: ("POST", "/chat/", {"json": _chat(u, "hello there")})),
+    (5, "POST /chat/ name_query", lambda u, r: ("POST", "/chat/", {"json": _chat(u, "what is my name")})),
+    (12, "GET /api/tasks", lambda u, r: ("GET", "/api/tasks", {"params": {"token": u["token"]}})),
+    (12, "GET /api/conversations", lambda u, r: ("GET", "/api/conversations", {"params": {"token": u["token"]}})),
+    (6, "GET /chat/greet", lambda u, r: ("GET", "/chat/greet", {"params": {"token": u["token"], "chat_id": u["chat_id"]}})),
+]
+
+
+def _chat(user, text):
+    return {"user_message": text, "token": user["token"], "chat_id": user["chat_id"]}
+
+
+# ======================================================
+# 🔹 Server side (runs in the subprocess)
+# ======================================================
+def serve(port: int, llm_ms: float, llm_jitter_ms: float, embed_dim: int):
+    from app.ai import embedding as fake_embedding, model as fake_model
+    from app.utils.metrics import timed
+
+    # Must be in sys.modules before anything imports app.services.embeddings
+    def embed(text):
+        return [v - 0.5 for v in fake_embedding.get_embedding(text, dim=embed_dim)]  # zero-mean: unrelated texts ~orthogonal
+
+    embeddings = types.ModuleType("app.services.embeddings")
+    embeddings.get_embedding = timed("embedding")(embed)
+    embeddings.get_batch_embeddings = timed("embedding")(lambda texts: [embed(t) for t in texts])
+    sys.modules["app.services.embeddings"] = embeddings
+
+    from app.services import ai_services
+
+    def fake_llm(prompt: str) -> str:
+        return fake_model.generate_response(prompt[-200:], latency_ms=llm_ms, jitter_ms=llm_jitter_ms)
+
+    ai_services._try_gemini = timed("llm.gemini")(fake_llm)
+    ai_services._try_cohere = timed("llm.cohere")(fake_llm)
+
+    from app.db.local_vector_store import LocalVectorStore
+    from app.db.vector_store import set_vector_store
+    set_vector_store(LocalVectorStore(path=None, index_type="auto"))
+
+    import uvicorn
+    from app.main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server(args, port: int):
+    cmd = [
+        sys.executable, "-m", "app.tools.bench_chat_load", "--serve", "--port", str(port),
+        "--llm-ms", str(args.llm_ms), "--llm-jitter-ms", str(args.llm_jitter_ms), "--embed-dim", str(args.embed_dim),
+    ]
+    log = open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"bench server exited with {proc.returncode} (see --server-log)")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("bench server did not become ready in 180s")
+
+
+# ======================================================
+# 🔹 Bench users
+# ======================================================
+def create_users(count: int):
+    import jwt
+    from app.config import settings
+    from app.db import utils as db_utils
+
+    password_hash = db_utils.hash_password(uuid.uuid4().hex)  # never logged in with
+    run = uuid.uuid4().hex[:8]
+    users = []
+    for i in range(count):
+        row = db_utils.create_user(f"Bench {i}", f"u{i}-{run}@{BENCH_EMAIL_DOMAIN}", password_hash=password_hash)
+        now = datetime.utcnow()
+        token = jwt.encode(
+            {"sub": str(row["id"]), "email": row["email"], "name": row["name"],
+             "iat": int(now.timestamp()), "exp": int((now + timedelta(hours=6)).timestamp())},
+            settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM,
+        )
+        users.append({"id": row["id"], "token": token, "chat_id": str(uuid.uuid4())})
+    return users
+
+
+def cleanup_users(users):
+    from app.config import settings
+    from app.db import neo4j_utils
+    from app.db.redis_utils import client as redis_client
+    from app.db.utils import get_connection
+
+    ids = [u["id"] for u in users]
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        # chat_history, chats, tasks and pending_tasks cascade
+        cur.execute("DELETE FROM users WHERE id = ANY(%s);", (ids,))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+    with neo4j_utils.get_driver().session() as session:
+        session.run(
+            "MATCH (u:User) WHERE u.id IN $ids OPTIONAL MATCH (u)-[:OWNS]->(f:Fact) DETACH DELETE u, f",
+            ids=[str(i) for i in ids],
+        ).consume()
+    neo4j_utils.close_driver()
+
+    for uid in ids:
+        keys = [f"{settings.REDIS_CHAT_HISTORY_KEY}:{uid}", f"user_facts:{uid}", f"greeted:{uid}:daily", *redis_client.scan_iter(f"chat_turns:{uid}:*")]
+        redis_client.delete(*keys)
+
+
+# ======================================================
+# 🔹 Load generation
+# ======================================================
+def _parse_server_timing(header: str):
+    for part in header.split(", "):
+        fields = part.split(";")
+        for f in fields[1:]:
+            if f.startswith("dur="):
+                yield fields[0], float(f[4:])
+
+
+async def run_level(base_url: str, users, concurrency: int, duration: float, seed: int):
+    rng = random.Random(seed)
+    weights = [w for w, _, _ in SCENARIOS]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    stages = defaultdict(lambda: defaultdict(float))
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def virtual_user(i):
+            user = users[i % len(users)]
+            while time.perf_counter() < deadline:
+                _, label, build = rng.choices(SCENARIOS, weights)[0]
+                method, path, kwargs = build(user, rng)
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, **kwargs)
+                    failed = resp.status_code >= 400
+                except httpx.HTTPError:
+                    resp, failed = None, True
+                latencies[label].append((time.perf_counter() - t0) * 1000)
+                if failed:
+                    errors[label] += 1
+                elif "server-timing" in resp.headers:
+                    for stage, ms in _parse_server_timing(resp.headers["server-timing"]):
+                        stages[label][stage] += ms
+
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for label, samples in sorted(latencies.items()):
+        arr = np.asarray(samples)
+        ok = len(samples) - errors[label]
+        endpoints[label] = {
+            "requests": len(samples),
+            "errors": errors[label],
+            "rps": len(samples) / elapsed,
+            "p50_ms": float(np.percentile(arr, 50)),
+            "p95_ms": float(np.percentile(arr, 95)),
+            "p99_ms": float(np.percentile(arr, 99)),
+            "stages_mean_ms": {s: total / ok for s, total in sorted(stages[label].items())} if ok else {},
+        }
+    total = sum(len(s) for s in latencies.values())
+    return {"concurrency": concurrency, "seconds": elapsed, "rps": total / elapsed, "requests": total,
+            "errors": sum(errors.values()), "endpoints": endpoints}
+
+
+# ======================================================
+# 🔹 Reporting
+# ======================================================
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def report(result, baseline=None):
+    base_levels = {lvl["concurrency"]: lvl for lvl in (baseline or {}).get("levels", [])}
+    for level in result["levels"]:
+        base = base_levels.get(level["concurrency"], {}).get("endpoints", {})
+        logger.info("")
+        logger.info("concurrency %d: %.1f req/s, %d requests, %d errors",
+                    level["concurrency"], level["rps"], level["requests"], level["errors"])
+        logger.info("%-28s %8s %8s %9s %9s %9s%s", "endpoint", "req/s", "errors", "p50 ms", "p95 ms", "p99 ms",
+                    "   Δp50    Δp99   Δreq/s" if base else "")
+        for label, e in level["endpoints"].items():
+            delta = ""
+            if label in base:
+                b = base[label]
+                delta = "  %+6.0f%% %+6.0f%% %+7.0f%%" % tuple(
+                    100 * (e[k] - b[k]) / b[k] if b[k] else 0.0 for k in ("p50_ms", "p99_ms", "rps"))
+            logger.info("%-28s %8.1f %8d %9.1f %9.1f %9.1f%s", label, e["rps"], e["errors"],
+                        e["p50_ms"], e["p95_ms"], e["p99_ms"], delta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end /chat/ load benchmark with local backend stand-ins")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per level")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of discarded load before the first level")
+    parser.add_argument("--users", type=int, default=0, help="bench users (default: the highest concurrency)")
+    parser.add_argument("--llm-ms", type=float, default=800.0, help="fake LLM latency")
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--embed-dim", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out-dir", default="data/bench")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--server-log", help="append the bench server's output to this file")
+    parser.add_argument("--keep-data", action="store_true", help="leave bench users and their data in place")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.llm_ms, args.llm_jitter_ms, args.embed_dim)
+        return
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = start_server(args, port)
+    users = create_users(args.users or max(levels))
+    base_url = f"http://127.0.0.1:{port}"
+    result = {
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("serve", "port", "compare", "server_log")},
+        "levels": [],
+    }
+    try:
+        if args.warmup:
+            asyncio.run(run_level(base_url, users, max(levels), args.warmup, args.seed))
+        for i, concurrency in enumerate(levels):
+            logger.info("Running concurrency %d for %.0fs...", concurrency, args.duration)
+            result["levels"].append(asyncio.run(run_level(base_url, users, concurrency, args.duration, args.seed + i)))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        if not args.keep_data:
+            cleanup_users(users)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = os.path.join(args.out_dir, f"chat_load-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    report(result, baseline)
+    logger.info("")
+    logger.info("Results written to %s", path)
+
+
+if __name__ == "__main__":
+    main()
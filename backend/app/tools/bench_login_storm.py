@@ -0,0 +1,98 @@
+# backend/app/tools/bench_login_storm.py
+"""
+Login Storm Benchmark
+---------------------
+Runs --logins concurrent password verifications (the CPU part of /auth/login)
+and, at the same time, a stream of short threadpool calls standing in for the
+sync DB/Redis work of chat requests. Reports logins/sec and the p50/p99
+latency of the chat stand-in for:
+
+    threadpool    the previous pattern: verify on FastAPI's shared threadpool
+    process pool  app.utils.passwords, PASSWORD_HASH_WORKERS dedicated processes
+
+plus an idle baseline with no logins running. Uses the configured ARGON2_*
+parameters; no database or server is needed.
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.bench_login_storm --logins 200 --probe-ms 5
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils import passwords
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _chat_work(ms: float):
+    time.sleep(ms / 1000)  # a sync DB round trip holding a threadpool thread
+
+
+async def _probe(stop: asyncio.Event, probe_ms: float, samples: list):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await run_in_threadpool(_chat_work, probe_ms)
+        samples.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def _run(mode: str, logins: int, probe_ms: float, stored_hash: str):
+    if mode == "threadpool":
+        verify = lambda: run_in_threadpool(passwords.verify_and_update, "bench-password", stored_hash)
+    else:
+        verify = lambda: passwords.verify_and_update_async("bench-password", stored_hash)
+
+    samples, stop = [], asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, probe_ms, samples))
+    t0 = time.perf_counter()
+    if mode == "idle":
+        await asyncio.sleep(2)
+    else:
+        results = await asyncio.gather(*[verify() for _ in range(logins)])
+        assert all(valid for valid, _ in results)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await probe
+    return elapsed, samples
+
+
+def _pct(samples, q):
+    return statistics.quantiles(samples, n=100)[q - 1] if len(samples) > 1 else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput and chat latency under a login storm")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--probe-ms", type=float, default=5.0, help="duration of each chat stand-in call")
+    args = parser.parse_args()
+
+    stored_hash = passwords.hash_password("bench-password")
+    passwords.start_pool()
+    results = []
+    try:
+        for mode in ("idle", "threadpool", "process pool"):
+            elapsed, samples = asyncio.run(_run(mode, args.logins, args.probe_ms, stored_hash))
+            results.append((mode, elapsed, samples))
+    finally:
+        passwords.shutdown_pool()
+
+    logger.info("")
+    logger.info("%d logins, argon2 t=%d m=%d KiB p=%d, %d hashing process(es)",
+                args.logins, settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST,
+                settings.ARGON2_PARALLELISM, settings.PASSWORD_HASH_WORKERS)
+    logger.info("%-13s %11s %13s %13s", "mode", "logins/sec", "chat p50 ms", "chat p99 ms")
+    for mode, elapsed, samples in results:
+        rate = "-" if mode == "idle" else f"{args.logins / elapsed:.1f}"
+        logger.info("%-13s %11s %13.1f %13.1f", mode, rate, _pct(samples, 50), _pct(samples, 99))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# backend/app/tools/bench_neo4j.py
+"""
+Neo4j Fact Lookup Benchmark
+---------------------------
+Measures get_all_facts_for_user() latency against the configured Neo4j for:
+
+    per-call driver   the previous pattern: new driver + session per lookup
+    pooled sync       shared driver, execute_read (app.db.neo4j_utils)
+    pooled async      shared async driver, --concurrency lookups in flight
+
+A throwaway bench user with --facts facts is created first and removed at the end.
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.bench_neo4j --lookups 200 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+
+import numpy as np
+from neo4j import GraphDatabase
+
+from app.config import settings
+from app.db import neo4j_utils
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def percentile(samples, p):
+    return float(np.percentile(np.asarray(samples), p)) if samples else 0.0
+
+
+def summarize(label, latencies, wall_secs):
+    return {
+        "mode": label,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "lookups_per_s": len(latencies) / wall_secs if wall_secs else 0.0,
+    }
+
+
+def seed(user_id: str, facts: int):
+    rows = [{"key": f"{user_id}-k{i}", "value": f"v{i}"} for i in range(facts)]
+    with neo4j_utils.get_driver().session() as session:
+        session.run(
+            """
+            MERGE (u:User {id: $user_id})
+            WITH u UNWIND $rows AS row
+            MERGE (f:Fact {key: row.key})
+            SET f.value = row.value
+            MERGE (u)-[:OWNS]->(f)
+            """,
+            user_id=user_id, rows=rows,
+        ).consume()
+
+
+def cleanup(user_id: str):
+    with neo4j_utils.get_driver().session() as session:
+        session.run(
+            "MATCH (u:User {id: $user_id}) OPTIONAL MATCH (u)-[:OWNS]->(f:Fact) DETACH DELETE u, f",
+            user_id=user_id,
+        ).consume()
+
+
+def bench_per_call(user_id: str, lookups: int):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(lookups):
+        t0 = time.perf_counter()
+        driver = GraphDatabase.driver(settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD))
+        with driver.session() as session:
+            {r["key"]: r["value"] for r in session.run(neo4j_utils.USER_FACTS_QUERY, user_id=user_id)}
+        driver.close()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return summarize("per-call driver", latencies, time.perf_counter() - start)
+
+
+def bench_pooled(user_id: str, lookups: int):
+    neo4j_utils.get_all_facts_for_user(user_id)  # warm the pool
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(lookups):
+        t0 = time.perf_counter()
+        neo4j_utils.get_all_facts_for_user(user_id)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return summarize("pooled sync", latencies, time.perf_counter() - start)
+
+
+async def bench_async(user_id: str, lookups: int, concurrency: int):
+    await neo4j_utils.get_all_facts_for_user_async(user_id)
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            await neo4j_utils.get_all_facts_for_user_async(user_id)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(lookups)))
+    wall = time.perf_counter() - start
+    await neo4j_utils.close_async_driver()
+    return summarize(f"pooled async x{concurrency}", latencies, wall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neo4j fact lookup latency benchmark")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--facts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    user_id = f"bench-{uuid.uuid4().hex[:8]}"
+    seed(user_id, args.facts)
+    try:
+        results = [
+            bench_per_call(user_id, args.lookups),
+            bench_pooled(user_id, args.lookups),
+            asyncio.run(bench_async(user_id, args.lookups, args.concurrency)),
+        ]
+    finally:
+        cleanup(user_id)
+        neo4j_utils.close_driver()
+
+    logger.info("")
+    logger.info("%-20s %9s %9s %9s %12s", "mode", "p50 ms", "p95 ms", "p99 ms", "lookups/s")
+    for r in results:
+        logger.info("%-20s %9.2f %9.2f %9.2f %12.0f", r["mode"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["lookups_per_s"])
+
+
+if __name__ == "__main__":
+    main()
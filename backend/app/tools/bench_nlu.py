@@ -0,0 +1,59 @@
+# backend/app/tools/bench_nlu.py
+"""
+Intent Engine Micro-benchmark
+-----------------------------
+Runs nlu.get_structured_intent over the golden corpus
+(tests/data/nlu_golden.json) and reports messages/sec overall and per
+action. Task messages also pay for parse_time_string, so they are slower.
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.bench_nlu --seconds 3
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections import defaultdict
+
+from app.services.nlu import get_structured_intent
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS = "tests/data/nlu_golden.json"
+
+
+def throughput(messages, seconds: float) -> float:
+    for m in messages:  # warm-up
+        get_structured_intent(m)
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for m in messages:
+            get_structured_intent(m)
+        done += len(messages)
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent engine throughput benchmark")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--seconds", type=float, default=2.0, help="time budget per measurement")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+
+    by_action = defaultdict(list)
+    for c in cases:
+        by_action[c["expected"]["action"]].append(c["message"])
+
+    logger.info("%-18s %8s %14s", "action", "msgs", "msgs/sec")
+    logger.info("%-18s %8d %14.0f", "ALL", len(cases), throughput([c["message"] for c in cases], args.seconds))
+    for action, messages in sorted(by_action.items()):
+        logger.info("%-18s %8d %14.0f", action, len(messages), throughput(messages, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
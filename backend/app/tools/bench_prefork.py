@@ -0,0 +1,310 @@
+# backend/app/tools/bench_prefork.py
+"""
+Prefork Memory / Scaling Benchmark
+----------------------------------
+Starts app.prefork with each worker count in --workers, with and without
+preloading the app in the master (--modes), and for each run reports:
+
+    throughput   POST /bench/embed (a bench-only route that embeds --batch
+                 sentences with the real model) at --per-worker concurrent
+                 requests per worker: req/s, sentences/s, p50/p95, and the
+                 speedup over one worker in the same mode
+    memory       per worker process, read from /proc/<pid>/smaps_rollup
+                 after the load:
+                   RSS  resident pages, shared ones counted in full
+                   PSS  shared pages split between the processes using them
+                   USS  pages private to the worker (what it costs to add one)
+                 and the total PSS of the master plus all workers, i.e. what
+                 the whole server really uses
+
+With preload the model's pages are counted once across the workers, so USS
+per worker stays far below RSS and total PSS grows slowly with the worker
+count; without it each worker carries its own copy. Throughput should grow
+with workers up to the number of usable CPUs (reported) and flatten beyond.
+
+The workers run the full app (startup connects to the configured Postgres,
+Redis and Neo4j) with the in-memory LocalVectorStore instead of Pinecone.
+Results are written to --out-dir as JSON.
+
+Usage:
+    docker exec -it <backend_container> pip install -r requirements-dev.txt   # httpx
+    docker exec -it <backend_container> python -m app.tools.bench_prefork --workers 1,2,4 --duration 20
+    docker exec -it <backend_container> python -m app.tools.bench_prefork --modes preload --workers 1,2,4,8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+WORDS = ("remind", "meeting", "tomorrow", "groceries", "project", "deadline", "call", "mom", "weather",
+         "flight", "book", "dentist", "report", "gym", "budget", "recipe", "friday", "summary")
+
+MIB = 1024 * 1024
+
+
+# ======================================================
+# 🔹 Server side (runs in the subprocess)
+# ======================================================
+def _load_bench_app():
+    from fastapi import Body
+    from app import prefork
+
+    app = prefork.load_app()
+    from app.services.embeddings import get_batch_embeddings
+
+    @app.post("/bench/embed")
+    def bench_embed(body: dict = Body(...)):
+        vectors = get_batch_embeddings(body["texts"])
+        return {"vectors": len(vectors), "pid": os.getpid()}
+
+    return app
+
+
+def serve(port: int, workers: int, preload: bool):
+    from app import prefork
+
+    prepared = prefork.prepare_metrics_dir()
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    prefork.configure_logging()
+
+    from app.db.local_vector_store import LocalVectorStore
+    from app.db.vector_store import set_vector_store
+    set_vector_store(LocalVectorStore(path=None, index_type="auto"))
+
+    master = prefork.Master(
+        _load_bench_app, workers, "127.0.0.1", port, preload=preload, after_fork=prefork.reinit_worker,
+        torch_threads=prefork.torch_threads_per_worker(workers), graceful_timeout=10,
+        uvicorn_options={"access_log": False},
+    )
+    try:
+        master.run()
+    finally:
+        if prepared:
+            import shutil
+            shutil.rmtree(prepared, ignore_errors=True)
+
+
+# ======================================================
+# 🔹 Process memory
+# ======================================================
+def child_pids(pid: int):
+    """Direct children of `pid` (the workers, not their helper processes)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; the fields after it do not
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def memory(pid: int) -> dict:
+    """RSS, PSS and USS in bytes from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            parts = rest.split()
+            if len(parts) == 2 and parts[1] == "kB":
+                fields[name] = int(parts[0]) * 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def start_server(args, workers: int, preload: bool, port: int):
+    cmd = [sys.executable, "-m", "app.tools.bench_prefork", "--serve", "--port", str(port), "--workers", str(workers)]
+    if not preload:
+        cmd.append("--no-preload")
+    log = open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + args.start_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"bench server exited with {proc.returncode} (see --server-log)")
+        if len(child_pids(proc.pid)) == workers:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return proc
+            except httpx.HTTPError:
+                pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"bench server did not start {workers} worker(s) in {args.start_timeout:.0f}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# ======================================================
+# 🔹 Load
+# ======================================================
+async def run_load(base_url: str, concurrency: int, duration: float, batch: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    latencies, errors, pids = [], 0, set()
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def virtual_user():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                texts = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(batch)]
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.post("/bench/embed", json={"texts": texts})
+                    resp.raise_for_status()
+                    pids.add(resp.json()["pid"])
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    arr = np.asarray(latencies) if latencies else np.zeros(1)
+    ok = len(latencies) - errors
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": ok / elapsed,
+        "texts_per_s": ok * batch / elapsed,
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "workers_seen": len(pids),
+    }
+
+
+def run_one(args, workers: int, preload: bool) -> dict:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    concurrency = args.per_worker * workers
+
+    started = time.perf_counter()
+    proc = start_server(args, workers, preload, port)
+    startup = time.perf_counter() - started
+    try:
+        if args.warmup:
+            asyncio.run(run_load(base_url, concurrency, args.warmup, args.batch, args.seed))
+        load = asyncio.run(run_load(base_url, concurrency, args.duration, args.batch, args.seed + 1))
+        worker_mem = [memory(pid) for pid in child_pids(proc.pid)]
+        master_mem = memory(proc.pid)
+    finally:
+        stop_server(proc)
+
+    per_worker = {k: float(np.mean([m[k] for m in worker_mem])) for k in ("rss", "pss", "uss")}
+    return {
+        "mode": "preload" if preload else "no-preload",
+        "workers": workers,
+        "startup_s": startup,
+        **load,
+        "worker_memory": worker_mem,
+        "master_memory": master_mem,
+        "per_worker": per_worker,
+        "total_pss": master_mem["pss"] + sum(m["pss"] for m in worker_mem),
+    }
+
+
+# ======================================================
+# 🔹 Reporting
+# ======================================================
+def report(result):
+    logger.info("")
+    logger.info("usable CPUs: %d, batch %d, %d concurrent request(s) per worker",
+                result["cpus"], result["config"]["batch"], result["config"]["per_worker"])
+    logger.info("%-11s %7s %8s %9s %8s %8s %8s %9s %9s %9s %10s %9s", "mode", "workers", "req/s", "texts/s",
+                "p50 ms", "p95 ms", "speedup", "RSS MiB", "PSS MiB", "USS MiB", "total PSS", "start s")
+    single = {r["mode"]: r["rps"] for r in result["runs"] if r["workers"] == 1}
+    for r in result["runs"]:
+        speedup = r["rps"] / single[r["mode"]] if single.get(r["mode"]) else float("nan")
+        w = r["per_worker"]
+        logger.info("%-11s %7d %8.1f %9.0f %8.1f %8.1f %7.2fx %9.0f %9.0f %9.0f %10.0f %9.1f",
+                    r["mode"], r["workers"], r["rps"], r["texts_per_s"], r["p50_ms"], r["p95_ms"], speedup,
+                    w["rss"] / MIB, w["pss"] / MIB, w["uss"] / MIB, r["total_pss"] / MIB, r["startup_s"])
+        if r["errors"]:
+            logger.warning("  %d of %d requests failed", r["errors"], r["requests"])
+
+
+def main():
+    from app.prefork import usable_cpus
+
+    cpus = usable_cpus()
+    default_workers = sorted({1, 2, max(1, cpus // 2), cpus, cpus * 2})
+    parser = argparse.ArgumentParser(description="Per-worker memory and throughput scaling of app.prefork")
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="comma-separated worker counts")
+    parser.add_argument("--modes", default="preload,no-preload", help="preload and/or no-preload")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of measured load per run")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of discarded load first")
+    parser.add_argument("--per-worker", type=int, default=2, help="concurrent requests per worker")
+    parser.add_argument("--batch", type=int, default=8, help="sentences embedded per request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start-timeout", type=float, default=300.0)
+    parser.add_argument("--out-dir", default="data/bench")
+    parser.add_argument("--server-log", help="append the bench servers' output to this file")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--no-preload", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, int(args.workers), preload=not args.no_preload)
+        return
+
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    result = {
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "cpus": cpus,
+        "config": {k: v for k, v in vars(args).items() if k not in ("serve", "no_preload", "port", "server_log")},
+        "runs": [],
+    }
+    for mode in modes:
+        for workers in worker_counts:
+            logger.info("Running %s with %d worker(s) for %.0fs...", mode, workers, args.duration)
+            result["runs"].append(run_one(args, workers, preload=(mode == "preload")))
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = os.path.join(args.out_dir, f"prefork-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    report(result)
+    logger.info("")
+    logger.info("Results written to %s", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# backend/app/tools/bench_reminder_dispatch.py
+"""
+Reminder Dispatch Benchmark
+---------------------------
+Seeds --tasks overdue reminders for a throwaway bench user and drains them
+against the configured PostgreSQL two ways:
+
+    legacy    the previous check_and_trigger_tasks loop: one SELECT for all
+              due tasks, then a users lookup and an UPDATE + COMMIT per task
+    batched   --workers processes each running reminders.dispatch_due()
+              (FOR UPDATE SKIP LOCKED batches joined with users, one UPDATE
+              per batch) until nothing is left
+
+Sending is a no-op that records task ids, so the numbers are database-bound.
+The batched run also checks that every task was sent exactly once across
+workers. Delivery-lag recording is disabled for the run.
+
+Refuses to run if other users have overdue unsent reminders (they would be
+"sent" by the batched run); pass --force on a throwaway database.
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.bench_reminder_dispatch --tasks 100000 --workers 4
+"""
+
+import argparse
+import logging
+import multiprocessing as mp
+import time
+import uuid
+from collections import Counter
+
+from app.config import settings
+from app.db.utils import get_connection
+from app.services import reminders
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def seed(email: str, tasks: int) -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "INSERT INTO users (name, email, password_hash) VALUES ('bench', %s, 'x') RETURNING id;",
+            (email,),
+        )
+        user_id = cur.fetchone()["id"]
+        # Overdue by an hour; reminder_eta set so the sweep's ETA path ignores them
+        cur.execute(
+            """
+            INSERT INTO tasks (user_id, title, datetime, notes, notified, reminder_eta)
+            SELECT %s, 'bench task ' || g, LOCALTIMESTAMP - interval '1 hour', '', FALSE,
+                   LOCALTIMESTAMP - interval '1 hour'
+            FROM generate_series(1, %s) g;
+            """,
+            (user_id, tasks),
+        )
+        conn.commit()
+        return user_id
+    finally:
+        cur.close()
+        conn.close()
+
+
+def reset(user_id: int):
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("UPDATE tasks SET notified = FALSE WHERE user_id = %s;", (user_id,))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def cleanup(user_id: int):
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM users WHERE id = %s;", (user_id,))  # cascades to tasks
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def other_overdue(user_id: int) -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT count(*) AS n FROM tasks
+            WHERE notified IS NOT TRUE AND user_id IS NOT NULL AND user_id <> %s AND datetime <= %s;
+            """,
+            (user_id, reminders.now_ist()),
+        )
+        return cur.fetchone()["n"]
+    finally:
+        cur.close()
+        conn.close()
+
+
+def bench_legacy(user_id: int) -> dict:
+    start = time.perf_counter()
+    conn = get_connection()
+    cur = conn.cursor()
+    sent = 0
+    try:
+        cur.execute(
+            """
+            SELECT id, user_id, title, notes, datetime FROM tasks
+            WHERE user_id = %s AND datetime <= %s AND (notified IS NULL OR notified = FALSE);
+            """,
+            (user_id, reminders.now_ist()),
+        )
+        for task in cur.fetchall():
+            cur.execute("SELECT email, name FROM users WHERE id = %s;", (task["user_id"],))
+            cur.fetchone()
+            cur.execute("UPDATE tasks SET notified = TRUE WHERE id = %s", (task["id"],))
+            conn.commit()
+            sent += 1
+    finally:
+        cur.close()
+        conn.close()
+    return {"mode": "legacy", "sent": sent, "seconds": time.perf_counter() - start, "duplicates": 0}
+
+
+def _drain(batch: int, queue):
+    reminders.record_delivery_lag = lambda *s: None
+    ids = []
+    sender = lambda messages: [None] * len(messages)
+    original_format = reminders._format_reminder
+
+    def capture(task):
+        ids.append(task["id"])
+        return original_format(task)
+
+    reminders._format_reminder = capture
+    while reminders.dispatch_due(sender, limit=batch):
+        pass
+    queue.put(ids)
+
+
+def bench_batched(workers: int, batch: int) -> dict:
+    queue = mp.Queue()
+    procs = [mp.Process(target=_drain, args=(batch, queue)) for _ in range(workers)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    sent_ids = [i for _ in procs for i in queue.get()]
+    for p in procs:
+        p.join()
+    seconds = time.perf_counter() - start
+    duplicates = sum(n - 1 for n in Counter(sent_ids).values() if n > 1)
+    return {"mode": f"batched x{workers} ({batch}/txn)", "sent": len(sent_ids), "seconds": seconds, "duplicates": duplicates}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reminder dispatch throughput benchmark")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=settings.REMINDER_DISPATCH_BATCH)
+    parser.add_argument("--skip-legacy", action="store_true", help="the legacy loop takes minutes at 100k")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    user_id = seed(f"bench-dispatch-{uuid.uuid4().hex[:8]}@example.invalid", args.tasks)
+    try:
+        others = other_overdue(user_id)
+        if others and not args.force:
+            logger.error("%d overdue reminders belong to real users; rerun with --force on a throwaway database", others)
+            return
+        results = []
+        if not args.skip_legacy:
+            results.append(bench_legacy(user_id))
+            reset(user_id)
+        results.append(bench_batched(1, args.batch))
+        if args.workers > 1:
+            reset(user_id)
+            results.append(bench_batched(args.workers, args.batch))
+    finally:
+        cleanup(user_id)
+
+    logger.info("")
+    logger.info("%-26s %9s %10s %12s %11s", "mode", "sent", "seconds", "tasks/s", "duplicates")
+    for r in results:
+        logger.info("%-26s %9d %10.2f %12.0f %11d", r["mode"], r["sent"], r["seconds"],
+                    r["sent"] / r["seconds"] if r["seconds"] else 0.0, r["duplicates"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# backend/app/tools/bench_smtp.py
+"""
+SMTP Delivery Benchmark
+-----------------------
+Sends --messages emails to a local aiosmtpd sink and reports messages/sec for:
+
+    per-message   the previous pattern: connect + EHLO (+ STARTTLS + login) per email
+    pooled        app.utils.mailer, one message at a time over a reused connection
+    pooled xN     Mailer.send_many() with an N-connection pool
+
+The sink adds --handshake-ms to every EHLO and --data-ms to every DATA, to
+stand in for the round trips and TLS setup of a real provider (the default
+numbers are in the range seen against smtp.gmail.com).
+
+Usage:
+    docker exec -it <backend_container> pip install -r requirements-dev.txt   # aiosmtpd
+    docker exec -it <backend_container> python -m app.tools.bench_smtp --messages 200 --pool 8
+"""
+
+import argparse
+import asyncio
+import logging
+import smtplib
+import socket
+import time
+from email.mime.text import MIMEText
+
+from aiosmtpd.controller import Controller
+
+from app.utils.mailer import Mailer, SMTPPool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("mail.log").setLevel(logging.WARNING)  # aiosmtpd's per-connection chatter
+
+SENDER = "bench@example.com"
+
+
+class SlowSink:
+    def __init__(self, handshake_ms: float, data_ms: float):
+        self.handshake, self.data = handshake_ms / 1000, data_ms / 1000
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.data)
+        self.received += 1
+        return "250 OK"
+
+
+def per_message(host: str, port: int, messages):
+    for to, subject, body in messages:
+        msg = MIMEText(body)
+        msg["Subject"], msg["From"], msg["To"] = subject, SENDER, to
+        with smtplib.SMTP(host, port) as server:
+            server.ehlo()
+            server.sendmail(SENDER, [to], msg.as_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SMTP delivery throughput benchmark")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--pool", type=int, default=8)
+    parser.add_argument("--handshake-ms", type=float, default=150.0, help="added to each EHLO")
+    parser.add_argument("--data-ms", type=float, default=40.0, help="added to each DATA")
+    args = parser.parse_args()
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    sink = SlowSink(args.handshake_ms, args.data_ms)
+    controller = Controller(sink, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    messages = [(f"user{i}@example.com", "Task Reminder: bench", "body") for i in range(args.messages)]
+    results = []
+    try:
+        t0 = time.perf_counter()
+        per_message("127.0.0.1", port, messages)
+        results.append(("per-message", time.perf_counter() - t0))
+
+        for label, size, concurrent in (("pooled", 1, False), (f"pooled x{args.pool}", args.pool, True)):
+            mailer = Mailer(SMTPPool("127.0.0.1", port, None, None, size=size, starttls=False), sender=SENDER)
+            t0 = time.perf_counter()
+            if concurrent:
+                errors = [e for e in mailer.send_many(messages) if e is not None]
+                if errors:
+                    logger.warning("%d sends failed, first: %s", len(errors), errors[0])
+            else:
+                for m in messages:
+                    mailer.send(*m)
+            results.append((label, time.perf_counter() - t0))
+            mailer.close()
+    finally:
+        controller.stop()
+
+    logger.info("")
+    logger.info("%d messages, handshake %.0f ms, DATA %.0f ms; sink received %d",
+                args.messages, args.handshake_ms, args.data_ms, sink.received)
+    logger.info("%-14s %10s %12s", "mode", "seconds", "msgs/sec")
+    for label, secs in results:
+        logger.info("%-14s %10.2f %12.1f", label, secs, args.messages / secs)
+
+
+if __name__ == "__main__":
+    main()
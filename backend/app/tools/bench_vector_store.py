@@ -0,0 +1,162 @@
+# backend/app/tools/bench_vector_store.py
+"""
+Vector Store Benchmark
+----------------------
+Compares upsert throughput, filtered query latency and recall@k of the
+vector store backends on synthetic per-user data.
+
+Backends:
+    local-hnsw   LocalVectorStore with hnswlib (skipped if not installed)
+    local-brute  LocalVectorStore with exact NumPy search
+    pinecone     PineconeVectorStore (only with --pinecone; uses a scratch
+                 namespace that is deleted afterwards)
+
+Recall is measured against exact cosine top-k over the same user's vectors.
+With --namespaced, each user's vectors go to their own namespace and queries
+run without a metadata filter (SEMANTIC_NAMESPACE_MODE=namespaced).
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.bench_vector_store --users 50 --per-user 400
+"""
+
+import argparse
+import logging
+import time
+import uuid
+
+import numpy as np
+
+from app.db.local_vector_store import LocalVectorStore, hnswlib
+from app.db.vector_store import user_namespace
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_dataset(users: int, per_user: int, dim: int, seed: int = 7):
+    """
+    Clustered vectors: each user gets a few topic centroids plus noise,
+    which is closer to chat embeddings than uniform random data.
+    """
+    rng = np.random.default_rng(seed)
+    items = []
+    for u in range(users):
+        user_id = f"bench-user-{u}"
+        centroids = rng.normal(size=(4, dim)).astype(np.float32)
+        for _ in range(per_user):
+            c = centroids[rng.integers(0, len(centroids))]
+            vec = c + 0.35 * rng.normal(size=dim).astype(np.float32)
+            items.append({"id": f"{user_id}-{uuid.uuid4()}", "values": vec, "metadata": {"user_id": user_id}})
+    return items
+
+
+def exact_topk(items, query, user_id, k):
+    rows = [i for i in items if i["metadata"]["user_id"] == user_id]
+    mat = np.stack([i["values"] for i in rows])
+    mat = mat / np.linalg.norm(mat, axis=1, keepdims=True)
+    q = query / np.linalg.norm(query)
+    order = np.argsort(-(mat @ q))[:k]
+    return {rows[i]["id"] for i in order}
+
+
+def percentile(samples, p):
+    return float(np.percentile(np.asarray(samples), p)) if samples else 0.0
+
+
+def run_backend(store, items, queries, k, namespace=None, namespaced=False, batch=200):
+    def ns_for(user_id):
+        return f"{namespace or ''}{user_namespace(user_id)}" if namespaced else namespace
+
+    start = time.perf_counter()
+    for i in range(0, len(items), batch):
+        chunk = items[i:i + batch]
+        by_ns = {}
+        for it in chunk:
+            by_ns.setdefault(ns_for(it["metadata"]["user_id"]), []).append(
+                {"id": it["id"], "values": it["values"].tolist(), "metadata": it["metadata"]}
+            )
+        for ns, group in by_ns.items():
+            store.upsert(group, namespace=ns)
+    upsert_secs = time.perf_counter() - start
+
+    latencies, recalls = [], []
+    for user_id, qvec, truth in queries:
+        flt = None if namespaced else {"user_id": {"$eq": user_id}}
+        t0 = time.perf_counter()
+        res = store.query(qvec.tolist(), top_k=k, filter=flt, namespace=ns_for(user_id))
+        latencies.append((time.perf_counter() - t0) * 1000)
+        got = {m["id"] for m in res.get("matches", [])}
+        recalls.append(len(got & truth) / max(1, len(truth)))
+
+    return {
+        "backend": store.name,
+        "upserts_per_s": len(items) / upsert_secs if upsert_secs else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "recall": float(np.mean(recalls)) if recalls else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector store latency/recall benchmark")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--per-user", type=int, default=400)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--namespaced", action="store_true", help="one namespace per user instead of a user_id filter")
+    parser.add_argument("--pinecone", action="store_true", help="also benchmark the live Pinecone index")
+    args = parser.parse_args()
+
+    logger.info("🧪 Building dataset: %d users × %d vectors (dim=%d)", args.users, args.per_user, args.dim)
+    items = make_dataset(args.users, args.per_user, args.dim)
+
+    rng = np.random.default_rng(11)
+    queries = []
+    for _ in range(args.queries):
+        probe = items[rng.integers(0, len(items))]
+        user_id = probe["metadata"]["user_id"]
+        qvec = probe["values"] + 0.2 * rng.normal(size=args.dim).astype(np.float32)
+        queries.append((user_id, qvec, exact_topk(items, qvec, user_id, args.top_k)))
+
+    stores = [LocalVectorStore(path=None, index_type="brute")]
+    if hnswlib is not None:
+        stores.insert(0, LocalVectorStore(path=None, index_type="hnsw"))
+    else:
+        logger.warning("hnswlib not installed; skipping local-hnsw.")
+
+    results = [run_backend(s, items, queries, args.top_k, namespaced=args.namespaced) for s in stores]
+
+    if args.pinecone:
+        from app.db.vector_store import PineconeVectorStore
+        store = PineconeVectorStore()
+        namespace = f"bench-{uuid.uuid4().hex[:8]}"
+        try:
+            # Pinecone is eventually consistent; give the writes a moment to index
+            res = run_backend(store, items, [], args.top_k, namespace=namespace, namespaced=args.namespaced)
+            time.sleep(10)
+            res.update({
+                k: v for k, v in run_backend(store, [], queries, args.top_k, namespace=namespace, namespaced=args.namespaced).items()
+                if k != "upserts_per_s"
+            })
+            results.append(res)
+        finally:
+            if args.namespaced:
+                for u in range(args.users):
+                    uid = f"bench-user-{u}"
+                    store.delete([i["id"] for i in items if i["metadata"]["user_id"] == uid], namespace=f"{namespace}{user_namespace(uid)}")
+            else:
+                store.delete([i["id"] for i in items], namespace=namespace)
+
+    logger.info("")
+    logger.info("%-12s %12s %9s %9s %9s %8s", "backend", "upserts/s", "p50 ms", "p95 ms", "p99 ms", "recall")
+    for r in results:
+        logger.info(
+            "%-12s %12.0f %9.3f %9.3f %9.3f %8.3f",
+            r["backend"], r["upserts_per_s"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["recall"],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# backend/app/tools/chat_history_copy.py
+"""
+Chat History Bulk Import / Export
+---------------------------------
+Moves chat history in and out of PostgreSQL with COPY instead of one
+save_chat() call (user check, chat row, insert, update, commit) per message.
+
+    import   COPY ... FROM STDIN into a temporary staging table, then
+             set-based statements in the same transaction:
+               - drop rows without user_id or user_query
+               - create placeholder users (--create-users) or drop rows of
+                 unknown users; placeholders get an unusable password hash,
+                 so nobody can log in as them and read the imported chats
+               - drop rows already present (same user, chat, created_at and
+                 query), so re-running an import is safe; rows without a
+                 created_at get the import time and cannot be matched
+               - give rows without a chat_id their own new chat, as
+                 save_chat() does
+               - drop rows whose chat belongs to another user (in the
+                 database or elsewhere in the file)
+               - upsert chats (created_at / last_activity from the rows)
+               - insert chat_history in created_at order
+             Imported chats are then evicted from the Redis recent-turns
+             cache. --dry-run reports the counts and rolls back.
+
+    export   COPY (SELECT ...) TO STDOUT streamed straight to the file, for
+             everything or for --user-id and/or a [--since, --until) range.
+
+Both use CSV with a header row, columns
+user_id,chat_id,user_query,ai_response,created_at, so an export can be
+imported as-is. Files ending in .gz are (de)compressed on the fly.
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.chat_history_copy export /data/chats.csv.gz --user-id 42
+    docker exec -it <backend_container> python -m app.tools.chat_history_copy export /data/oct.csv --since 2026-10-01 --until 2026-11-01
+    docker exec -it <backend_container> python -m app.tools.chat_history_copy import /data/chats.csv.gz --dry-run
+"""
+
+import argparse
+import gzip
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.db.utils import get_connection
+from app.utils.passwords import UNUSABLE_PASSWORD_HASH
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COLUMNS = "user_id, chat_id, user_query, ai_response, created_at"
+CSV_OPTIONS = "FORMAT csv, HEADER true"
+
+STAGING_TABLE = """
+CREATE TEMP TABLE chat_import (
+    line BIGSERIAL,
+    user_id INTEGER,
+    chat_id TEXT,
+    user_query TEXT,
+    ai_response TEXT,
+    created_at TIMESTAMP
+) ON COMMIT DROP;
+"""
+
+DROP_INVALID = "DELETE FROM chat_import WHERE user_id IS NULL OR user_query IS NULL;"
+
+# (count name, statement); each statement's rowcount is added to its count
+CLEANUP_STEPS = [
+    # Rows without a chat_id match on user, created_at and query alone
+    ("duplicate", """
+        DELETE FROM chat_import s
+        USING chat_history h
+        WHERE h.user_id = s.user_id AND h.created_at = s.created_at AND h.user_query = s.user_query
+          AND (h.chat_id = s.chat_id OR s.chat_id IS NULL OR s.chat_id = '');
+    """),
+    ("new_chat_ids", """
+        UPDATE chat_import SET chat_id = gen_random_uuid()::text
+        WHERE chat_id IS NULL OR chat_id = '';
+    """),
+    ("foreign_chat", """
+        DELETE FROM chat_import s
+        USING chats c
+        WHERE c.id = s.chat_id AND c.user_id IS DISTINCT FROM s.user_id;
+    """),
+    ("foreign_chat", """
+        DELETE FROM chat_import
+        WHERE chat_id IN (SELECT chat_id FROM chat_import GROUP BY chat_id HAVING count(DISTINCT user_id) > 1);
+    """),
+    ("no_timestamp", "UPDATE chat_import SET created_at = LOCALTIMESTAMP WHERE created_at IS NULL;"),
+]
+
+CREATE_USERS = """
+    INSERT INTO users (id, name, email, password_hash)
+    SELECT DISTINCT s.user_id, 'placeholder_' || s.user_id, 'placeholder+' || s.user_id || '@example.local', %s
+    FROM chat_import s
+    WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id)
+    ON CONFLICT DO NOTHING;
+"""
+DROP_UNKNOWN_USERS = """
+    DELETE FROM chat_import s
+    WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id);
+"""
+
+MERGE_CHATS = """
+    INSERT INTO chats (id, user_id, created_at, last_activity)
+    SELECT chat_id, min(user_id), min(created_at), max(created_at)
+    FROM chat_import
+    GROUP BY chat_id
+    ON CONFLICT (id) DO UPDATE SET last_activity = GREATEST(chats.last_activity, EXCLUDED.last_activity);
+"""
+MERGE_HISTORY = """
+    INSERT INTO chat_history (user_id, chat_id, user_query, ai_response, created_at)
+    SELECT user_id, chat_id, user_query, ai_response, created_at
+    FROM chat_import
+    ORDER BY created_at, line;
+"""
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+
+# ======================================================
+# 🔹 Import
+# ======================================================
+def import_chats(src, create_users: bool = False, dry_run: bool = False) -> dict:
+    """
+    Load CSV rows from the binary file object `src`. Returns counts:
+    rows (read), imported, chats (created or touched) and one entry per
+    kind of dropped row.
+    """
+    counts = {"rows": 0, "imported": 0, "chats": 0, "invalid": 0, "unknown_user": 0, "created_users": 0,
+              "foreign_chat": 0, "duplicate": 0, "new_chat_ids": 0, "no_timestamp": 0}
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(STAGING_TABLE)
+        cur.copy_expert(f"COPY chat_import ({COLUMNS}) FROM STDIN WITH ({CSV_OPTIONS})", src)
+        counts["rows"] = cur.rowcount
+        cur.execute("ANALYZE chat_import;")
+
+        cur.execute(DROP_INVALID)
+        counts["invalid"] = cur.rowcount
+        if create_users:
+            cur.execute(CREATE_USERS, (UNUSABLE_PASSWORD_HASH,))
+            counts["created_users"] = cur.rowcount
+            if cur.rowcount:
+                cur.execute("SELECT setval(pg_get_serial_sequence('users','id'), (SELECT MAX(id) FROM users));")
+        else:
+            cur.execute(DROP_UNKNOWN_USERS)
+            counts["unknown_user"] = cur.rowcount
+        for name, statement in CLEANUP_STEPS:
+            cur.execute(statement)
+            counts[name] += cur.rowcount
+
+        cur.execute(MERGE_CHATS)
+        counts["chats"] = cur.rowcount
+        cur.execute(MERGE_HISTORY)
+        counts["imported"] = cur.rowcount
+        cur.execute("SELECT DISTINCT user_id, chat_id FROM chat_import;")
+        touched = [(r["user_id"], r["chat_id"]) for r in cur.fetchall()]
+
+        if dry_run:
+            conn.rollback()
+            return counts
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    try:
+        from app.db.redis_utils import invalidate_cached_turns_many
+        invalidate_cached_turns_many(touched)
+    except Exception as e:
+        logger.warning(f"⚠️ Imported, but could not evict cached chat turns: {e}")
+    return counts
+
+
+# ======================================================
+# 🔹 Export
+# ======================================================
+def export_chats(dst, user_id: Optional[int] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None) -> int:
+    """Write matching chat_history rows as CSV to the binary file object `dst`; returns the row count."""
+    filters, params = [], []
+    if user_id is not None:
+        filters.append("user_id = %s")
+        params.append(user_id)
+    if since is not None:
+        filters.append("created_at >= %s")
+        params.append(since)
+    if until is not None:
+        filters.append("created_at < %s")
+        params.append(until)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        # COPY takes no bind parameters; mogrify quotes them into the query
+        query = cur.mogrify(f"SELECT {COLUMNS} FROM chat_history {where} ORDER BY id", params).decode()
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH ({CSV_OPTIONS})", dst)
+        return cur.rowcount
+    finally:
+        cur.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of chat history with COPY")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="load a CSV (or .csv.gz) file")
+    imp.add_argument("path")
+    imp.add_argument("--create-users", action="store_true", help="create placeholder users for unknown user_ids")
+    imp.add_argument("--dry-run", action="store_true", help="report what would be imported, then roll back")
+
+    exp = sub.add_parser("export", help="write a CSV (or .csv.gz) file")
+    exp.add_argument("path")
+    exp.add_argument("--user-id", type=int)
+    exp.add_argument("--since", type=datetime.fromisoformat, help="inclusive, e.g. 2026-10-01")
+    exp.add_argument("--until", type=datetime.fromisoformat, help="exclusive")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "import":
+        with _open(args.path, "rb") as src:
+            counts = import_chats(src, create_users=args.create_users, dry_run=args.dry_run)
+        seconds = time.perf_counter() - start
+        logger.info("%s %d of %d row(s) in %.2fs (%.0f rows/s): %s",
+                    "Would import" if args.dry_run else "Imported", counts["imported"], counts["rows"],
+                    seconds, counts["rows"] / seconds if seconds else 0.0, counts)
+    else:
+        with _open(args.path, "wb") as dst:
+            rows = export_chats(dst, user_id=args.user_id, since=args.since, until=args.until)
+        seconds = time.perf_counter() - start
+        logger.info("Exported %d row(s) to %s in %.2fs (%.0f rows/s)",
+                    rows, args.path, seconds, rows / seconds if seconds else 0.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# backend/app/tools/eval_intent_classifier.py
+"""
+Intent Classifier Evaluation
+----------------------------
+Scores the labeled eval set (tests/data/intent_eval.jsonl) three ways:
+
+    rules       nlu.get_structured_intent only (current regex engine)
+    classifier  embedding classifier alone ("unsure" counts as general_chat)
+    pipeline    rules, then the classifier for messages the rules left as
+                general_chat (what the chat endpoint does, LLM fallback off)
+
+and reports accuracy, per-intent recall and precision, and per-message
+classifier latency. Precision matters most for create_task: a false match
+creates a task the user never asked for. With --sweep, pipeline accuracy and
+create_task precision are also reported for a range of thresholds.
+
+Run this on the deployed model before setting INTENT_CLASSIFIER_ENABLED.
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.eval_intent_classifier
+    docker exec -it <backend_container> python -m app.tools.eval_intent_classifier --sweep
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.config import settings
+from app.services import nlu
+from app.services.intent_classifier import get_classifier
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVAL_SET = "tests/data/intent_eval.jsonl"
+
+
+def load_eval_set(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def precision(rows, predictions, label: str):
+    """(correct, total) predictions of `label`."""
+    predicted = [r["label"] == label for p, r in zip(predictions, rows) if p == label]
+    return sum(predicted), len(predicted)
+
+
+def report(name: str, rows, predictions):
+    correct = sum(p == r["label"] for p, r in zip(predictions, rows))
+    totals, hits = Counter(), Counter()
+    for p, r in zip(predictions, rows):
+        totals[r["label"]] += 1
+        hits[r["label"]] += p == r["label"]
+    recall = "  ".join(f"{label}={hits[label]}/{totals[label]}" for label in sorted(totals))
+    logger.info("%-10s accuracy %.3f  recall (%s)", name, correct / len(rows), recall)
+    prec = "  ".join("%s=%d/%d" % (label, *precision(rows, predictions, label)) for label in sorted(totals))
+    logger.info("%-10s precision (%s)", "", prec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local intent classifier")
+    parser.add_argument("--eval-set", default=DEFAULT_EVAL_SET)
+    parser.add_argument("--sweep", action="store_true", help="report accuracy across thresholds")
+    args = parser.parse_args()
+
+    rows = load_eval_set(args.eval_set)
+    clf = get_classifier()
+
+    t0 = time.perf_counter()
+    clf.scores("warm up")  # embeds the prototypes once
+    logger.info("Prototype embedding: %.1f ms", (time.perf_counter() - t0) * 1000)
+
+    rules, scored, latencies = [], [], []
+    for r in rows:
+        rules.append(nlu.get_structured_intent(r["message"])["action"])
+        t = time.perf_counter()
+        scored.append(clf.scores(r["message"]))
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    def decide(scores, threshold, margin):
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        label, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        return label if score >= threshold and score - runner_up >= margin else "general_chat"
+
+    threshold, margin = settings.INTENT_CLASSIFIER_THRESHOLD, settings.INTENT_CLASSIFIER_MARGIN
+    classifier = [decide(s, threshold, margin) for s in scored]
+    pipeline = [ru if ru != "general_chat" else c for ru, c in zip(rules, classifier)]
+
+    logger.info("%d labeled messages, threshold=%.2f margin=%.2f", len(rows), threshold, margin)
+    report("rules", rows, rules)
+    report("classifier", rows, classifier)
+    report("pipeline", rows, pipeline)
+    lat = np.asarray(latencies)
+    logger.info("classifier latency per message: p50 %.2f ms  p95 %.2f ms  max %.2f ms",
+                np.percentile(lat, 50), np.percentile(lat, 95), lat.max())
+
+    for r, p in zip(rows, pipeline):
+        if p != r["label"]:
+            logger.info("  ✗ %-16s → %-16s %s", r["label"], p, r["message"])
+
+    if args.sweep:
+        for th in np.arange(0.35, 0.81, 0.05):
+            preds = [ru if ru != "general_chat" else decide(s, th, margin) for ru, s in zip(rules, scored)]
+            acc = sum(p == r["label"] for p, r in zip(preds, rows)) / len(rows)
+            hit, predicted = precision(rows, preds, "create_task")
+            logger.info("threshold %.2f → pipeline accuracy %.3f  create_task precision %d/%d",
+                        th, acc, hit, predicted)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# backend/app/tools/migrate_namespaces.py
+"""
+Semantic Memory Namespace Migration
+-----------------------------------
+Copies vectors from the legacy shared index (default namespace, filtered by
+metadata user_id) into per-user namespaces (user-<id>), online and in batches.
+
+Cutover:
+    1. Deploy with SEMANTIC_NAMESPACE_MODE=dual (new writes go to user
+       namespaces, reads merge user namespace + shared index).
+    2. Run this tool until it reports done. Progress is checkpointed after each
+       batch, so it can be stopped and re-run at any time; copies keep their
+       original ids, which makes re-copying a batch harmless. Each copied
+       vector is also recorded in the Postgres ledger (semantic_vectors) and
+       its text is dropped from vector metadata.
+    3. Switch to SEMANTIC_NAMESPACE_MODE=namespaced.
+    4. Optionally run with --purge-source to delete the legacy copies.
+
+Usage:
+    docker exec -it <backend_container> python -m app.tools.migrate_namespaces
+    docker exec -it <backend_container> python -m app.tools.migrate_namespaces --reset
+    docker exec -it <backend_container> python -m app.tools.migrate_namespaces --purge-source
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+
+from app.db import vector_ledger
+from app.db.vector_store import get_vector_store, user_namespace
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = "data/namespace_migration.json"
+
+
+def load_checkpoint(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"cursor": None, "pages": 0, "copied": 0, "skipped": 0, "done": False}
+
+
+def save_checkpoint(path: str, state: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    state["updated_at"] = int(time.time())
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def migrate(checkpoint: str, batch_size: int = 100, pause: float = 0.0, max_batches: int | None = None) -> dict:
+    """
+    Copy shared-index vectors into per-user namespaces, resuming from the checkpoint.
+    """
+    store = get_vector_store()
+    state = load_checkpoint(checkpoint)
+    if state.get("done"):
+        logger.info("✅ Migration already complete (%d copied). Use --reset to run again.", state["copied"])
+        return state
+
+    batches = 0
+    while True:
+        ids, next_cursor = store.list_ids(namespace=None, limit=batch_size, cursor=state["cursor"])
+        fetched = store.fetch(ids, namespace=None) if ids else {}
+
+        by_user = defaultdict(list)
+        for vid, vec in fetched.items():
+            uid = (vec.get("metadata") or {}).get("user_id")
+            if uid is None:
+                state["skipped"] += 1
+                continue
+            by_user[uid].append({"id": vid, "values": vec["values"], "metadata": vec["metadata"]})
+
+        for uid, items in by_user.items():
+            ns = user_namespace(uid)
+            ledger_rows = []
+            for it in items:
+                md = it["metadata"]
+                extra = {k: v for k, v in md.items() if k not in ("text", "hit_count") and k not in vector_ledger.VECTOR_METADATA_KEYS}
+                ledger_rows.append({
+                    "id": it["id"],
+                    "user_id": uid,
+                    "text": md.get("text"),
+                    "stored_at": md.get("stored_at") or int(time.time()),
+                    "hit_count": md.get("hit_count", 1),
+                    "metadata": extra,
+                })
+                it["metadata"] = vector_ledger.slim_metadata(md)
+            if not vector_ledger.record_vectors(ledger_rows, namespace=ns, skip_existing=True):
+                raise RuntimeError("Ledger insert failed; checkpoint not advanced.")
+            if not store.upsert(items, namespace=ns):
+                # Leave the checkpoint on this page so the next run retries it
+                raise RuntimeError(f"Upsert into {ns} failed; checkpoint not advanced.")
+            state["copied"] += len(items)
+
+        state["pages"] += 1
+        state["cursor"] = next_cursor
+        state["done"] = next_cursor is None
+        save_checkpoint(checkpoint, state)
+        batches += 1
+
+        logger.info("📦 Page %d: %d vectors → %d user namespace(s); total copied=%d skipped=%d",
+                    state["pages"], len(fetched), len(by_user), state["copied"], state["skipped"])
+
+        if state["done"] or (max_batches and batches >= max_batches):
+            break
+        if pause:
+            time.sleep(pause)
+
+    if state["done"]:
+        logger.info("✅ Migration complete: %d copied, %d skipped (no user_id).", state["copied"], state["skipped"])
+    return state
+
+
+def purge_source(batch_size: int = 100) -> int:
+    """
+    Delete legacy vectors that carry a user_id from the shared index.
+    Only run after SEMANTIC_NAMESPACE_MODE=namespaced.
+    """
+    store = get_vector_store()
+    cursor, deleted = None, 0
+    while True:
+        ids, cursor = store.list_ids(namespace=None, limit=batch_size, cursor=cursor)
+        fetched = store.fetch(ids, namespace=None) if ids else {}
+        doomed = [vid for vid, v in fetched.items() if (v.get("metadata") or {}).get("user_id") is not None]
+        if doomed:
+            # The ledger rows now describe the namespaced copies, so they stay
+            store.delete(doomed, namespace=None)
+            deleted += len(doomed)
+        if cursor is None:
+            break
+    logger.info("🧹 Purged %d legacy vectors from the shared index.", deleted)
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate semantic memory into per-user namespaces")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument("--reset", action="store_true", help="discard the checkpoint and start over")
+    parser.add_argument("--purge-source", action="store_true", help="delete migrated vectors from the shared index")
+    args = parser.parse_args()
+
+    if args.purge_source:
+        purge_source(args.batch_size)
+        return
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    migrate(args.checkpoint, args.batch_size, args.pause, args.max_batches)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,53 +2,85 @@
 """
 Semantic Memory Cleanup Utility
 -------------------------------
-Removes Pinecone vectors older than 90 days (configurable).
+Removes semantic memory vectors older than the retention period
+(SEMANTIC_RETENTION_DAYS, default 90 days).
 Can be run as a scheduled task (cron or Celery) or manually.
 
+Expired ids are enumerated from the Postgres ledger (semantic_vectors), then
+deleted in batches through the configured vector store, then dropped from the
+ledger. Vectors written before the ledger existed are picked up once
+app/tools/migrate_namespaces.py has recorded them.
+
 Usage:
-    docker exec -it <backend_container> python app/tools/semantic_cleanup.py
+    docker exec -it <backend_container> python -m app.tools.semantic_cleanup
+    docker exec -it <backend_container> python -m app.tools.semantic_cleanup --days 30 --dry-run
 """
 
+import argparse
 import logging
 import time
-from datetime import datetime, timedelta
-
-from app.db.pinecone_utils import get_index
-from app.config_pinecone import pinecone_settings
+from collections import defaultdict
+from datetime import datetime
 
-# 🕒 Retention period (seconds) — 90 days
-RETENTION_SECONDS = 90 * 24 * 3600
+from app.config import settings
+from app.db import vector_ledger
+from app.db.vector_store import get_vector_store
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def cleanup_old_vectors():
-    index = get_index()
-    logger.info(f"🧹 Starting semantic cleanup for index '{pinecone_settings.PINECONE_INDEX_NAME}'")
-    now = int(time.time())
-    cutoff = now - RETENTION_SECONDS
 
+def cleanup_old_vectors(retention_days: int | None = None, batch_size: int = 500, dry_run: bool = False) -> int:
+    """
+    Delete expired vectors in batches. Returns the number of vectors removed.
+    """
+    days = retention_days if retention_days is not None else settings.SEMANTIC_RETENTION_DAYS
+    cutoff = int(time.time()) - days * 24 * 3600
+    store = get_vector_store()
+    logger.info(f"🧹 Starting semantic cleanup on '{store.name}' (retention {days}d, cutoff {datetime.fromtimestamp(cutoff)})")
+
+    removed = 0
     try:
-        # Pinecone does not support direct server-side filtering deletion by timestamp yet.
-        # We'll fetch all vector metadata via `list` or `fetch` API in batches.
-        # (This approach depends on your Pinecone plan and client version.)
-        stats = index.describe_index_stats()
-        total_vectors = stats.get("total_vector_count", "unknown")
-        logger.info(f"ℹ️ Index has approximately {total_vectors} vectors.")
-
-        # NOTE: Most Pinecone environments don't support listing all items.
-        # In practice, you'd maintain metadata in Postgres for fast lookups.
-        # Here, we'll just log a warning for manual cleanup.
-        logger.warning("⚠️ Pinecone currently does not provide full vector enumeration via API.")
-        logger.warning("Consider tracking metadata in PostgreSQL for scalable cleanup.")
-        logger.info(f"🧾 Retention cutoff timestamp: {datetime.fromtimestamp(cutoff)}")
+        while True:
+            expired = vector_ledger.get_expired(cutoff, limit=batch_size)
+            if not expired:
+                break
+
+            by_namespace = defaultdict(list)
+            for row in expired:
+                by_namespace[row["namespace"]].append(row["id"])
 
+            if dry_run:
+                # Nothing is deleted, so only the first batch is inspected
+                removed = len(expired)
+                logger.info(f"🔎 Dry run: first batch has {len(expired)} expired vectors across {len(by_namespace)} namespace(s).")
+                break
+
+            for namespace, ids in by_namespace.items():
+                if not store.delete(ids, namespace=namespace):
+                    raise RuntimeError(f"Vector delete failed for namespace {namespace!r}")
+            # delete_entries reports failure as 0; without this check the same
+            # rows would come back from get_expired forever
+            deleted = vector_ledger.delete_entries([row["id"] for row in expired])
+            if deleted != len(expired):
+                raise RuntimeError(f"Ledger delete removed {deleted} of {len(expired)} expired rows")
+            removed += len(expired)
+            logger.info(f"🗑️ Deleted {len(expired)} expired vectors (total {removed}).")
+
+            if len(expired) < batch_size:
+                break
     except Exception as e:
         logger.exception("Cleanup failed: %s", e)
-        return False
+        return removed
+
+    logger.info(f"✅ Cleanup completed: {removed} vector(s) {'eligible' if dry_run else 'removed'}.")
+    return removed
 
-    logger.info("✅ Cleanup completed (or simulated). For production, use metadata tracking to delete stale IDs.")
-    return True
 
 if __name__ == "__main__":
-    cleanup_old_vectors()
+    parser = argparse.ArgumentParser(description="Delete expired semantic memory vectors")
+    parser.add_argument("--days", type=int, default=None, help="retention in days (default: SEMANTIC_RETENTION_DAYS)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    cleanup_old_vectors(args.days, args.batch_size, args.dry_run)
@@ -0,0 +1,244 @@
+# backend/app/utils/logging_setup.py
+"""
+Process-wide logging setup for the API and the Celery worker.
+
+Loggers hand records to a QueueHandler on the root logger; a QueueListener
+thread formats them (JSON by default) and writes them to stdout. The request
+and worker threads only copy the record onto a bounded queue. When the queue
+is full the record is dropped and counted instead of blocking the caller.
+
+    {"ts": "2026-10-19T09:12:03.512Z", "level": "INFO", "logger": "app.db.utils",
+     "msg": "Chat saved", "request_id": "5f0c...", "chat_id": "42"}
+
+- LOG_LEVEL sets the root level; LOG_LEVELS overrides it per logger, e.g.
+  "app.db=DEBUG,neo4j=WARNING,uvicorn.access=WARNING".
+- DEBUG records are sampled per call site: the first one is kept, then
+  every LOG_DEBUG_SAMPLE_EVERY-th (kept records carry "sample_every").
+- Fields passed with extra={...} become top-level JSON keys.
+- RequestIdMiddleware takes X-Request-ID from the client (or makes one),
+  returns it on the response and stamps it on every record logged while
+  handling the request, including from run_in_threadpool workers.
+"""
+
+import atexit
+import copy
+import datetime
+import itertools
+import json
+import logging
+import queue
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through extra={...}
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "sample_every"}
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["_NonBlockingQueueHandler"] = None
+
+
+# ======================================================
+# 🔹 Handler side (runs on the logging thread)
+# ======================================================
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks and leaves formatting to the listener:
+    prepare() only resolves %-args (so later mutation of the arguments
+    cannot change the message) and keeps exc_info for the formatter.
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _ContextFilter(logging.Filter):
+    """Adds the current request id; samples DEBUG records per call site."""
+
+    def __init__(self, sample_every: int = 1):
+        super().__init__()
+        self.sample_every = max(1, sample_every)
+        self._counters: Dict[tuple, itertools.count] = {}
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        if record.levelno > logging.DEBUG or self.sample_every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        counter = self._counters.get(site)
+        if counter is None:
+            counter = self._counters.setdefault(site, itertools.count())
+        if next(counter) % self.sample_every:
+            return False
+        record.sample_every = self.sample_every
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+            .isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "sample_every", None):
+            entry["sample_every"] = record.sample_every
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """'app.db=DEBUG, neo4j=warning' -> {'app.db': 'DEBUG', 'neo4j': 'WARNING'}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    levels: Optional[str] = None,
+    fmt: Optional[str] = None,
+    sample_every: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    stream=None,
+):
+    """
+    Install the queue handler on the root logger and start the listener.
+    Arguments default to the LOG_* settings. Calling it again replaces the
+    previous setup (flushing what it had queued).
+    """
+    global _listener, _queue_handler
+    from app.config import settings
+
+    level = level or settings.LOG_LEVEL
+    levels = settings.LOG_LEVELS if levels is None else levels
+    fmt = fmt or settings.LOG_FORMAT
+    sample_every = settings.LOG_DEBUG_SAMPLE_EVERY if sample_every is None else sample_every
+    queue_size = queue_size or settings.LOG_QUEUE_SIZE
+
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(_TextFormatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    _queue_handler = _NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _queue_handler.addFilter(_ContextFilter(sample_every))
+    _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=False)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+
+    # uvicorn installs its own stream handlers; route its error and access
+    # logs through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uv_logger = logging.getLogger(name)
+        uv_logger.handlers.clear()
+        uv_logger.propagate = True
+
+    for name, logger_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener.start()
+    return _queue_handler
+
+
+def shutdown_logging():
+    """Stop the listener after it has written everything queued so far."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+atexit.register(shutdown_logging)
+
+
+# ======================================================
+# 🔹 Request ids
+# ======================================================
+class RequestIdMiddleware:
+    """
+    Sets request_id_var for the request (X-Request-ID if the client sent a
+    sane one, else a fresh uuid4 hex) and echoes it as X-Request-ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                value = value.decode("latin-1")
+                if _REQUEST_ID_RE.match(value):
+                    request_id = value
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,209 @@
+# backend/app/utils/mailer.py
+"""
+Shared SMTP delivery for the worker (reminders) and the API (welcome emails).
+
+Keeps up to SMTP_POOL_SIZE authenticated connections open and reuses them,
+instead of paying connect + STARTTLS + login for every message. send_many()
+sends a batch concurrently over the pool, with at most SMTP_POOL_SIZE
+messages in flight. Transient failures (refused or dropped connections, 4xx
+greetings and replies, socket errors) are retried SMTP_MAX_ATTEMPTS times
+with exponential backoff on a fresh connection; permanent 5xx rejections are
+not retried.
+
+Configured from the environment, like email_utils and the worker:
+EMAIL_USER / EMAIL_PASS plus SMTP_HOST, SMTP_PORT, SMTP_STARTTLS,
+SMTP_POOL_SIZE, SMTP_MAX_ATTEMPTS and SMTP_IDLE_SECONDS.
+"""
+
+import logging
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (to_email, subject, body)
+Message = Tuple[str, str, str]
+
+
+def is_transient(exc: Exception) -> bool:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+class SMTPPool:
+    """
+    A bounded pool of logged-in SMTP connections. Connections idle longer
+    than idle_seconds are checked with NOOP before reuse.
+    """
+
+    def __init__(self, host: str, port: int, user: Optional[str], password: Optional[str],
+                 size: int = 4, starttls: bool = True, timeout: float = 30.0, idle_seconds: float = 60.0):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.starttls, self.timeout, self.idle_seconds = starttls, timeout, idle_seconds
+        self.size = size
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connects += 1
+        return server
+
+    def acquire(self) -> smtplib.SMTP:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    server, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < self.idle_seconds:
+                    return server
+                try:
+                    if server.noop()[0] == 250:
+                        return server
+                except smtplib.SMTPException:
+                    pass
+                self._discard(server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, server: smtplib.SMTP, broken: bool = False):
+        if broken:
+            self._discard(server)
+        else:
+            self._idle.put((server, time.monotonic()))
+        self._slots.release()
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
+
+class Mailer:
+    def __init__(self, pool: SMTPPool, sender: Optional[str] = None, max_attempts: int = 3, backoff: float = 0.5):
+        self.pool = pool
+        self.sender = sender or pool.user
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def _build(self, to_email: str, subject: str, body: str) -> str:
+        msg = MIMEText(body)
+        msg["Subject"] = subject
+        msg["From"] = self.sender
+        msg["To"] = to_email
+        return msg.as_string()
+
+    def send(self, to_email: str, subject: str, body: str):
+        """
+        Send one message, retrying transient failures. Raises the last error.
+        """
+        raw = self._build(to_email, subject, body)
+        for attempt in range(1, self.max_attempts + 1):
+            server = None
+            try:
+                # Connects (and runs STARTTLS and login) when no idle connection is left
+                server = self.pool.acquire()
+                server.sendmail(self.sender, [to_email], raw)
+            except Exception as e:
+                if server is not None:
+                    # A 4xx/5xx reply leaves the session usable; anything else doesn't
+                    usable = isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+                    self.pool.release(server, broken=not usable)
+                if attempt == self.max_attempts or not is_transient(e):
+                    raise
+                delay = self.backoff * 2 ** (attempt - 1) * (1 + random.random() / 2)
+                logger.warning("SMTP send to %s failed (%s); retry %d in %.1fs", to_email, e, attempt, delay)
+                time.sleep(delay)
+            else:
+                self.pool.release(server)
+                return
+
+    def send_many(self, messages: Iterable[Message]) -> List[Optional[Exception]]:
+        """
+        Send messages concurrently over the pool. Returns one entry per
+        message, in order: None if sent, else the exception.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+
+        def one(m: Message):
+            try:
+                self.send(*m)
+                return None
+            except Exception as e:
+                logger.error("SMTP send to %s failed: %s", m[0], e)
+                return e
+
+        if len(messages) == 1:
+            return [one(messages[0])]
+        workers = min(len(messages), self.pool.size)
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(one, messages))
+
+    def close(self):
+        self.pool.close()
+
+
+_mailer: Optional[Mailer] = None
+_mailer_lock = threading.Lock()
+
+
+def get_mailer() -> Mailer:
+    global _mailer
+    if _mailer is None:
+        with _mailer_lock:
+            if _mailer is None:
+                user = os.getenv("EMAIL_USER")
+                pool = SMTPPool(
+                    host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+                    port=int(os.getenv("SMTP_PORT", "587")),
+                    user=user,
+                    password=os.getenv("EMAIL_PASS"),
+                    size=int(os.getenv("SMTP_POOL_SIZE", "4")),
+                    starttls=os.getenv("SMTP_STARTTLS", "true").lower() != "false",
+                    idle_seconds=float(os.getenv("SMTP_IDLE_SECONDS", "60")),
+                )
+                _mailer = Mailer(pool, sender=user, max_attempts=int(os.getenv("SMTP_MAX_ATTEMPTS", "3")))
+    return _mailer
+
+
+def close_mailer():
+    global _mailer
+    with _mailer_lock:
+        if _mailer is not None:
+            _mailer.close()
+            _mailer = None
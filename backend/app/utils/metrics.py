@@ -0,0 +1,157 @@
+# backend/app/utils/metrics.py
+"""
+Per-stage latency metrics.
+
+span("stage") / @timed("stage") time a block or function and record it in
+the assistant_stage_seconds Prometheus histogram (exported on /metrics).
+Within an HTTP request the durations are also summed per stage and returned
+in a Server-Timing header, e.g.
+
+    Server-Timing: chat.history;dur=3.1, postgres;dur=2.8;desc="2 calls", llm;dur=812.4, total;dur=830.2
+
+Stages nest (chat.history includes the postgres time it spends), so the
+breakdown is not meant to add up. A span costs two perf_counter() calls and
+one histogram observe, a few microseconds.
+
+With several worker processes (app/prefork.py) the histograms are kept in
+per-process files under PROMETHEUS_MULTIPROC_DIR and merged on scrape.
+
+The per-request totals live in a ContextVar holding a dict; run_in_threadpool
+copies the context into the worker thread, so helpers timed there add to the
+same dict.
+"""
+
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest, multiprocess
+
+# 1 ms .. 30 s: covers cache hits through LLM calls
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "assistant_stage_seconds", "Time spent per pipeline stage or backend call", ["stage"], buckets=_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "assistant_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=_BUCKETS
+)
+
+_request_spans: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_spans", default=None)
+_stage_children = {}
+
+
+def _observe(stage: str, seconds: float):
+    child = _stage_children.get(stage)
+    if child is None:
+        child = _stage_children[stage] = STAGE_SECONDS.labels(stage)
+    child.observe(seconds)
+    spans = _request_spans.get()
+    if spans is not None:
+        total = spans.get(stage)
+        if total is None:
+            spans[stage] = [seconds, 1]
+        else:
+            total[0] += seconds
+            total[1] += 1
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe(stage, time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """Decorator form of span() for sync and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _observe(stage, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def server_timing(spans: Dict[str, List[float]], total: float) -> str:
+    parts = []
+    for stage, (seconds, calls) in spans.items():
+        entry = f"{stage};dur={seconds * 1000:.1f}"
+        parts.append(entry if calls == 1 else f'{entry};desc="{calls} calls"')
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# ======================================================
+# 🔹 ASGI middleware and /metrics
+# ======================================================
+class ServerTimingMiddleware:
+    """
+    Collects the spans recorded while handling a request into its
+    Server-Timing header, and records the request in assistant_request_seconds
+    by route template (unmatched paths share one label).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans: Dict[str, List[float]] = {}
+        token = _request_spans.set(spans)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = list(message.get("headers", []))
+                value = server_timing(spans, time.perf_counter() - start)
+                headers.append((b"server-timing", value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_spans.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status[0])
+            ).observe(time.perf_counter() - start)
+
+
+def metrics_payload():
+    """
+    (body, content type) for the /metrics endpoint. Under app/prefork.py
+    (PROMETHEUS_MULTIPROC_DIR set) this aggregates every worker's samples,
+    not just those of the worker answering the scrape.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
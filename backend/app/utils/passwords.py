@@ -0,0 +1,118 @@
+# backend/app/utils/passwords.py
+"""
+Password hashing off the request threadpool.
+
+argon2 is deliberately slow and memory-hard (ARGON2_MEMORY_COST KiB per
+hash). On FastAPI's shared threadpool a burst of logins occupies the threads
+that chat handlers need for their sync DB and Redis calls, so chat queues
+behind hashing. Here hashing and verification run in a dedicated pool of
+PASSWORD_HASH_WORKERS processes; callers await the result, and extra logins
+queue for a pool process instead of for the shared threadpool.
+
+Hashes produced with older parameters (or bcrypt) are re-hashed on the next
+successful login: verify_and_update() returns the new hash when passlib's
+needs_update() says the stored one is out of date.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stored for accounts that must not log in with a password (users created by
+# a bulk import). No scheme produces it, and verify_and_update rejects it.
+UNUSABLE_PASSWORD_HASH = "!unusable"
+
+
+@lru_cache(maxsize=1)
+def get_context() -> CryptContext:
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__rounds=settings.ARGON2_TIME_COST,
+        argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+        argon2__parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+
+# ======================================================
+# 🔹 Work done inside the pool processes
+# ======================================================
+def hash_password(plain_password: str) -> str:
+    return get_context().hash(plain_password)
+
+
+def verify_and_update(plain_password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    (valid, new_hash). new_hash is set only when the password is valid and
+    the stored hash uses outdated parameters or a deprecated scheme.
+    """
+    if not password_hash or password_hash.startswith("!"):
+        return False, None  # UNUSABLE_PASSWORD_HASH
+    ctx = get_context()
+    try:
+        valid = ctx.verify(plain_password, password_hash)
+    except (ValueError, TypeError):
+        return False, None  # unknown or malformed hash
+    if valid and ctx.needs_update(password_hash):
+        return True, ctx.hash(plain_password)
+    return valid, None
+
+
+def _warm_up() -> int:
+    get_context()
+    return multiprocessing.current_process().pid
+
+
+# ======================================================
+# 🔹 Pool
+# ======================================================
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: the server process has live threads and driver sockets
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def start_pool():
+    """Start the worker processes now, so the first login doesn't pay for it."""
+    pool = get_pool()
+    pids = {f.result() for f in [pool.submit(_warm_up) for _ in range(settings.PASSWORD_HASH_WORKERS)]}
+    logger.info("🔐 Password hashing pool ready (%d process(es))", len(pids))
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def hash_password_async(plain_password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), hash_password, plain_password)
+
+
+async def verify_and_update_async(plain_password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), verify_and_update, plain_password, password_hash)
@@ -0,0 +1,206 @@
+# backend/app/utils/profiler.py
+"""
+On-demand in-process sampling profiler.
+
+A background thread snapshots every thread's Python stack with
+sys._current_frames() every `interval` seconds. That covers the event loop
+thread (the coroutine that is running) and the threadpool workers (sync DB,
+Redis and LLM calls). Samples are only taken while at least one profiled
+request (/chat/ by default) is in flight. Threads waiting for work (idle
+pool workers, the event loop in select()) are skipped, so the profile is
+wall-clock time of the threads actually serving requests.
+
+Output is the collapsed-stack format, one line per distinct stack:
+
+    MainThread;uvicorn/server.py:serve;...;app/main.py:chat 42
+
+which flamegraph.pl, speedscope (https://www.speedscope.app) and most flame
+graph viewers read directly. Each stack starts with the thread name
+("MainThread" is the event loop, "AnyIO worker thread" the threadpool).
+
+Only one session runs at a time (POST /admin/profile in main.py). While no
+session is active, ProfileRequestsMiddleware only checks a global.
+"""
+
+import asyncio
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# A thread is idle when it is blocked in one of these leaves directly under
+# a pool's or the event loop's wait-for-work loop. Blocking elsewhere (a
+# socket read for an LLM reply, a pool checkout) is request time and is kept.
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+_WORK_LOOPS = {
+    ("_asyncio.py", "run"),  # anyio worker thread (run_in_threadpool)
+    ("thread.py", "_worker"),  # concurrent.futures ThreadPoolExecutor
+    ("base_events.py", "_run_once"),  # asyncio event loop
+    ("process.py", "wait_result_broken_or_wakeup"),  # ProcessPoolExecutor manager
+}
+
+_PATH_PREFIXES = sorted(
+    {p for p in (sysconfig.get_paths().get("purelib"), sysconfig.get_paths().get("stdlib"),
+                 os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) if p},
+    key=len, reverse=True,
+)
+
+
+def _key(code):
+    return os.path.basename(code.co_filename), code.co_name
+
+
+def _is_idle(frame) -> bool:
+    if _key(frame.f_code) not in _IDLE_LEAVES:
+        return False
+    for _ in range(3):
+        frame = frame.f_back
+        if frame is None:
+            return False
+        if _key(frame.f_code) in _WORK_LOOPS:
+            return True
+    return False
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):].lstrip(os.sep)
+    return filename
+
+
+class ProfileSession:
+    """
+    One profiling window: samples until stop(), or until `max_requests`
+    profiled requests have finished (see `done`).
+    """
+
+    def __init__(self, interval: float = 0.005, max_requests: int = 0, max_depth: int = 128):
+        self.interval = interval
+        self.max_requests = max_requests
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.requests_started = 0
+        self.requests_finished = 0
+        self.started_at = time.time()
+        self.stopped_at: Optional[float] = None
+        self.done = asyncio.Event()
+        self._in_flight = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    # ---------- request gating ----------
+    def request_started(self):
+        self._in_flight += 1
+        self.requests_started += 1
+
+    def request_finished(self):
+        self._in_flight -= 1
+        self.requests_finished += 1
+        if self.max_requests and self.requests_finished >= self.max_requests:
+            self.done.set()
+
+    # ---------- sampling ----------
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.stopped_at = time.time()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if self._in_flight > 0:
+                self.sample(skip=own)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{_short_path(code.co_filename)}:{code.co_name}"
+        return label
+
+    def sample(self, skip: Optional[int] = None):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            if _is_idle(frame):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    # ---------- output ----------
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self) -> Dict[str, object]:
+        end = self.stopped_at or time.time()
+        return {
+            "seconds": round(end - self.started_at, 3),
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "requests": self.requests_finished,
+            "stacks": len(self.stacks),
+        }
+
+
+# ======================================================
+# 🔹 Process-wide session
+# ======================================================
+_session: Optional[ProfileSession] = None
+_session_lock = threading.Lock()
+
+
+def start_session(interval: float, max_requests: int) -> ProfileSession:
+    """Start the process-wide session; RuntimeError if one is already running."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            raise RuntimeError("a profiling session is already running")
+        _session = ProfileSession(interval=interval, max_requests=max_requests).start()
+        return _session
+
+
+def stop_session(session: ProfileSession):
+    global _session
+    session.stop()
+    with _session_lock:
+        if _session is session:
+            _session = None
+
+
+class ProfileRequestsMiddleware:
+    """Tells the active session when requests to `paths` start and finish."""
+
+    def __init__(self, app, paths=("/chat/", "/chat-with-upload/")):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        session = _session
+        if session is None or scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        session.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.request_finished()
@@ -1,11 +1,10 @@
 # backend/app/worker.py
 
+import logging
 import os
 from celery import Celery
+from celery.signals import setup_logging
 from datetime import datetime
-import psycopg
-import smtplib
-from email.mime.text import MIMEText
 from dotenv import load_dotenv
 import pytz
 
@@ -28,14 +27,15 @@ REDIS_URL_CELERY = os.getenv("REDIS_URL_CELERY", "redis://redis:6379/0")
 # ======================
 # 🔹 Email Config
 # ======================
-EMAIL_USER = os.getenv("EMAIL_USER")
-EMAIL_PASS = os.getenv("EMAIL_PASS")
+# EMAIL_USER / EMAIL_PASS / SMTP_* are read by app/utils/mailer.py
 
 # ======================
 # 🔹 Timezone
 # ======================
 INDIA_TZ = pytz.timezone("Asia/Kolkata")
 
+logger = logging.getLogger(__name__)
+
 # ======================
 # 🔹 Celery Initialization
 # ======================
@@ -45,124 +45,139 @@ celery = Celery(
     backend=REDIS_URL_CELERY
 )
 
-# Run check every minute
+# Reminders fire as ETA jobs at their due time (worker.send_reminder, see
+# app/services/reminders.py); the sweep only enqueues the ones the save path
+# couldn't and re-enqueues any that went missing
 celery.conf.beat_schedule = {
-    "check-tasks-every-1-minute": {
+    "reconcile-reminders": {
         "task": "worker.check_and_trigger_tasks",
-        "schedule": 60.0,  # every 60 seconds
+        "schedule": float(os.getenv("REMINDER_SWEEP_INTERVAL", "300")),
+    },
+    "extract-facts-from-chat-history": {
+        "task": "worker.extract_facts",
+        "schedule": float(os.getenv("FACT_EXTRACTION_INTERVAL", "300")),
     },
 }
 celery.conf.timezone = "Asia/Kolkata"
 
+# Outbound mail has its own queue so an SMTP backlog never delays reminders
+# or fact extraction; run workers with -Q celery,mail
+celery.conf.task_routes = {"worker.send_emails": {"queue": "mail"}}
+
+
+# Connecting this signal stops Celery from installing its own handlers; the
+# worker logs through the same queue/JSON setup as the API
+@setup_logging.connect
+def configure_worker_logging(**kwargs):
+    from app.utils.logging_setup import configure_logging
+    configure_logging()
+
 
 # ======================
-# 🔹 Main Task Checker
+# 🔹 Reminders
 # ======================
+@celery.task(name="worker.send_reminder")
+def send_reminder(task_id):
+    """
+    Fires at the task's due time. Claims the task (so duplicate or stale jobs
+    are no-ops) and queues the owner's email on the mail queue.
+    """
+    # Imported lazily: pulls in the app settings and DB helpers
+    from app.services.mail_queue import enqueue_emails
+    from app.services.reminders import deliver
+
+    try:
+        queued = deliver(task_id, enqueue_emails)
+    except Exception as e:
+        logger.error(f"❌ Error sending reminder for task {task_id}: {e}")
+        raise
+    if queued:
+        logger.info("Reminder queued", extra={"task_id": task_id})
+    return queued
+
+
 @celery.task(name="worker.check_and_trigger_tasks")
 def check_and_trigger_tasks():
     """
-    Periodically checks PostgreSQL 'tasks' table for due reminders.
-    Sends an email if a task is due (in IST timezone) and not yet notified.
+    Reconciliation sweep over pending tasks (safety net for send_reminder):
+    enqueues reminders entering the ETA horizon and starts batch
+    dispatchers for overdue ones.
     """
+    from app.services.reminders import reconcile_reminders, dispatchers_needed
+
     try:
-        conn = psycopg.connect(
-            dbname=POSTGRES_DB,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            host=POSTGRES_HOST,
-            port="5432"
-        )
-        cur = conn.cursor()
-
-        # Force the DB session to IST timezone
-        cur.execute("SET TIME ZONE 'Asia/Kolkata';")
-
-        # Get all tasks that are due and not yet notified, including owner user_id
-        cur.execute("""
-            SELECT id, user_id, title, notes, datetime
-            FROM tasks
-            WHERE datetime <= NOW()
-            AND (notified IS NULL OR notified = FALSE);
-        """)
-        tasks = cur.fetchall()
-
-        triggered_count = 0
-
-        for task_row in tasks:
-            # task_row may be a tuple: (id, user_id, title, notes, datetime)
-            try:
-                task_id = task_row[0]
-                task_user_id = task_row[1]
-                title = task_row[2]
-                desc = task_row[3]
-            except Exception:
-                # Fallback for different cursor types
-                task_id = task_row.get("id")
-                task_user_id = task_row.get("user_id")
-                title = task_row.get("title")
-                desc = task_row.get("notes")
-
-            # Look up user's email and name from users table
-            user_email = None
-            user_name = None
-            try:
-                cur.execute("SELECT email, name FROM users WHERE id = %s;", (task_user_id,))
-                user = cur.fetchone()
-                if user:
-                    # handle both tuple and dict cursor types
-                    user_email = user[0] if isinstance(user, tuple) else user.get("email")
-                    user_name = user[1] if isinstance(user, tuple) else user.get("name")
-            except Exception as e:
-                print(f"⚠️  Failed to lookup user {task_user_id}: {e}")
-
-            # If user's email not available, skip sending and log
-            if not user_email:
-                print(f"⚠️  No email found for user {task_user_id}; skipping notification for task {task_id}")
-            else:
-                # Personalize message with user's name when available
-                subject = f"Task Reminder: {title}"
-                body = f"📌 Hi {user_name or 'there'},\n\nThis is a reminder for your task:\n\nTitle: {title}\nDetails: {desc or 'No details provided.'}\n\n— Your Personal AI Assistant"
-                send_email_notification(user_email, subject, body)
-                triggered_count += 1
-
-                # Mark the task as notified
-                cur.execute("UPDATE tasks SET notified = TRUE WHERE id = %s", (task_id,))
-                conn.commit()
-
-        cur.close()
-        conn.close()
-
-        now_ist = datetime.now(INDIA_TZ).strftime("%Y-%m-%d %H:%M:%S")
-        print(f"✅ Checked tasks at {now_ist}, triggered {triggered_count} reminder(s).")
+        result = reconcile_reminders()
+    except Exception as e:
+        logger.error(f"❌ Error checking tasks: {e}")
+        return {"error": str(e)}
+
+    result["dispatchers"] = dispatchers_needed(result["overdue"])
+    for _ in range(result["dispatchers"]):
+        dispatch_reminders.delay()
 
+    now_ist = datetime.now(INDIA_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    logger.info("Checked tasks", extra={"checked_at": now_ist, **result})
+    return result
+
+
+@celery.task(name="worker.dispatch_reminders")
+def dispatch_reminders(max_seconds=60):
+    """
+    Drains overdue reminders in claimed batches until none are left or
+    max_seconds have passed. Safe to run on any number of workers at once.
+    """
+    import time
+    from app.services.mail_queue import enqueue_emails
+    from app.services.reminders import dispatch_due
+
+    sent, batches = 0, 0
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < max_seconds:
+            task_ids = dispatch_due(enqueue_emails)
+            batches += 1
+            sent += len(task_ids)
+            if not task_ids:
+                break
     except Exception as e:
-        print("❌ Error checking tasks:", e)
+        logger.error(f"❌ Error dispatching reminders: {e}")
+    logger.info("Dispatched reminders", extra={
+        "sent": sent, "batches": batches, "seconds": round(time.monotonic() - start, 1),
+    })
+    return {"sent": sent, "batches": batches}
 
 
 # ======================
-# 🔹 Email Notification
+# 🔹 Background Fact Extraction
 # ======================
-def send_email_notification(to_email, title, desc):
+@celery.task(name="worker.extract_facts")
+def extract_facts():
     """
-    Sends email notification using Gmail SMTP.
+    Runs one fact-extraction cycle over new chat_history rows
+    (see app/services/fact_extraction.py). Returns the cycle's metrics.
     """
-    try:
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        sender_email = EMAIL_USER
-        sender_password = EMAIL_PASS
+    # Imported lazily: pulls in the app settings, Neo4j and LLM clients
+    from app.services.fact_extraction import run_extraction_cycle
 
-        msg = MIMEText(f"📌 Task Reminder\n\nTitle: {title}\n\nDetails: {desc or 'No details provided.'}")
-        msg["Subject"] = f"Task Reminder: {title}"
-        msg["From"] = sender_email
-        msg["To"] = to_email
+    try:
+        return run_extraction_cycle()
+    except Exception as e:
+        logger.error(f"❌ Error extracting facts: {e}")
+        return {"error": str(e)}
 
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, [to_email], msg.as_string())
 
-        print(f"📧 Email sent successfully to {to_email} for task '{title}'")
+# ======================
+# 🔹 Outbound Mail
+# ======================
+@celery.task(name="worker.send_emails", acks_late=True)
+def send_emails(messages, attempt=1):
+    """
+    Sends a batch of queued emails over the shared SMTP pool. Already-sent
+    idempotency keys are skipped; failures are retried with backoff or
+    dead-lettered (see app/services/mail_queue.py).
+    """
+    from app.services.mail_queue import deliver_batch
 
-    except Exception as e:
-        print("❌ Email send failed:", e)
+    counts = deliver_batch(messages, attempt)
+    logger.info("Mail batch sent", extra={"attempt": attempt, **counts})
+    return counts
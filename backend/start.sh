@@ -15,10 +15,10 @@ python -c "from app.db.postgres import create_tables; create_tables()"
 # STEP 2: Start Celery Worker (in background)
 # ======================================================
 echo "⚙️ Launching Celery worker..."
-celery -A worker worker --loglevel=info &
+celery -A worker worker -Q celery,mail --loglevel=info &
 
 # ======================================================
 # STEP 3: Launch FastAPI Web Server
 # ======================================================
-echo "🌐 Starting FastAPI server on port 8000..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+echo "🌐 Starting FastAPI server on port 8000 (${WEB_CONCURRENCY:-one per CPU} workers)..."
+exec python -m app.prefork --host 0.0.0.0 --port 8000
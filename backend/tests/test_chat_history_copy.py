@@ -0,0 +1,65 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from app.api import auth
+from app.tools import chat_history_copy
+from app.utils import passwords
+
+
+class _FakeCursor:
+    """Records statements; every statement 'affects' one row."""
+
+    rowcount = 1
+
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def copy_expert(self, sql, src):
+        self.executed.append((sql, src.read()))
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, cur):
+        self.cur = cur
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_created_placeholder_users_cannot_log_in(monkeypatch):
+    cur = _FakeCursor()
+    monkeypatch.setattr(chat_history_copy, "get_connection", lambda: _FakeConnection(cur))
+    csv = b"user_id,chat_id,user_query,ai_response,created_at\n7,c1,hello,hi,2026-10-01 10:00:00\n"
+
+    counts = chat_history_copy.import_chats(io.BytesIO(csv), create_users=True, dry_run=True)
+
+    [stored_hash] = [params[0] for sql, params in cur.executed if sql == chat_history_copy.CREATE_USERS]
+    assert counts["created_users"] == 1 and stored_hash == passwords.UNUSABLE_PASSWORD_HASH
+
+    placeholder = {"id": 7, "name": "placeholder_7", "email": "placeholder+7@example.local", "password_hash": stored_hash}
+    monkeypatch.setattr(auth, "get_user_by_email", lambda email: placeholder)
+    monkeypatch.setattr(passwords, "get_pool", lambda: ThreadPoolExecutor(1))  # verify in-process
+    for guess in ("changeme", "", stored_hash):
+        # construct: the hash must hold even if the email validator ever accepts .local
+        req = auth.LoginRequest.model_construct(email=placeholder["email"], password=guess)
+        resp = asyncio.run(auth.login(req))
+        assert resp.success is False and resp.token is None
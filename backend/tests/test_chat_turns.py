@@ -0,0 +1,107 @@
+from app.db import redis_utils
+from app.services import memory
+
+
+class _FakeTurnsCache:
+    """Mirrors the Lua scripts in redis_utils: appends only extend a cached list."""
+
+    encode_turn = staticmethod(redis_utils.encode_turn)
+
+    def __init__(self):
+        self.lists, self.hwm, self.fail_appends = {}, {}, False
+
+    def get_cached_turns(self, user_id, chat_id):
+        return list(self.lists[(user_id, chat_id)]) if (user_id, chat_id) in self.lists else None
+
+    def cache_turns(self, user_id, chat_id, entries, max_row_id):
+        key = (user_id, chat_id)
+        if key in self.lists or self.hwm.get(key, 0) > max_row_id:
+            return False
+        self.lists[key] = [tuple(redis_utils.msgpack.unpackb(e)) for e in entries]
+        self.hwm[key] = max_row_id
+        return True
+
+    def append_cached_turn(self, user_id, chat_id, row_id, user_query, ai_response):
+        if self.fail_appends:
+            raise ConnectionError("redis down")
+        key = (user_id, chat_id)
+        self.hwm[key] = row_id
+        if key in self.lists:
+            self.lists[key].append((row_id, user_query, ai_response or ""))
+
+    def invalidate_cached_turns(self, user_id, chat_id):
+        self.lists.pop((user_id, chat_id), None)
+
+
+def _use_fakes(monkeypatch, rows):
+    cache, reads = _FakeTurnsCache(), []
+
+    def fake_recent(user_id, chat_id, limit):
+        reads.append(chat_id)
+        return [r for r in rows if r["chat"] == chat_id][-limit:]
+
+    monkeypatch.setattr(memory, "redis", cache)
+    monkeypatch.setattr(memory.db_utils, "get_recent_turns", fake_recent)
+    monkeypatch.setattr(memory.settings, "CHAT_HOT_TURNS", 3, raising=False)
+    monkeypatch.setattr(memory.settings, "CHAT_HOT_MAX_BYTES", 64 * 1024, raising=False)
+    return cache, reads
+
+
+def test_history_is_read_through_and_appended(monkeypatch):
+    rows = [{"id": i, "chat": "c1", "user_query": f"q{i}", "ai_response": f"a{i}"} for i in range(1, 6)]
+    cache, reads = _use_fakes(monkeypatch, rows)
+
+    assert [t[0] for t in memory.get_recent_turns(1, "c1")] == [3, 4, 5]  # latest CHAT_HOT_TURNS
+    assert [t[0] for t in memory.get_recent_turns(1, "c1")] == [3, 4, 5]
+    assert reads == ["c1"]
+
+    memory.record_chat_turn(1, "c1", 6, "q6", None)
+    assert memory.get_recent_turns(1, "c1")[-1] == (6, "q6", "")
+    assert reads == ["c1"]
+
+    # A failed append must not leave a list that is missing the turn
+    cache.fail_appends = True
+    memory.record_chat_turn(1, "c1", 7, "q7", "a7")
+    rows.extend({"id": i, "chat": "c1", "user_query": f"q{i}", "ai_response": f"a{i}"} for i in (6, 7))
+    assert [t[0] for t in memory.get_recent_turns(1, "c1")] == [5, 6, 7]
+    assert reads == ["c1", "c1"]
+
+
+def test_miss_applies_the_byte_cap(monkeypatch):
+    rows = [{"id": i, "chat": "c1", "user_query": "x" * 40, "ai_response": "y"} for i in range(1, 4)]
+    _use_fakes(monkeypatch, rows)
+    monkeypatch.setattr(memory.settings, "CHAT_HOT_MAX_BYTES", 100, raising=False)
+
+    turns = memory.get_recent_turns(1, "c1")
+    assert [t[0] for t in turns] == [2, 3]
+    assert memory.get_recent_turns(1, "c1") == turns
+
+
+class _FakeBinClient:
+    def __init__(self, keys):
+        self.keys, self.round_trips = set(keys), 0
+
+    def pipeline(self, transaction=True):
+        client, queued = self, []
+
+        class _Pipe:
+            def delete(self, key):
+                queued.append(key)
+
+            def execute(self):
+                client.round_trips += 1
+                result = [int(k in client.keys) for k in queued]
+                client.keys.difference_update(queued)
+                queued.clear()
+                return result
+
+        return _Pipe()
+
+
+def test_bulk_invalidation_is_pipelined(monkeypatch):
+    chats = [(7, f"c{i}") for i in range(5)]
+    fake = _FakeBinClient(redis_utils._turns_keys(u, c)[0] for u, c in chats[:3])
+    monkeypatch.setattr(redis_utils, "_bin_client", fake)
+
+    assert redis_utils.invalidate_cached_turns_many(iter(chats), batch=2) == 3
+    assert fake.keys == set() and fake.round_trips == 3
@@ -0,0 +1,143 @@
+import io
+import os
+import threading
+
+import pytest
+
+from app.services import document_ingest
+
+
+def _words(n, start=0):
+    return " ".join(f"w{i}" for i in range(start, start + n))
+
+
+def test_chunks_overlap_and_do_not_depend_on_block_size():
+    text = _words(400)
+    whole = list(document_ingest.iter_chunks([text], size=200, overlap=40))
+    streamed = list(document_ingest.iter_chunks((text[i:i + 7] for i in range(0, len(text), 7)), size=200, overlap=40))
+
+    assert whole == streamed
+    assert all(len(c) <= 200 for c in whole)
+    for prev, cur in zip(whole, whole[1:]):
+        assert cur.split()[0] in prev.split()  # each chunk starts inside the previous one
+    covered = set(" ".join(whole).split())
+    assert covered == set(text.split())
+    # no trailing chunk made only of overlap
+    assert not set(whole[-1].split()) <= set(whole[-2].split())
+
+
+def test_chunks_collapse_whitespace_and_split_long_words():
+    chunks = list(document_ingest.iter_chunks(["a\n\n  b\t", "  c", "x" * 50], size=20, overlap=5))
+    assert chunks[0].startswith("a b cxxx")  # blocks are joined as-is
+    assert all(len(c) <= 20 for c in chunks)
+
+
+def test_detect_kind():
+    assert document_ingest.detect_kind("notes.MD", None) == "text"
+    assert document_ingest.detect_kind("blob", "text/plain; charset=utf-8") == "text"
+    assert document_ingest.detect_kind("paper.pdf", "application/octet-stream") == "pdf"
+    with pytest.raises(document_ingest.UnsupportedDocument):
+        document_ingest.detect_kind("image.png", "image/png")
+
+
+def test_spool_upload_copies_in_chunks_and_enforces_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(document_ingest.settings, "UPLOAD_TMP_DIR", str(tmp_path))
+    monkeypatch.setattr(document_ingest, "UPLOAD_READ_CHUNK", 10)
+    data = b"0123456789" * 5 + b"tail"
+
+    path, size = document_ingest.spool_upload(io.BytesIO(data), "doc.txt", max_bytes=100)
+    assert size == len(data) and path.endswith(".txt")
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+    with pytest.raises(document_ingest.UploadTooLarge):
+        document_ingest.spool_upload(io.BytesIO(data), "doc.txt", max_bytes=30)
+    assert os.listdir(tmp_path) == [os.path.basename(path)]  # the partial copy was removed
+
+
+VOCAB = ["invoice", "holiday", "recipe"]
+
+
+def _fake_embedding(text):
+    return [float(text.count(word)) + 0.01 for word in VOCAB]
+
+
+def test_ingest_job_stores_batches_and_ranks_chunks(monkeypatch, tmp_path):
+    monkeypatch.setattr(document_ingest.settings, "INGEST_CHUNK_CHARS", 120)
+    monkeypatch.setattr(document_ingest.settings, "INGEST_CHUNK_OVERLAP", 20)
+    monkeypatch.setattr(document_ingest.settings, "INGEST_EMBED_BATCH", 4)
+    monkeypatch.setattr(document_ingest, "TEXT_READ_CHARS", 50)
+    monkeypatch.setattr(document_ingest, "get_embedding", _fake_embedding)
+    monkeypatch.setattr(document_ingest, "get_batch_embeddings", lambda texts: [_fake_embedding(t) for t in texts])
+    calls = []
+
+    def fake_store_many(user_id, texts, metadatas=None, embeddings=None):
+        calls.append((user_id, list(texts), metadatas, embeddings))
+        return {"ok": True, "stored": len(texts), "skipped": 0}
+
+    monkeypatch.setattr(document_ingest, "store_many", fake_store_many)
+
+    body = " ".join([_words(60), "holiday plans in june holiday", _words(60, 100), "recipe for bread"])
+    path = tmp_path / "doc.md"
+    path.write_text(body)
+
+    job = document_ingest.IngestJob(7, str(path), "doc.md", "text", query="when is my holiday", top_k=2)
+    job.run()
+
+    assert job.future.result()["chunks"] == job.chunks == sum(len(c[1]) for c in calls)
+    assert all(len(texts) <= 4 for _, texts, _, _ in calls)
+    assert calls[0][0] == "7" and calls[0][3] is not None  # embeddings are passed through, not recomputed
+    indexes = [m["chunk"] for _, _, metas, _ in calls for m in metas]
+    assert indexes == list(range(job.chunks))
+    assert {m["document_id"] for _, _, metas, _ in calls for m in metas} == {job.document_id}
+
+    best = job.best_chunks()
+    assert len(best) == 2 and "holiday" in best[0]["text"]
+    assert best[0]["score"] >= best[1]["score"]
+    assert not path.exists()
+    assert "holiday" in document_ingest.format_context(job, best)
+
+
+def test_ingest_job_failure_sets_error_and_removes_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(document_ingest, "get_embedding", _fake_embedding)
+    monkeypatch.setattr(document_ingest, "get_batch_embeddings", lambda texts: [_fake_embedding(t) for t in texts])
+    monkeypatch.setattr(document_ingest, "store_many", lambda *a, **k: {"ok": False, "error": "store down"})
+    path = tmp_path / "doc.txt"
+    path.write_text("invoice " * 10)
+
+    job = document_ingest.IngestJob("u1", str(path), "doc.txt", "text", query="invoice")
+    job.run()
+
+    assert job.error == "store down"
+    with pytest.raises(RuntimeError):
+        job.future.result()
+    assert job.best_chunks() == [] and not path.exists()
+
+
+def test_shutdown_cancels_queued_jobs_and_removes_their_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(document_ingest.settings, "INGEST_WORKERS", 1)
+    monkeypatch.setattr(document_ingest, "_executor", None)
+    monkeypatch.setattr(document_ingest, "get_embedding", _fake_embedding)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_batch_embeddings(texts):
+        started.set()
+        release.wait(5)
+        return [_fake_embedding(t) for t in texts]
+
+    monkeypatch.setattr(document_ingest, "get_batch_embeddings", slow_batch_embeddings)
+    monkeypatch.setattr(document_ingest, "store_many", lambda user_id, texts, metadatas=None, embeddings=None:
+                        {"ok": True, "stored": len(texts), "skipped": 0})
+    paths = [tmp_path / f"upload-{i}.txt" for i in range(3)]
+    for p in paths:
+        p.write_text("invoice " * 10)
+
+    running, *queued = [document_ingest.submit("u1", str(p), p.name, "text") for p in paths]
+    assert started.wait(5)
+    document_ingest.shutdown()
+
+    for job, path in zip(queued, paths[1:]):
+        assert job.future.cancelled() and job.status()["done"] and not path.exists()
+    release.set()
+    assert running.future.result(5)["chunks"] == 1 and not paths[0].exists()
+    assert document_ingest._pending == set()
@@ -0,0 +1,65 @@
+from app.services import memory
+
+
+class _FakeFactsCache:
+    def __init__(self):
+        self.data = {}
+
+    def get_cached_facts(self, user_id):
+        return dict(self.data[user_id]) if user_id in self.data else None
+
+    def cache_facts(self, user_id, facts):
+        self.data[user_id] = dict(facts)
+
+    def cache_fact_if_loaded(self, user_id, key, value):
+        if user_id not in self.data:
+            return False
+        self.data[user_id][key] = value
+        return True
+
+    def invalidate_cached_facts(self, user_id):
+        self.data.pop(user_id, None)
+
+
+def test_facts_are_read_through_and_written_through(monkeypatch):
+    cache = _FakeFactsCache()
+    graph = {"u1": {"name": "Sam"}}
+    reads = []
+
+    def fake_fetch(user_id):
+        reads.append(user_id)
+        return dict(graph.get(user_id, {}))
+
+    def fake_save(user_id, key, value):
+        graph.setdefault(user_id, {})[key] = value
+        return True
+
+    monkeypatch.setattr(memory, "redis", cache)
+    monkeypatch.setattr(memory, "fetch_user_facts", fake_fetch)
+    monkeypatch.setattr(memory, "save_user_fact_neo4j", fake_save)
+
+    assert memory.get_all_user_facts("u1") == {"name": "Sam"}
+    assert memory.get_all_user_facts("u1") == {"name": "Sam"}
+    assert reads == ["u1"]
+
+    assert memory.save_user_fact("u1", "city", "Pune")
+    assert memory.get_all_user_facts("u1") == {"name": "Sam", "city": "Pune"}
+    assert reads == ["u1"]
+
+    # Users with no facts are cached as well, and never see other users' facts
+    assert memory.get_all_user_facts("u2") == {}
+    assert memory.get_all_user_facts("u2") == {}
+    assert reads == ["u1", "u2"]
+
+
+def test_failed_lookup_is_not_cached(monkeypatch):
+    cache = _FakeFactsCache()
+
+    def failing_fetch(user_id):
+        raise RuntimeError("neo4j down")
+
+    monkeypatch.setattr(memory, "redis", cache)
+    monkeypatch.setattr(memory, "fetch_user_facts", failing_fetch)
+
+    assert memory.get_all_user_facts("u1") == {}
+    assert cache.get_cached_facts("u1") is None
@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from app.services import fact_extraction
+
+
+def test_build_graph_rows_normalizes_and_dedupes():
+    extraction = {
+        "entities": [{"name": "Pune", "type": "place"}, {"name": "Rex", "type": "thing"}, {"name": "Python", "type": "thing"}],
+        "relationships": [
+            {"source": "user", "relation": "lives in", "target": "Pune"},
+            {"source": "User", "relation": "LIVES_IN", "target": " pune "},
+            {"source": "user", "relation": "owns dog", "target": "Rex"},
+        ],
+    }
+    rows = fact_extraction.build_graph_rows(7, extraction)
+
+    edges = [(r["source_key"], r["relation"], r["target_key"]) for r in rows if r["target_key"]]
+    assert edges == [("user", "LIVES_IN", "pune"), ("user", "OWNS_DOG", "rex")]
+    assert [r["source"] for r in rows if not r["target_key"]] == ["Python"]
+    assert all(r["user_id"] == "7" for r in rows)
+
+
+def test_cycle_batches_turns_and_only_advances_after_write(monkeypatch):
+    pending = [
+        {"id": i, "user_id": uid, "user_query": f"q{i}", "ai_response": "ok"}
+        for i, uid in [(1, 1), (2, 2), (3, 1), (4, 1), (5, 2)]
+    ]
+    calls, writes, checkpoints = [], [], []
+
+    def fake_extract(turns):
+        calls.append(len(turns))
+        if any("q5" in t for t in turns):
+            raise RuntimeError("LLM unavailable")
+        return {"entities": [{"name": "Pune"}], "relationships": []}
+
+    @contextmanager
+    def fake_lock():
+        yield True
+
+    monkeypatch.setattr(fact_extraction, "ai_services", SimpleNamespace(extract_facts_from_turns=fake_extract))
+    monkeypatch.setattr(fact_extraction, "merge_extracted_facts", lambda rows: writes.append(rows) or len(rows))
+    monkeypatch.setattr(fact_extraction, "fact_checkpoints", SimpleNamespace(
+        extraction_lock=fake_lock,
+        get_pending_turns=lambda limit: pending,
+        advance_checkpoint=lambda uid, last_id, n: checkpoints.append((uid, last_id, n)) or True,
+        record_failure=lambda uid: 1,
+    ))
+
+    cycle = fact_extraction.run_extraction_cycle(max_turns=100, turns_per_call=2)
+
+    # user 1: turns [1, 3] then [4]; user 2: turns [2, 5] fails and stays pending
+    assert calls == [2, 1, 2]
+    assert len(writes) == 2
+    assert checkpoints == [(1, 3, 2), (1, 4, 1)]
+    assert cycle["turns"] == 3 and cycle["errors"] == 1 and cycle["users"] == 2
+
+
+class _FakeCheckpoints:
+    """In-memory stand-in for app.db.fact_checkpoints, including the round-robin share-out."""
+
+    def __init__(self, history):
+        self.history = history
+        self.last = {}
+        self.failures = {}
+        self.dead = []
+
+    @contextmanager
+    def extraction_lock(self):
+        yield True
+
+    def get_pending_turns(self, limit):
+        rank, pending = {}, []
+        for row in sorted(self.history, key=lambda r: r["id"]):
+            if row["id"] > self.last.get(row["user_id"], 0):
+                rank[row["user_id"]] = rank.get(row["user_id"], 0) + 1
+                pending.append((rank[row["user_id"]], row["id"], row))
+        return [row for _, _, row in sorted(pending, key=lambda p: p[:2])][:limit]
+
+    def advance_checkpoint(self, uid, last_id, n):
+        self.last[uid] = max(self.last.get(uid, 0), last_id)
+        self.failures[uid] = 0
+        return True
+
+    def record_failure(self, uid):
+        self.failures[uid] = self.failures.get(uid, 0) + 1
+        return self.failures[uid]
+
+    def dead_letter(self, uid, first_id, last_id, turns, attempts, error):
+        self.dead.append((uid, first_id, last_id, attempts))
+        return self.advance_checkpoint(uid, last_id, 0)
+
+
+def test_chunk_failing_every_cycle_is_dead_lettered_without_starving_others(monkeypatch):
+    # User 1 has a long backlog whose first chunk always fails; user 2 chats later
+    history = [{"id": i, "user_id": 1, "user_query": f"q{i}", "ai_response": "ok"} for i in range(1, 11)]
+    history += [{"id": i, "user_id": 2, "user_query": f"q{i}", "ai_response": "ok"} for i in range(11, 14)]
+    checkpoints = _FakeCheckpoints(history)
+
+    def fake_extract(turns):
+        if any(t.startswith("User: q1\n") for t in turns):
+            raise ValueError("unparseable LLM output")
+        return {"entities": [], "relationships": []}
+
+    monkeypatch.setattr(fact_extraction.settings, "FACT_EXTRACTION_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(fact_extraction, "ai_services", SimpleNamespace(extract_facts_from_turns=fake_extract))
+    monkeypatch.setattr(fact_extraction, "merge_extracted_facts", lambda rows: len(rows))
+    monkeypatch.setattr(fact_extraction, "fact_checkpoints", checkpoints)
+
+    # The batch limit is below user 1's backlog, yet user 2 is served in the first cycle
+    first = fact_extraction.run_extraction_cycle(max_turns=6, turns_per_call=2)
+    assert checkpoints.last.get(2) == 13 and first["users"] == 2
+    assert checkpoints.last.get(1) is None and first["errors"] == 1
+
+    second = fact_extraction.run_extraction_cycle(max_turns=6, turns_per_call=2)
+    assert second["dead_lettered"] == 0 and checkpoints.failures[1] == 2
+
+    third = fact_extraction.run_extraction_cycle(max_turns=6, turns_per_call=2)
+    assert checkpoints.dead == [(1, 1, 2, 3)]
+    assert third["dead_lettered"] == 2 and third["turns"] > 0  # the rest of the batch went through
+    assert checkpoints.failures[1] == 0
+
+    while fact_extraction.run_extraction_cycle(max_turns=6, turns_per_call=2)["users"]:
+        pass
+    assert checkpoints.last == {1: 10, 2: 13} and len(checkpoints.dead) == 1
@@ -1,6 +1,6 @@
 import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 
 from app.main import app
 
@@ -11,12 +11,12 @@ async def test_greet_when_not_greeted(monkeypatch):
     async def fake_get_user_by_id(uid):
         return {"id": uid, "name": "Sampath"}
 
-    # Mock Redis client
-    fake_redis = MagicMock()
-    fake_redis.get.return_value = None
+    # Mock the Redis greeting flag: SET NX succeeds, so this is the first greeting today
+    async def fake_mark_greeted(uid):
+        return True
 
     monkeypatch.setattr('app.main.get_user_by_id', fake_get_user_by_id)
-    monkeypatch.setattr('app.main.get_redis_client', lambda: fake_redis)
+    monkeypatch.setattr('app.main.mark_greeted', fake_mark_greeted)
 
     # Call greet endpoint via TestClient
     from fastapi.testclient import TestClient
@@ -34,11 +34,11 @@ async def test_greet_when_already_greeted(monkeypatch):
     async def fake_get_user_by_id(uid):
         return {"id": uid, "name": "Sampath"}
 
-    fake_redis = MagicMock()
-    fake_redis.get.return_value = '1'
+    async def fake_mark_greeted(uid):
+        return False  # flag already set today
 
     monkeypatch.setattr('app.main.get_user_by_id', fake_get_user_by_id)
-    monkeypatch.setattr('app.main.get_redis_client', lambda: fake_redis)
+    monkeypatch.setattr('app.main.mark_greeted', fake_mark_greeted)
 
     from fastapi.testclient import TestClient
     client = TestClient(app)
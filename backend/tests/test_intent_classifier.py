@@ -0,0 +1,49 @@
+import re
+import zlib
+
+from app.services import intent_classifier
+from app.services.intent_classifier import IntentClassifier, refine_intent, task_from_paraphrase
+
+
+def _bag_of_words(texts):
+    # Deterministic stand-in for the sentence-transformer
+    vecs = []
+    for t in texts:
+        v = [0.0] * 64
+        for tok in re.findall(r"\w+", t.lower()):
+            v[zlib.crc32(tok.encode()) % 64] += 1.0
+        vecs.append(v)
+    return vecs
+
+
+PROTOS = {
+    "fetch_tasks": ["show me my to-do list", "what are my pending reminders"],
+    "create_task": ["remind me to call mom at 5pm", "don't let me forget to pay the bill"],
+    "general_chat": ["tell me a joke", "what is the capital of france"],
+}
+
+
+def test_nearest_prototype_with_threshold_and_margin():
+    clf = IntentClassifier(_bag_of_words, PROTOS)
+    assert clf.classify("show my pending to-do list", threshold=0.5, margin=0.05)[0] == "fetch_tasks"
+    intent, score = clf.classify("quantum chromodynamics lecture", threshold=0.5, margin=0.05)
+    assert intent is None and score < 0.5
+
+
+def test_refine_intent_fills_task_slots_and_skips_llm_when_unsure(monkeypatch):
+    clf = IntentClassifier(_bag_of_words, PROTOS)
+    monkeypatch.setattr(intent_classifier.settings, "INTENT_CLASSIFIER_THRESHOLD", 0.5, raising=False)
+    monkeypatch.setattr(intent_classifier.settings, "INTENT_CLASSIFIER_MARGIN", 0.05, raising=False)
+    monkeypatch.setattr(intent_classifier.settings, "INTENT_LLM_FALLBACK", False, raising=False)
+
+    result = refine_intent("don't let me forget to pay the rent", classifier=clf)
+    assert result["action"] == "create_task"
+    assert result["data"]["title"] == "pay the rent"
+
+    assert refine_intent("quantum chromodynamics lecture", classifier=clf) == {"action": "general_chat"}
+
+
+def test_task_from_paraphrase_extracts_time_before_stripping_lead_in():
+    result = task_from_paraphrase("Alert me in 30 minutes to check the oven")
+    assert result["data"]["title"] == "check the oven"
+    assert result["data"]["datetime"] is not None
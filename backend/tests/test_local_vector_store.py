@@ -0,0 +1,123 @@
+from app.db.local_vector_store import LocalVectorStore, match_filter
+
+
+def _item(item_id, values, user_id):
+    return {"id": item_id, "values": values, "metadata": {"user_id": user_id, "text": item_id}}
+
+
+def test_query_respects_user_filter():
+    store = LocalVectorStore(path=None, index_type="brute")
+    store.upsert([
+        _item("a-1", [1.0, 0.0, 0.0], "a"),
+        _item("b-1", [1.0, 0.01, 0.0], "b"),
+        _item("a-2", [0.0, 1.0, 0.0], "a"),
+    ])
+    res = store.query([1.0, 0.0, 0.0], top_k=2, filter={"user_id": {"$eq": "a"}})
+    ids = [m["id"] for m in res["matches"]]
+    assert ids == ["a-1", "a-2"]
+    assert res["matches"][0]["score"] > 0.99
+
+
+def test_delete_count_and_persistence(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path), index_type="brute")
+    store.upsert([_item("a-1", [1.0, 0.0], "a"), _item("a-2", [0.0, 1.0], "a")])
+    store.delete(["a-1"])
+    assert store.count() == 1
+    store.flush()
+
+    reloaded = LocalVectorStore(path=str(tmp_path), index_type="brute")
+    assert reloaded.count() == 1
+    assert reloaded.query([1.0, 0.0], top_k=5)["matches"][0]["id"] == "a-2"
+
+
+def test_match_filter_operators():
+    md = {"user_id": "u1", "stored_at": 100}
+    assert match_filter(md, {"user_id": "u1"})
+    assert match_filter(md, {"stored_at": {"$gte": 100, "$lt": 200}})
+    assert not match_filter(md, {"user_id": {"$in": ["u2", "u3"]}})
+    assert match_filter(md, {"$or": [{"user_id": "u2"}, {"stored_at": {"$gt": 50}}]})
+
+
+def test_dual_read_merges_namespace_and_shared_index(monkeypatch):
+    from app.db import vector_store
+
+    store = LocalVectorStore(path=None, index_type="brute")
+    monkeypatch.setattr(vector_store, "_store", store)
+    monkeypatch.setattr(vector_store.settings, "SEMANTIC_NAMESPACE_MODE", "dual")
+
+    store.upsert([_item("a-old", [1.0, 0.1], "a"), _item("b-old", [1.0, 0.0], "b")])
+    store.upsert([_item("a-new", [1.0, 0.0], "a"), _item("a-old", [1.0, 0.1], "a")], namespace=vector_store.user_namespace("a"))
+
+    ids = [m["id"] for m in vector_store.query_user_vectors("a", [1.0, 0.0], top_k=5)]
+    assert ids == ["a-new", "a-old"]
+
+    monkeypatch.setattr(vector_store.settings, "SEMANTIC_NAMESPACE_MODE", "shared")
+    ids = [m["id"] for m in vector_store.query_user_vectors("a", [1.0, 0.0], top_k=5)]
+    assert ids == ["a-old"]
+
+
+def test_hnsw_partition_matches_exact_search_through_deletes_and_reload(tmp_path):
+    import numpy as np
+    import pytest
+
+    from app.db import local_vector_store
+
+    if local_vector_store.hnswlib is None:
+        pytest.skip("hnswlib is not installed")
+
+    rng = np.random.default_rng(0)
+    rows = local_vector_store.BRUTE_FORCE_MAX_ROWS + 1000  # past the exact-scan cutoff and the initial capacity
+    vecs = rng.normal(size=(rows, 16)).astype(np.float32)
+    users = ["a", "b", "c"]
+    items = [_item(f"v{i}", vecs[i].tolist(), users[i % 3]) for i in range(rows)]
+    items.append(_item("rare-1", rng.normal(size=16).tolist(), "rare"))
+    items.append(_item("rare-2", rng.normal(size=16).tolist(), "rare"))
+
+    store = LocalVectorStore(path=str(tmp_path), index_type="hnsw")
+    store.upsert(items)
+    part = store._parts[""]
+    queries = rng.normal(size=(20, 16)).astype(np.float32)
+
+    def recall(store, flt, top_k=10):
+        part = store._parts[""]
+        hits = found = 0
+        for q in queries:
+            approx = [m["id"] for m in store.query(q.tolist(), top_k=top_k, filter=flt)["matches"]]
+            exact = [part.ids[r] for r, _ in part._exact(local_vector_store._normalize(q), top_k, flt)]
+            assert len(approx) == len(exact)
+            if flt:
+                assert all(m["metadata"]["user_id"] == "a" for m in store.query(q.tolist(), top_k=top_k, filter=flt)["matches"])
+            hits += len(set(approx) & set(exact))
+            found += len(exact)
+        return hits / found
+
+    flt = {"user_id": {"$eq": "a"}}
+    assert recall(store, flt) >= 0.9
+
+    deleted = [f"v{i}" for i in range(0, rows, 3)][:300]  # user "a" rows
+    store.delete(deleted)
+    assert store.count() == rows + 2 - 300
+    for q in queries[:5]:
+        ids = {m["id"] for m in store.query(q.tolist(), top_k=50, filter=flt)["matches"]}
+        assert not ids & set(deleted)
+    assert recall(store, flt) >= 0.9
+
+    # Re-upserting deleted ids makes them searchable again
+    store.upsert([items[i] for i in range(0, 30, 3)])
+    assert store.count() == rows + 2 - 300 + 10
+    top = store.query(vecs[0].tolist(), top_k=1, filter=flt)["matches"][0]
+    assert top["id"] == "v0" and top["score"] > 0.99
+
+    # A filter matching fewer rows than top_k falls back to the exact scan
+    rare = store.query(queries[0].tolist(), top_k=5, filter={"user_id": "rare"})["matches"]
+    assert sorted(m["id"] for m in rare) == ["rare-1", "rare-2"]
+
+    store.flush()
+    reloaded = LocalVectorStore(path=str(tmp_path), index_type="hnsw")
+    assert reloaded.count() == store.count()
+    assert reloaded._parts[""].index is not None
+    for q in queries[:5]:
+        before = [m["id"] for m in store.query(q.tolist(), top_k=10, filter=flt)["matches"]]
+        after = [m["id"] for m in reloaded.query(q.tolist(), top_k=10, filter=flt)["matches"]]
+        assert len(set(before) & set(after)) >= 9
+    assert part.index.get_max_elements() >= rows
@@ -0,0 +1,86 @@
+import io
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.testclient import TestClient
+
+from app.utils import logging_setup
+
+
+@pytest.fixture
+def log_stream():
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    stream = io.StringIO()
+    yield stream
+    logging_setup.shutdown_logging()
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+    logging.getLogger("tests.noisy").setLevel(logging.NOTSET)
+
+
+def _lines(stream):
+    logging_setup.shutdown_logging()  # flushes the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines_with_extra_fields_and_exceptions(log_stream):
+    logging_setup.configure_logging(level="INFO", levels="", fmt="json", sample_every=1, queue_size=100, stream=log_stream)
+    log = logging.getLogger("tests.app")
+    log.info("Chat saved %s", "ok", extra={"chat_id": "c1", "row_id": 7})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("failed")
+
+    saved, failed = _lines(log_stream)
+    assert saved["msg"] == "Chat saved ok" and saved["level"] == "INFO" and saved["logger"] == "tests.app"
+    assert saved["chat_id"] == "c1" and saved["row_id"] == 7
+    assert "request_id" not in saved
+    assert "ValueError: boom" in failed["exc"]
+
+
+def test_per_logger_levels_and_debug_sampling(log_stream):
+    logging_setup.configure_logging(
+        level="INFO", levels="tests.noisy=DEBUG", fmt="json", sample_every=5, queue_size=100, stream=log_stream
+    )
+    for i in range(12):
+        logging.getLogger("tests.noisy").debug("tick %d", i)
+    logging.getLogger("tests.quiet").debug("hidden")
+    logging.getLogger("tests.noisy").warning("kept")
+
+    lines = _lines(log_stream)
+    assert [l["msg"] for l in lines] == ["tick 0", "tick 5", "tick 10", "kept"]
+    assert lines[0]["sample_every"] == 5 and "sample_every" not in lines[-1]
+
+
+def test_full_queue_drops_instead_of_blocking(log_stream):
+    handler = logging_setup.configure_logging(level="INFO", levels="", fmt="json", sample_every=1, queue_size=2, stream=log_stream)
+    logging_setup._listener.stop()  # nothing drains the queue
+    for i in range(5):
+        logging.getLogger("tests.app").info("line %d", i)
+    assert handler.dropped == 3
+    logging_setup._listener.start()
+
+
+def test_request_id_reaches_threadpool_logs(log_stream):
+    logging_setup.configure_logging(level="INFO", levels="", fmt="json", sample_every=1, queue_size=100, stream=log_stream)
+    app = FastAPI()
+    app.add_middleware(logging_setup.RequestIdMiddleware)
+
+    @app.get("/work")
+    async def work():
+        await run_in_threadpool(logging.getLogger("tests.worker").info, "in worker")
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        given = client.get("/work", headers={"X-Request-ID": "abc-123"})
+        generated = client.get("/work", headers={"X-Request-ID": "bad id\n"})
+
+    assert given.headers["x-request-id"] == "abc-123"
+    assert len(generated.headers["x-request-id"]) == 32
+    worker_lines = [l for l in _lines(log_stream) if l["logger"] == "tests.worker"]
+    assert [l["request_id"] for l in worker_lines] == ["abc-123", generated.headers["x-request-id"]]
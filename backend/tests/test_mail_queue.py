@@ -0,0 +1,109 @@
+import json
+import smtplib
+
+from app.services import mail_queue
+
+
+class _FakeRedis:
+    """Just enough of redis-py for mail_queue: strings, lists, hashes, pipelines."""
+
+    def __init__(self):
+        self.kv, self.lists, self.hashes = {}, {}, {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.kv:
+            return None
+        self.kv[key] = value
+        return True
+
+    def delete(self, key):
+        self.kv.pop(key, None)
+
+    def lpush(self, key, *values):
+        self.lists.setdefault(key, [])[:0] = reversed(values)
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start:end + 1]
+
+    def hincrby(self, key, field, n):
+        h = self.hashes.setdefault(key, {})
+        h[field] = h.get(field, 0) + n
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client, self.calls = client, []
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: self.calls.append((name, a, kw))
+
+    def execute(self):
+        return [getattr(self.client, name)(*a, **kw) for name, a, kw in self.calls]
+
+
+class _FakeMailer:
+    def __init__(self, outcomes):
+        self.outcomes, self.sent = outcomes, []
+
+    def send_many(self, messages):
+        self.sent.extend(to for to, _, _ in messages)
+        return [self.outcomes.get(to) for to, _, _ in messages]
+
+
+def _setup(monkeypatch):
+    client, requeued = _FakeRedis(), []
+    monkeypatch.setattr(mail_queue, "_redis", lambda: client)
+    monkeypatch.setattr(mail_queue, "enqueue_emails", lambda msgs, attempt, countdown: requeued.append((msgs, attempt, countdown)) or [None] * len(msgs))
+    for name, value in [("MAIL_MAX_ATTEMPTS", 3), ("MAIL_RETRY_BACKOFF", 30), ("MAIL_IDEMPOTENCY_TTL", 3600)]:
+        monkeypatch.setattr(mail_queue.settings, name, value, raising=False)
+    return client, requeued
+
+
+def test_sent_keys_are_never_sent_twice(monkeypatch):
+    client, _ = _setup(monkeypatch)
+    mailer = _FakeMailer({})
+    msg = mail_queue.make_message("a@b.c", "Welcome", "hi", key="welcome:a@b.c")
+
+    first = mail_queue.deliver_batch([msg], mailer=mailer)
+    again = mail_queue.deliver_batch([msg], mailer=mailer)  # redelivered job
+
+    assert first["sent"] == 1 and again == {"sent": 0, "duplicates": 1, "retried": 0, "dead": 0}
+    assert mailer.sent == ["a@b.c"]
+    assert client.hashes[mail_queue.STATS_KEY] == {"sent": 1, "duplicates": 1}
+
+
+def test_transient_failures_retry_with_backoff_then_dead_letter(monkeypatch):
+    client, requeued = _setup(monkeypatch)
+    busy = smtplib.SMTPResponseException(451, b"try later")
+    gone = smtplib.SMTPRecipientsRefused({"x@y.z": (550, b"no such user")})
+    mailer = _FakeMailer({"busy@b.c": busy, "x@y.z": gone})
+    msgs = [mail_queue.make_message(to, "s", "b", key=to) for to in ("busy@b.c", "x@y.z")]
+
+    counts = mail_queue.deliver_batch(msgs, attempt=2, mailer=mailer)
+
+    assert counts == {"sent": 0, "duplicates": 0, "retried": 1, "dead": 1}
+    assert requeued == [([msgs[0]], 3, 60)]
+    assert "busy@b.c" not in {k.split(":", 2)[2] for k in client.kv}  # claim released for the retry
+    assert len(client.lists[mail_queue.DEAD_LETTER_KEY]) == 1
+
+    # Last attempt: a transient failure is dead-lettered too
+    assert mail_queue.deliver_batch([msgs[0]], attempt=3, mailer=mailer)["dead"] == 1
+    assert len(requeued) == 1
+
+
+def test_retries_that_cannot_be_re_enqueued_are_dead_lettered(monkeypatch):
+    client, _ = _setup(monkeypatch)
+    broker_down = ConnectionError("broker unavailable")
+    monkeypatch.setattr(mail_queue, "enqueue_emails", lambda msgs, attempt, countdown: [broker_down] * len(msgs))
+    mailer = _FakeMailer({"busy@b.c": smtplib.SMTPResponseException(451, b"try later")})
+    msgs = [mail_queue.make_message(to, "s", "b", key=to) for to in ("busy@b.c", "ok@b.c")]
+
+    counts = mail_queue.deliver_batch(msgs, mailer=mailer)
+
+    assert counts == {"sent": 1, "duplicates": 0, "retried": 0, "dead": 1}
+    [dead] = [json.loads(d) for d in client.lists[mail_queue.DEAD_LETTER_KEY]]
+    assert dead["message"] == msgs[0] and dead["error"] == "ConnectionError: broker unavailable"
+    assert client.hashes[mail_queue.STATS_KEY] == {"sent": 1, "dead": 1}
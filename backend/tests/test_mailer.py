@@ -0,0 +1,109 @@
+import smtplib
+import socket
+
+import pytest
+
+aiosmtpd = pytest.importorskip("aiosmtpd.controller")
+
+from app.utils.mailer import Mailer, SMTPPool
+
+
+class _Sink:
+    def __init__(self, replies=None):
+        self.replies = replies or {}  # recipient -> list of replies to give before accepting
+        self.delivered = []
+
+    async def handle_DATA(self, server, session, envelope):
+        rcpt = envelope.rcpt_tos[0]
+        pending = self.replies.get(rcpt)
+        if pending:
+            return pending.pop(0)
+        self.delivered.append(rcpt)
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handlers = []
+
+    def start(handler):
+        controller = aiosmtpd.Controller(handler, hostname="127.0.0.1", port=_free_port())
+        controller.start()
+        handlers.append(controller)
+        return controller
+
+    yield start
+    for c in handlers:
+        c.stop()
+
+
+def _mailer(controller, size=4):
+    pool = SMTPPool(controller.hostname, controller.port, user=None, password=None, size=size, starttls=False)
+    return Mailer(pool, sender="assistant@example.com", backoff=0.0)
+
+
+def test_send_many_reuses_a_bounded_pool(smtp_server):
+    sink = _Sink()
+    mailer = _mailer(smtp_server(sink), size=4)
+
+    results = mailer.send_many((f"user{i}@example.com", "Task Reminder: x", "body") for i in range(40))
+
+    assert results == [None] * 40
+    assert sorted(sink.delivered) == sorted(f"user{i}@example.com" for i in range(40))
+    assert mailer.pool.connects <= 4
+    mailer.close()
+
+
+def test_transient_rejections_are_retried_and_permanent_ones_are_not(smtp_server):
+    sink = _Sink({
+        "later@example.com": ["451 4.3.0 Try again later"],
+        "gone@example.com": ["550 5.1.1 No such user", "550 5.1.1 No such user"],
+    })
+    mailer = _mailer(smtp_server(sink))
+
+    ok, gone = mailer.send_many([("later@example.com", "s", "b"), ("gone@example.com", "s", "b")])
+
+    assert ok is None and sink.delivered == ["later@example.com"]
+    assert getattr(gone, "smtp_code", None) == 550
+    assert sink.replies["gone@example.com"] == ["550 5.1.1 No such user"]  # tried once
+    mailer.close()
+
+
+class _RefusingPool(SMTPPool):
+    """Raises the queued errors from the next connects, then connects for real."""
+
+    def __init__(self, *args, refusals, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.refusals = list(refusals)
+
+    def _connect(self):
+        if self.refusals:
+            raise self.refusals.pop(0)
+        return super()._connect()
+
+
+def test_connect_failures_are_retried_like_send_failures(smtp_server):
+    controller = smtp_server(_Sink())
+
+    def mailer(*refusals):
+        pool = _RefusingPool(controller.hostname, controller.port, user=None, password=None, size=2,
+                             starttls=False, refusals=refusals)
+        return Mailer(pool, sender="assistant@example.com", backoff=0.0)
+
+    busy = mailer(smtplib.SMTPConnectError(421, b"4.3.2 Too busy"), socket.timeout("timed out"))
+    busy.send("later@example.com", "s", "b")
+    assert busy.pool.refusals == [] and busy.pool.connects == 1
+    assert busy.pool._slots._value == 2  # failed connects gave their slot back
+    busy.close()
+
+    refused = mailer(smtplib.SMTPConnectError(554, b"5.7.1 Go away"), smtplib.SMTPConnectError(421, b"busy"))
+    with pytest.raises(smtplib.SMTPConnectError):
+        refused.send("never@example.com", "s", "b")
+    assert len(refused.pool.refusals) == 1  # permanent: not retried
+    assert refused.pool._slots._value == 2
@@ -0,0 +1,61 @@
+import time
+
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.utils import metrics
+
+
+@metrics.timed("test.backend")
+def _slow_backend_call():
+    time.sleep(0.002)
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(metrics.ServerTimingMiddleware)
+
+    @app.get("/work/{item}")
+    async def work(item: str):
+        with metrics.span("test.stage"):
+            await run_in_threadpool(_slow_backend_call)  # timed in a worker thread
+            await run_in_threadpool(_slow_backend_call)
+        return {"ok": True}
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        body, content_type = metrics.metrics_payload()
+        return Response(content=body, media_type=content_type)
+
+    return app
+
+
+def _sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_server_timing_header_and_histograms():
+    client = TestClient(_app())
+    before = _sample("assistant_stage_seconds_count", {"stage": "test.backend"})
+
+    resp = client.get("/work/abc")
+    assert resp.status_code == 200
+    entries = {e.split(";")[0]: e for e in resp.headers["server-timing"].split(", ")}
+    assert set(entries) == {"test.stage", "test.backend", "total"}
+    assert 'desc="2 calls"' in entries["test.backend"]
+    assert float(entries["test.backend"].split("dur=")[1].split(";")[0]) >= 4.0
+
+    assert _sample("assistant_stage_seconds_count", {"stage": "test.backend"}) == before + 2
+    # Requests are labelled by route template, not by raw path
+    assert _sample("assistant_request_seconds_count", {"method": "GET", "route": "/work/{item}", "status": "200"}) >= 1
+
+    body = client.get("/metrics").text
+    assert 'assistant_stage_seconds_bucket{le="0.005",stage="test.stage"}' in body
+
+
+def test_spans_outside_a_request_only_feed_the_histogram():
+    with metrics.span("test.offline"):
+        pass
+    assert _sample("assistant_stage_seconds_count", {"stage": "test.offline"}) >= 1
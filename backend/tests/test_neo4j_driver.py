@@ -0,0 +1,22 @@
+from unittest.mock import MagicMock
+
+from app.db import neo4j_utils
+
+
+def test_driver_is_shared_and_reads_use_managed_transactions(monkeypatch):
+    session = MagicMock()
+    session.execute_read.return_value = {"name": "Sam"}
+    driver = MagicMock()
+    driver.session.return_value.__enter__.return_value = session
+    factory = MagicMock(return_value=driver)
+
+    monkeypatch.setattr(neo4j_utils.GraphDatabase, "driver", factory)
+    monkeypatch.setattr(neo4j_utils, "_driver", None)
+
+    assert neo4j_utils.get_all_facts_for_user("u1") == {"name": "Sam"}
+    assert neo4j_utils.get_all_facts_for_user("u1") == {"name": "Sam"}
+
+    factory.assert_called_once()
+    assert factory.call_args.kwargs["max_connection_pool_size"] > 0
+    assert session.execute_read.call_count == 2
+    driver.close.assert_not_called()
@@ -0,0 +1,36 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from app.services import nlu
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "nlu_golden.json")
+
+with open(GOLDEN_PATH, encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    fixed = datetime.fromisoformat(GOLDEN["clock"])
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return fixed.astimezone(tz) if tz is not None else fixed.replace(tzinfo=None)
+
+    monkeypatch.setattr(nlu, "datetime", FrozenDatetime)
+
+
+@pytest.mark.parametrize("case", GOLDEN["cases"], ids=lambda c: c["message"].strip()[:40])
+def test_matches_golden_corpus(frozen_clock, case):
+    assert nlu.get_structured_intent(case["message"]) == case["expected"]
+
+
+def test_keyword_set_must_be_prefix_free():
+    rule = nlu.IntentRule("x", ("open",), None, lambda m: {"action": "x"})
+    other = nlu.IntentRule("y", ("open maps",), None, lambda m: {"action": "y"})
+    with pytest.raises(ValueError):
+        nlu.IntentEngine([rule, other])
@@ -0,0 +1,31 @@
+from app.utils import passwords
+
+
+def _use_params(monkeypatch, time_cost, memory_cost):
+    monkeypatch.setattr(passwords.settings, "ARGON2_TIME_COST", time_cost, raising=False)
+    monkeypatch.setattr(passwords.settings, "ARGON2_MEMORY_COST", memory_cost, raising=False)
+    monkeypatch.setattr(passwords.settings, "ARGON2_PARALLELISM", 1, raising=False)
+    passwords.get_context.cache_clear()
+
+
+def test_rehash_only_when_parameters_change(monkeypatch):
+    _use_params(monkeypatch, 1, 1024)
+    stored = passwords.hash_password("hunter2")
+    assert "m=1024,t=1,p=1" in stored
+    assert passwords.verify_and_update("hunter2", stored) == (True, None)
+    assert passwords.verify_and_update("wrong", stored) == (False, None)
+
+    _use_params(monkeypatch, 2, 2048)
+    valid, new_hash = passwords.verify_and_update("hunter2", stored)
+    assert valid and "m=2048,t=2,p=1" in new_hash
+    assert passwords.verify_and_update("wrong", stored) == (False, None)  # never re-hash a failed login
+    passwords.get_context.cache_clear()
+
+
+def test_legacy_bcrypt_hashes_upgrade_to_argon2(monkeypatch):
+    _use_params(monkeypatch, 1, 1024)
+    legacy = passwords.get_context().handler("bcrypt").using(rounds=4).hash("hunter2")
+    valid, new_hash = passwords.verify_and_update("hunter2", legacy)
+    assert valid and new_hash.startswith("$argon2id$")
+    assert passwords.verify_and_update("hunter2", "not-a-hash") == (False, None)
+    passwords.get_context.cache_clear()
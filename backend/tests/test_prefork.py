@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import urllib.request
+
+import pytest
+
+from app import prefork
+
+
+def test_worker_and_torch_thread_counts(monkeypatch):
+    monkeypatch.setattr(prefork, "usable_cpus", lambda: 8)
+    monkeypatch.setattr(prefork.settings, "WEB_CONCURRENCY", 0)
+    monkeypatch.setattr(prefork.settings, "WORKER_TORCH_THREADS", 0)
+
+    assert prefork.worker_count() == 8
+    assert prefork.worker_count(3) == 3
+    assert prefork.torch_threads_per_worker(4) == 2
+    assert prefork.torch_threads_per_worker(16) == 1
+    assert prefork.torch_threads_per_worker(4, requested=3) == 3
+
+
+def test_prepare_metrics_dir_clears_stale_files(monkeypatch, tmp_path):
+    (tmp_path / "histogram_123.db").write_bytes(b"old")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert prefork.prepare_metrics_dir() is None
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+    created = prefork.prepare_metrics_dir()
+    try:
+        assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == created and os.path.isdir(created)
+    finally:
+        os.rmdir(created)
+
+
+async def _pid_app(scope, receive, send):
+    body = str(os.getpid()).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _wait_for(predicate, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_master_restarts_dead_workers_and_stops_them_on_sigterm(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    def after_fork():
+        (tmp_path / str(os.getpid())).touch()  # runs in each worker
+
+    master = prefork.Master(lambda: _pid_app, 2, "127.0.0.1", port, after_fork=after_fork, graceful_timeout=5,
+                            uvicorn_options={"lifespan": "off", "access_log": False})
+    proc = multiprocessing.get_context("fork").Process(target=lambda: os._exit(master.run()))
+    proc.start()
+
+    def workers():
+        return {int(p.name) for p in tmp_path.iterdir()}
+
+    def get():
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2) as resp:
+            return int(resp.read())
+
+    try:
+        assert _wait_for(lambda: len(workers()) == 2)
+        assert _wait_for(lambda: _responds(get))
+        first = workers()
+        assert get() in first
+
+        victim = min(first)
+        os.kill(victim, signal.SIGKILL)
+        assert _wait_for(lambda: len(workers()) == 3)  # a replacement was forked
+        replacement = (workers() - first).pop()
+        assert _wait_for(lambda: _responds(get))
+    finally:
+        proc.terminate()  # SIGTERM to the master
+        proc.join(15)
+
+    assert proc.exitcode == 0
+    for pid in workers():
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+    assert replacement != victim
+
+
+def _responds(get):
+    try:
+        get()
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.testclient import TestClient
+
+from app.utils import profiler
+
+
+def _busy_backend_call(seconds=0.15):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(500))
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(profiler.ProfileRequestsMiddleware)
+
+    @app.post("/chat/")
+    async def chat():
+        await run_in_threadpool(_busy_backend_call)  # sampled in the worker thread
+        return {"ok": True}
+
+    @app.get("/other")
+    async def other():
+        await run_in_threadpool(_busy_backend_call)
+        return {"ok": True}
+
+    return app
+
+
+def test_samples_threadpool_work_of_profiled_requests():
+    session = profiler.start_session(interval=0.002, max_requests=1)
+    try:
+        with TestClient(_app()) as client:
+            assert client.post("/chat/").status_code == 200
+        assert session.done.is_set()
+    finally:
+        profiler.stop_session(session)
+
+    assert session.requests_finished == 1
+    assert session.samples > 0
+    worker_stacks = [s for s in session.stacks if s.startswith("AnyIO worker thread;")]
+    assert any(s.endswith("test_profiler.py:_busy_backend_call") for s in worker_stacks)
+    line = session.collapsed().splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_no_samples_without_profiled_request_in_flight():
+    session = profiler.start_session(interval=0.002, max_requests=0)
+    try:
+        with TestClient(_app()) as client:
+            assert client.get("/other").status_code == 200
+        time.sleep(0.02)
+    finally:
+        profiler.stop_session(session)
+
+    assert session.requests_started == 0
+    assert session.samples == 0
+    assert session.collapsed() == "\n"
+
+
+def test_one_session_at_a_time():
+    session = profiler.start_session(interval=0.01, max_requests=0)
+    try:
+        with pytest.raises(RuntimeError):
+            profiler.start_session(interval=0.01, max_requests=0)
+    finally:
+        profiler.stop_session(session)
+    profiler.stop_session(profiler.start_session(interval=0.01, max_requests=0))
+
+
+def test_idle_event_loop_and_workers_are_skipped():
+    async def run():
+        session = profiler.ProfileSession(interval=0.002)
+        await run_in_threadpool(lambda: None)  # leaves an idle worker thread behind
+        await asyncio.sleep(0.01)
+        session.request_started()
+        session.start()
+        await asyncio.sleep(0.05)  # event loop sits in select()
+        session.request_finished()
+        session.stop()
+        return session
+
+    session = asyncio.run(run())
+    assert session.samples > 0
+    assert not any(s.startswith("AnyIO worker thread;") for s in session.stacks)
+    assert not any(s.endswith("selectors.py:select") for s in session.stacks)
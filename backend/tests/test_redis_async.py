@@ -0,0 +1,64 @@
+import asyncio
+
+from app.db import redis_utils
+
+
+class _FakeAsyncRedis:
+    """Records round trips: each awaited command or pipeline execute is one."""
+
+    def __init__(self):
+        self.kv, self.lists, self.round_trips = {}, {}, 0
+
+    async def set(self, key, value, nx=False, ex=None):
+        self.round_trips += 1
+        if nx and key in self.kv:
+            return None
+        self.kv[key] = value
+        return True
+
+    async def lrange(self, key, start, end):
+        self.round_trips += 1
+        return self.lists.get(key, [])[start:end + 1]
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client, self.calls = client, []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def lpush(self, key, value):
+        self.calls.append(lambda: self.client.lists.setdefault(key, []).insert(0, value))
+
+    def ltrim(self, key, start, end):
+        self.calls.append(lambda: self.client.lists.__setitem__(key, self.client.lists[key][start:end + 1]))
+
+    async def execute(self):
+        self.client.round_trips += 1
+        return [call() for call in self.calls]
+
+
+def test_chat_push_and_greeting_flag_are_one_round_trip_each(monkeypatch):
+    fake = _FakeAsyncRedis()
+    monkeypatch.setattr(redis_utils, "get_async_client", lambda: fake)
+
+    async def scenario():
+        for i in range(12):
+            await redis_utils.save_chat_redis_async(1, f"q{i}", "a", "c1")
+        assert fake.round_trips == 12
+        chats = await redis_utils.get_last_chats_async(1)
+        assert len(chats) == redis_utils.LAST_CHATS_KEPT and chats[0]["user"] == "q11"
+
+        assert await redis_utils.mark_greeted(1) is True
+        assert await redis_utils.mark_greeted(1) is False
+        assert await redis_utils.mark_greeted(2) is True
+        assert fake.round_trips == 16
+
+    asyncio.run(scenario())
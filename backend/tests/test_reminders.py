@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.services import reminders
+
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class _FakeConn:
+    def __init__(self, cur):
+        self.cur = cur
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _fake_celery(sent):
+    return SimpleNamespace(send_task=lambda name, **kw: sent.append((name, kw)))
+
+
+def test_schedule_reminder_enqueues_eta_job_only_within_horizon(monkeypatch):
+    sent, cur = [], _FakeCursor([])
+    monkeypatch.setattr(reminders, "_celery", lambda: _fake_celery(sent))
+    monkeypatch.setattr(reminders, "get_connection", lambda: _FakeConn(cur))
+    monkeypatch.setattr(reminders.settings, "REMINDER_ETA_HORIZON", 1800, raising=False)
+
+    soon = (reminders.now_ist() + timedelta(minutes=5)).replace(microsecond=0)
+    assert reminders.schedule_reminder(42, soon.strftime("%Y-%m-%d %H:%M:%S")) is True
+    name, kw = sent[0]
+    assert name == reminders.SEND_REMINDER_TASK and kw["args"] == [42]
+    assert kw["eta"].replace(tzinfo=None) == soon and kw["eta"].utcoffset() == timedelta(hours=5, minutes=30)
+    assert kw["task_id"] == reminders.reminder_job_id(42, soon)
+    assert cur.executed[0][1] == ([42], [soon])
+
+    later = reminders.now_ist() + timedelta(days=2)
+    assert reminders.schedule_reminder(43, later) is False
+    assert len(sent) == 1
+
+
+def test_reconcile_schedules_horizon_and_counts_overdue(monkeypatch):
+    now = datetime(2025, 1, 15, 10, 0)
+    rows = [{"id": 2, "datetime": now + timedelta(minutes=20)}]
+    sent, cur = [], _FakeCursor(rows)
+    cur.fetchone = lambda: {"overdue": 450}
+    monkeypatch.setattr(reminders, "_celery", lambda: _fake_celery(sent))
+    monkeypatch.setattr(reminders, "get_connection", lambda: _FakeConn(cur))
+    for name, value in [("REMINDER_ETA_HORIZON", 1800), ("REMINDER_GRACE_SECONDS", 120),
+                        ("REMINDER_DISPATCH_BATCH", 200), ("REMINDER_DISPATCH_FANOUT", 4)]:
+        monkeypatch.setattr(reminders.settings, name, value, raising=False)
+
+    result = reminders.reconcile_reminders(now=now)
+
+    assert [kw["args"] for _, kw in sent] == [[2]]
+    assert result == {"enqueued": 1, "overdue": 450, "errors": 0}
+    assert cur.executed[0][1][:2] == (now - timedelta(minutes=2), now + timedelta(minutes=30))
+    assert reminders.dispatchers_needed(450) == 3
+    assert reminders.dispatchers_needed(10_000) == 4
+
+
+def test_dispatch_claims_batch_with_owner_and_marks_sent_in_bulk(monkeypatch):
+    due = reminders.now_ist() - timedelta(seconds=3)
+    claimed = [
+        {"id": 7, "user_id": 1, "title": "Call mom", "notes": "", "datetime": due, "email": "a@b.c", "name": "Sam", "reminder_digest": False},
+        {"id": 8, "user_id": 2, "title": "Pay rent", "notes": "", "datetime": due, "email": "bad", "name": None, "reminder_digest": False},
+        {"id": 9, "user_id": 3, "title": "Gym", "notes": "", "datetime": due, "email": "d@e.f", "name": None, "reminder_digest": False},
+    ]
+    cur, outbox = _FakeCursor(claimed), []
+    monkeypatch.setattr(reminders, "get_connection", lambda: _FakeConn(cur))
+
+    def send_many(messages):
+        outbox.extend((m["to"], m["subject"], m["key"], m["due"]) for m in messages if m["to"] != "bad")
+        return [RuntimeError("broker down") if m["to"] == "bad" else None for m in messages]
+
+    result = reminders.dispatch_due(send_many, limit=50)
+
+    select, update = cur.executed
+    assert "JOIN users" in select[0] and "FOR UPDATE OF t SKIP LOCKED" in select[0]
+    assert select[1][-1] == 50
+    assert update[1] == ([7, 9],)  # the failed send stays pending for a retry
+    assert [o[:2] for o in outbox] == [("a@b.c", "Task Reminder: Call mom"), ("d@e.f", "Task Reminder: Gym")]
+    assert outbox[0][2] == reminders.reminder_job_id(7, due) and outbox[0][3] == [due.isoformat()]
+    assert result == [7, 9]
+
+
+def test_digest_users_get_one_email_covering_tasks_due_together(monkeypatch):
+    now = reminders.now_ist()
+    sam = {"user_id": 1, "email": "a@b.c", "name": "Sam", "notes": "", "reminder_digest": True}
+    due = [{**sam, "id": 7, "title": "Call mom", "datetime": now - timedelta(seconds=2)},
+           {"id": 8, "user_id": 2, "title": "Gym", "notes": "", "datetime": now, "email": "d@e.f", "name": None, "reminder_digest": False}]
+    companions = [{**sam, "id": 11, "title": "Pay rent", "datetime": now + timedelta(minutes=10)}]
+    cur = _FakeCursor(None)
+    results = iter([due, companions])
+    cur.fetchall = lambda: next(results)
+    outbox = []
+    monkeypatch.setattr(reminders, "get_connection", lambda: _FakeConn(cur))
+    monkeypatch.setattr(reminders.settings, "REMINDER_DIGEST_WINDOW", 900, raising=False)
+
+    reminders.dispatch_due(lambda msgs: outbox.extend(msgs) or [None] * len(msgs), now=now)
+
+    companion_query = cur.executed[1]
+    assert companion_query[1] == ([1], now + timedelta(seconds=900), [7, 8])
+    assert [(m["to"], m["subject"]) for m in outbox] == [("d@e.f", "Task Reminder: Gym"), ("a@b.c", "Task Reminders: 2 tasks due")]
+    assert "Call mom" in outbox[1]["body"] and "Pay rent" in outbox[1]["body"]
+    assert outbox[1]["key"] == "digest-1-7-11" and len(outbox[1]["due"]) == 1  # only the task already due
+    assert sorted(cur.executed[2][1][0]) == [7, 8, 11]
+    assert cur.executed[3][1][:2] == (1, [7, 11])  # reminder_digests row
+
+
+def test_deliver_is_a_single_task_dispatch(monkeypatch):
+    calls = []
+    monkeypatch.setattr(reminders, "dispatch_due", lambda send, limit, task_ids: calls.append((limit, task_ids)) or [])
+    assert reminders.deliver(7, print) is False
+    assert calls == [(1, [7])]
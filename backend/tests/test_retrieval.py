@@ -0,0 +1,41 @@
+from app.services.retrieval import prune_matches
+
+
+def _m(mid, score, text, values=None):
+    m = {"id": mid, "score": score, "metadata": {"text": text}}
+    if values is not None:
+        m["values"] = values
+    return m
+
+
+def test_threshold_and_exact_duplicates_are_dropped():
+    matches = [
+        _m("a", 0.9, "I like hiking"),
+        _m("b", 0.88, "i like   HIKING"),
+        _m("c", 0.2, "unrelated chatter"),
+    ]
+    chosen, stats = prune_matches(matches, max_results=5, min_score=0.3, relative_cutoff=0.0, max_tokens=1000)
+    assert [m["id"] for m in chosen] == ["a"]
+    assert stats["below_threshold"] == 1
+    assert stats["duplicates"] == 1
+    assert stats["tokens_saved"] > 0
+
+
+def test_mmr_prefers_diverse_match_over_near_duplicate():
+    matches = [
+        _m("a", 0.90, "my dog is called Rex", [1.0, 0.0]),
+        _m("b", 0.89, "my dog's name is Rex", [0.99, 0.05]),
+        _m("c", 0.85, "I work as a nurse", [0.0, 1.0]),
+    ]
+    chosen, _ = prune_matches(matches, max_results=2, min_score=0.0, mmr_lambda=0.5, relative_cutoff=0.0, max_tokens=1000)
+    assert [m["id"] for m in chosen] == ["a", "c"]
+
+
+def test_relative_cutoff_and_token_budget_stop_early():
+    matches = [_m("a", 0.9, "x" * 40), _m("b", 0.85, "y" * 40), _m("c", 0.4, "z" * 40)]
+    chosen, _ = prune_matches(matches, max_results=5, min_score=0.0, mmr_lambda=1.0, relative_cutoff=0.75, max_tokens=1000)
+    assert [m["id"] for m in chosen] == ["a", "b"]
+
+    chosen, stats = prune_matches(matches, max_results=5, min_score=0.0, mmr_lambda=1.0, relative_cutoff=0.0, max_tokens=15)
+    assert [m["id"] for m in chosen] == ["a"]
+    assert stats["tokens_selected"] == 10
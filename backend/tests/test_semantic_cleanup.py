@@ -0,0 +1,30 @@
+from app.db.local_vector_store import LocalVectorStore
+from app.tools import semantic_cleanup
+
+
+def _rows(n):
+    return [{"id": f"v{i}", "namespace": "user-1"} for i in range(n)]
+
+
+def test_cleanup_stops_when_the_ledger_delete_fails(monkeypatch):
+    calls = []
+    monkeypatch.setattr(semantic_cleanup, "get_vector_store", lambda: LocalVectorStore(path=None, index_type="brute"))
+    monkeypatch.setattr(semantic_cleanup.vector_ledger, "get_expired", lambda cutoff, limit: calls.append(limit) or _rows(limit))
+    monkeypatch.setattr(semantic_cleanup.vector_ledger, "delete_entries", lambda ids: 0)  # swallowed DB error
+
+    assert semantic_cleanup.cleanup_old_vectors(retention_days=1, batch_size=3) == 0
+    assert len(calls) == 1
+
+
+def test_cleanup_deletes_batches_until_the_ledger_is_drained(monkeypatch):
+    pending = _rows(7)
+    monkeypatch.setattr(semantic_cleanup, "get_vector_store", lambda: LocalVectorStore(path=None, index_type="brute"))
+    monkeypatch.setattr(semantic_cleanup.vector_ledger, "get_expired", lambda cutoff, limit: pending[:limit])
+
+    def delete_entries(ids):
+        del pending[:len(ids)]
+        return len(ids)
+
+    monkeypatch.setattr(semantic_cleanup.vector_ledger, "delete_entries", delete_entries)
+    assert semantic_cleanup.cleanup_old_vectors(retention_days=1, batch_size=3) == 7
+    assert pending == []
@@ -0,0 +1,84 @@
+from collections import Counter
+
+from app.db.local_vector_store import LocalVectorStore
+from app.db import vector_store
+from app.services import semantic_memory
+
+
+def _fake_embedding(text):
+    # "hello" and "hello!" embed almost identically; "tasks" is orthogonal
+    return {"hello": [1.0, 0.0], "hello!": [0.999, 0.01], "tasks": [0.0, 1.0]}[text]
+
+
+class _FakeLedger:
+    def __init__(self):
+        self.rows = {}
+        self.hits = Counter()
+
+    def record_vectors(self, rows, namespace=None, skip_existing=False):
+        for r in rows:
+            self.rows[r["id"]] = r
+        return True
+
+    def bump_hits(self, ids, seen_at):
+        self.hits.update(ids)
+        return True
+
+
+def _setup(monkeypatch):
+    store = LocalVectorStore(path=None, index_type="brute")
+    ledger = _FakeLedger()
+    monkeypatch.setattr(vector_store, "_store", store)
+    monkeypatch.setattr(semantic_memory, "_recent", semantic_memory.RecentVectorBuffer(window=8))
+    monkeypatch.setattr(semantic_memory, "get_embedding", _fake_embedding)
+    monkeypatch.setattr(semantic_memory, "get_batch_embeddings", lambda texts: [_fake_embedding(t) for t in texts])
+    monkeypatch.setattr(semantic_memory.vector_ledger, "record_vectors", ledger.record_vectors)
+    monkeypatch.setattr(semantic_memory.vector_ledger, "bump_hits", ledger.bump_hits)
+    monkeypatch.setattr(semantic_memory.settings, "SEMANTIC_DEDUP_THRESHOLD", 0.95)
+    monkeypatch.setattr(semantic_memory.settings, "SEMANTIC_NAMESPACE_MODE", "namespaced")
+    return store, ledger
+
+
+def test_near_duplicate_bumps_hit_count(monkeypatch):
+    store, ledger = _setup(monkeypatch)
+    before = semantic_memory.get_dedup_stats()["skipped"]
+
+    first = semantic_memory.store_semantic_memory("u1", "hello")
+    second = semantic_memory.store_semantic_memory("u1", "hello!")
+    semantic_memory.store_semantic_memory("u1", "tasks")
+
+    assert second["deduplicated"] is True and second["id"] == first["id"]
+    assert store.count(vector_store.user_namespace("u1")) == 2
+    assert ledger.hits[first["id"]] == 1
+    assert semantic_memory.get_dedup_stats()["skipped"] == before + 1
+
+
+def test_store_many_skips_duplicates_within_batch(monkeypatch):
+    store, ledger = _setup(monkeypatch)
+    res = semantic_memory.store_many("u2", ["hello", "tasks", "hello!"])
+    assert res["stored"] == 2 and res["skipped"] == 1
+    assert store.count(vector_store.user_namespace("u2")) == 2
+
+
+def test_vector_metadata_is_slim_and_text_goes_to_ledger(monkeypatch):
+    store, ledger = _setup(monkeypatch)
+    res = semantic_memory.store_semantic_memory("u3", "tasks", metadata={"source": "user_message"})
+    ns = vector_store.user_namespace("u3")
+    assert set(store.fetch([res["id"]], namespace=ns)[res["id"]]["metadata"]) == {"user_id", "stored_at"}
+    assert ledger.rows[res["id"]]["text"] == "tasks"
+    assert ledger.rows[res["id"]]["metadata"] == {"source": "user_message"}
+
+
+def test_failed_ledger_write_skips_the_upsert(monkeypatch):
+    store, ledger = _setup(monkeypatch)
+    monkeypatch.setattr(semantic_memory.vector_ledger, "record_vectors", lambda rows, namespace=None: False)
+    ns = vector_store.user_namespace("u4")
+
+    assert semantic_memory.store_semantic_memory("u4", "hello")["ok"] is False
+    assert semantic_memory.store_many("u4", ["tasks", "hello!"])["ok"] is False
+    assert store.count(ns) == 0
+
+    # Nothing unstored was remembered as a dedup target
+    monkeypatch.setattr(semantic_memory.vector_ledger, "record_vectors", ledger.record_vectors)
+    res = semantic_memory.store_semantic_memory("u4", "hello")
+    assert res["ok"] and not res.get("deduplicated") and store.count(ns) == 1
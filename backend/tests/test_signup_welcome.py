@@ -5,10 +5,15 @@ from app.main import app
 
 def test_signup_triggers_welcome_email(monkeypatch):
     # Mock create_user to return a user dict
-    def fake_create_user(name, email, pw):
+    def fake_create_user(name, email, pw=None, password_hash=None):
         return {"id": 123, "name": name, "email": email}
 
+    async def fake_hash(pw):
+        return "hashed"
+
+    monkeypatch.setattr('app.api.auth.get_user_by_email', lambda email: None)
     monkeypatch.setattr('app.api.auth.create_user', fake_create_user)
+    monkeypatch.setattr('app.api.auth.passwords.hash_password_async', fake_hash)
 
     fake_send = MagicMock(return_value=True)
     monkeypatch.setattr('app.api.auth.send_welcome_email', fake_send)
@@ -21,3 +26,4 @@ def test_signup_triggers_welcome_email(monkeypatch):
     # send_welcome_email should have been scheduled (we can't guarantee threading in test), but our mock should be callable
     # At least ensure response contains token and user
     assert j['user']['email'] == 'test@example.com'
+    fake_send.assert_called_once_with('test@example.com', 'Test User')